@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import threading
+import concurrent.futures
+import logging
+
+from aicommit_git.runner import (build_git_env, to_argv, decode_output, raise_git_error,
+	ProcessLimiter, DEFAULT_MAX_PROCESSES)
+from aicommit_git.progress import split_progress_lines, parse_progress_line
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 取消或超时时先发送 SIGTERM，等待该时间（秒）让 Git 删除锁文件后再强制结束
+KILL_GRACE_SECONDS = 5
+
+class _LoopThread:
+	"""在后台线程中运行的共享事件循环"""
+
+	def __init__(self):
+		self.loop = asyncio.new_event_loop()
+		self.thread = threading.Thread(target=self._run, name="git-async-loop", daemon=True)
+		self.thread.start()
+
+	def _run(self):
+		asyncio.set_event_loop(self.loop)
+		self.loop.run_forever()
+
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+def get_event_loop_thread():
+	"""获取（必要时创建）所有仓库共享的后台事件循环"""
+	global _loop_thread
+	with _loop_lock:
+		if _loop_thread is None:
+			_loop_thread = _LoopThread()
+		return _loop_thread
+
+class AsyncGitRunner:
+	"""基于 asyncio 子进程的 Git 命令执行器
+
+	每个仓库一个实例，通过 ProcessLimiter 限制同时运行的 Git 进程数量，
+	同一仓库的同步执行器和 cat-file 进程共用这一额度。
+	协程运行在共享的后台事件循环中，既可以直接 await run()，
+	也可以通过 submit() 从任意线程提交并得到 concurrent.futures.Future，
+	或者通过 run_sync() 以阻塞方式调用。
+	"""
+
+	def __init__(self, cwd, max_processes=DEFAULT_MAX_PROCESSES, metrics=None, limiter=None):
+		self.cwd = cwd
+		# CommandMetrics，记录每个命令的耗时、输出字节数和返回码
+		self.metrics = metrics
+		self.env = build_git_env()
+		# 与同一仓库的同步执行器和 cat-file 进程共用的进程额度
+		self.limiter = limiter or ProcessLimiter(max_processes)
+
+	async def run_bytes(self, command, timeout=None, input=None, env=None, cwd=None, on_stderr_line=None, caller=None,
+			limited=True):
+		"""执行 Git 命令并返回 (返回码, stdout, stderr) 字节
+
+		超时或被取消时会杀死子进程，超时抛出异常，取消则继续传播 CancelledError。
+		指定 on_stderr_line 时逐行读取标准错误并回调（在事件循环线程中调用），
+		返回的 stderr 中不再包含进度行。caller 为提交命令的栈帧，用于慢命令日志。
+		limited 为 False 时不占用进程额度（调用线程已持有额度并在同步等待结果）。
+		"""
+		argv = ["git"] + to_argv(command)
+		cwd = cwd or self.cwd
+		env = dict(self.env, **env) if env else self.env
+
+		if limited:
+			await self.limiter.acquire_async()
+		try:
+			logger.debug(f"执行命令: {' '.join(argv)} (在 {cwd})")
+			start = time.perf_counter()
+			try:
+				process = await asyncio.create_subprocess_exec(
+					*argv,
+					stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+					stdout=asyncio.subprocess.PIPE,
+					stderr=asyncio.subprocess.PIPE,
+					cwd=cwd,
+					env=env,
+					# 独立进程组，取消时连同 ssh 等辅助进程一起结束
+					start_new_session=(os.name != "nt")
+				)
+			except OSError as e:
+				logger.error(f"执行 Git 命令失败: {str(e)}")
+				raise Exception(f"执行 Git 命令失败: {str(e)}")
+
+			try:
+				output, error = await asyncio.wait_for(self._communicate(process, input, on_stderr_line), timeout)
+			except asyncio.TimeoutError:
+				await self._kill(process)
+				logger.error(f"Git 命令超时 ({timeout} 秒): {' '.join(argv)}")
+				raise Exception(f"Git 命令超时 ({timeout} 秒): {' '.join(argv)}")
+			except asyncio.CancelledError:
+				await self._kill(process)
+				logger.debug(f"Git 命令已取消: {' '.join(argv)}")
+				raise
+
+			if self.metrics is not None:
+				# 排队等待额度的时间不计入
+				self.metrics.record(argv[1:], time.perf_counter() - start, len(output), process.returncode, caller)
+			return process.returncode, output, error
+		finally:
+			if limited:
+				self.limiter.release()
+
+	async def run(self, command, timeout=None, input=None, env=None, cwd=None, on_stderr_line=None, caller=None,
+			limited=True):
+		"""执行 Git 命令并返回去掉首尾空白的文本输出，失败时抛出异常"""
+		returncode, output, error = await self.run_bytes(command, timeout, input, env, cwd, on_stderr_line, caller, limited)
+		if returncode != 0:
+			raise_git_error(error)
+		return decode_output(output)
+
+	async def _communicate(self, process, input, on_stderr_line):
+		if on_stderr_line is None:
+			return await process.communicate(input)
+
+		if input is not None:
+			process.stdin.write(input)
+			await process.stdin.drain()
+			process.stdin.close()
+		output, error = await asyncio.gather(
+			process.stdout.read(),
+			self._read_stderr_lines(process.stderr, on_stderr_line)
+		)
+		await process.wait()
+		return output, error
+
+	async def _read_stderr_lines(self, stream, on_stderr_line):
+		"""逐行读取标准错误，进度行只回调不保留，其余行保留用于错误信息"""
+		kept = []
+		pending = b""
+		while True:
+			chunk = await stream.read(4096)
+			if not chunk:
+				break
+			lines, pending = split_progress_lines(pending, chunk)
+			for line in lines:
+				self._dispatch_stderr_line(line, on_stderr_line, kept)
+		if pending:
+			self._dispatch_stderr_line(pending, on_stderr_line, kept)
+		return b"\n".join(kept)
+
+	def _dispatch_stderr_line(self, line, on_stderr_line, kept):
+		text = line.decode('utf-8', errors='replace')
+		if parse_progress_line(text) is None and text.strip():
+			kept.append(line)
+		try:
+			on_stderr_line(text)
+		except Exception as e:
+			logger.error(f"处理命令输出失败: {str(e)}", exc_info=True)
+
+	async def _kill(self, process):
+		"""结束子进程，即使调用方再次被取消也会等到进程退出"""
+		if process.returncode is None:
+			await asyncio.shield(self._terminate(process))
+
+	async def _terminate(self, process):
+		# Git 收到 SIGTERM 后会删除 index.lock 等锁文件再退出，SIGKILL 会把锁文件留在仓库中
+		self._signal(process, signal.SIGTERM)
+		try:
+			await asyncio.wait_for(process.wait(), KILL_GRACE_SECONDS)
+			return
+		except asyncio.TimeoutError:
+			logger.warning(f"Git 进程 {process.pid} 在 {KILL_GRACE_SECONDS} 秒内未退出，强制结束")
+		self._signal(process, signal.SIGKILL)
+		await process.wait()
+
+	@staticmethod
+	def _signal(process, signum):
+		try:
+			if os.name != "nt":
+				os.killpg(process.pid, signum)
+			elif signum == signal.SIGTERM:
+				process.terminate()
+			else:
+				process.kill()
+		except ProcessLookupError:
+			pass
+
+	def submit(self, command, timeout=None, input=None, env=None, cwd=None, on_stderr_line=None):
+		"""从任意线程提交命令，返回 concurrent.futures.Future
+
+		调用 future.cancel() 会取消协程并杀死对应的 Git 进程。
+		"""
+		# 命令在事件循环线程中执行，慢命令日志需要提交时的调用栈
+		caller = sys._getframe(1) if self.metrics is not None else None
+		return self.submit_coroutine(self.run(command, timeout, input, env, cwd, on_stderr_line, caller))
+
+	def submit_coroutine(self, coroutine):
+		"""在共享事件循环中调度协程，返回 concurrent.futures.Future
+
+		取消后 Future 立即完成，而子进程要在清理锁文件后才退出；
+		Future 的 stopped 属性是另一个 Future，在协程真正结束（子进程已退出）后完成。
+		"""
+		loop = get_event_loop_thread().loop
+		future = concurrent.futures.Future()
+		future.stopped = concurrent.futures.Future()
+
+		def start():
+			if future.cancelled():
+				coroutine.close()
+				future.stopped.set_result(None)
+				return
+			task = loop.create_task(coroutine)
+			task.add_done_callback(lambda t: self._copy_task_result(t, future))
+			future.add_done_callback(lambda f: f.cancelled() and loop.call_soon_threadsafe(task.cancel))
+
+		loop.call_soon_threadsafe(start)
+		return future
+
+	@staticmethod
+	def _copy_task_result(task, future):
+		try:
+			if task.cancelled():
+				future.cancel()
+			elif task.exception() is not None:
+				future.set_exception(task.exception())
+			else:
+				future.set_result(task.result())
+		except concurrent.futures.InvalidStateError:
+			# 调用方已经取消了 Future
+			pass
+		future.stopped.set_result(None)
+
+	def run_sync(self, command, timeout=None, input=None, env=None, cwd=None):
+		"""阻塞执行命令，供现有的同步调用方使用"""
+		if threading.current_thread() is get_event_loop_thread().thread:
+			raise RuntimeError("不能在 Git 事件循环线程中同步等待命令")
+		# 调用线程已持有额度（例如正在读取另一个命令的输出）时不再申请，避免额度被互相等待的调用占满
+		caller = sys._getframe(1) if self.metrics is not None else None
+		limited = not self.limiter.held()
+		return self.submit_coroutine(self.run(command, timeout, input, env, cwd, None, caller, limited)).result()
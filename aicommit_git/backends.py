@@ -0,0 +1,345 @@
+import os
+import time
+import threading
+import warnings
+import importlib
+import subprocess
+import logging
+
+from aicommit_git.status import parse_porcelain_v2, path_in_specs, iter_pipe_chunks
+from aicommit_git.runner import GIT_ENV_OVERRIDES, decode_output, raise_git_error
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 未在配置中指定时使用的实现
+DEFAULT_BACKEND = "subprocess"
+
+# 批量暂存/取消暂存时每个 Git 进程处理的路径数量，每批完成后报告一次进度
+STAGE_BATCH_SIZE = 1000
+
+_gitpython = None
+_gitpython_lock = threading.Lock()
+
+def import_gitpython():
+	"""按需导入 GitPython 并返回其顶层模块，只有选用 gitpython 实现时才需要安装"""
+	global _gitpython
+	with _gitpython_lock:
+		if _gitpython is None:
+			_gitpython = importlib.import_module("git")
+			logger.info(f"已加载 GitPython {getattr(_gitpython, '__version__', '')}")
+		return _gitpython
+
+class SubprocessBackend:
+	"""默认实现：每个操作直接执行 Git 命令行
+
+	状态和差异以流的方式读取，文件内容来自进程内的 ObjectStore（必要时回退到常驻的 cat-file 进程），
+	分支来自 BranchIndex。
+	"""
+
+	name = "subprocess"
+
+	def __init__(self, repository):
+		self.repository = repository
+
+	def read_status(self, paths=None):
+		"""返回 parse_porcelain_v2 格式的状态字典，指定 paths 时只查询这些路径"""
+		command = ["--literal-pathspecs", "status", "--porcelain=v2", "-z", "--branch", "--untracked-files=all"]
+		if paths is not None:
+			command += ["--"] + list(paths)
+		# 执行器设置了 GIT_OPTIONAL_LOCKS=0，status 不会顺带写回索引而触发文件监视
+		return parse_porcelain_v2(self.repository.git.iter_chunks(command))
+
+	def iter_diff_output(self, command, ok_codes=(0,)):
+		"""执行 diff 命令，逐块产出输出字节"""
+		return self.repository.git.iter_chunks(command, ok_codes=ok_codes)
+
+	def read_blob(self, revision, file_path):
+		"""读取指定版本中文件的内容（字节），对象不存在时返回 None
+
+		优先从进程内的对象库读取，无法处理时回退到 cat-file 进程。
+		"""
+		objects = self.repository.objects
+		if objects is not None:
+			try:
+				data = objects.read_path(revision, file_path)
+				if data is not None:
+					return data
+			except Exception as e:
+				logger.warning(f"对象库读取失败 ({revision}:{file_path}): {str(e)}")
+		return self.repository.blob_reader.read_path(revision, file_path)
+
+	def read_blob_head(self, revision, file_path, max_bytes):
+		"""读取指定版本中文件的前 max_bytes 字节，返回 (内容, 是否截断)，对象不存在时返回 None
+
+		与 read_blob 相同的读取顺序，超出上限的内容不会读入内存。
+		"""
+		objects = self.repository.objects
+		if objects is not None:
+			try:
+				result = objects.read_path_head(revision, file_path, max_bytes)
+				if result is not None:
+					return result
+			except Exception as e:
+				logger.warning(f"对象库读取失败 ({revision}:{file_path}): {str(e)}")
+		return self.repository.blob_reader.read_path_head(revision, file_path, max_bytes)
+
+	def head_oid(self):
+		"""返回 HEAD 指向的提交，尚无提交时返回 None"""
+		# 尚无提交时返回 1 且没有输出；结果由命令缓存按 HEAD 和引用的签名复用
+		output = self.repository.git.run(["rev-parse", "--verify", "--quiet", "HEAD"], ok_codes=(0, 1))
+		return output.decode('ascii').strip() or None
+
+	def stage(self, paths, progress=None):
+		"""批量暂存文件，progress(已完成数, 总数) 在每批完成后调用"""
+		self._run_pathspec_batches(["add"], paths, progress)
+
+	def unstage(self, paths, progress=None):
+		"""批量取消暂存文件"""
+		if self.head_oid() is not None:
+			self._run_pathspec_batches(["restore", "--staged"], paths, progress)
+		else:
+			# 首次提交之前没有 HEAD，只能直接从索引中移除
+			self._run_pathspec_batches(["rm", "--cached", "--quiet", "--ignore-unmatch"], paths, progress)
+
+	def _run_pathspec_batches(self, command, paths, progress=None):
+		"""分批执行命令，路径以 NUL 分隔通过标准输入传入，不受命令行长度限制"""
+		paths = list(paths)
+		total = len(paths)
+		for start in range(0, total, STAGE_BATCH_SIZE):
+			batch = paths[start:start + STAGE_BATCH_SIZE]
+			data = b"\0".join(os.fsencode(p) for p in batch)
+			self._execute(["--literal-pathspecs"] + command + ["--pathspec-from-file=-", "--pathspec-file-nul"], data)
+			if progress:
+				progress(min(start + STAGE_BATCH_SIZE, total), total)
+
+	def _execute(self, command, input=None):
+		return self.repository._run_git_command(command, input=input)
+
+	def commit(self, message):
+		self._execute(["commit", "-m", message])
+
+	def list_branches(self):
+		"""返回本地分支名列表"""
+		return [e['name'] for e in self.repository.branches.get_branches()]
+
+	def current_branch(self):
+		"""返回当前分支名，分离头指针时返回 HEAD"""
+		return self.repository.branches.current_branch()
+
+	def close(self):
+		pass
+
+class GitPythonBackend(SubprocessBackend):
+	"""基于 GitPython 的实现
+
+	文件内容、HEAD 和分支通过 GitPython 的纯 Python 对象数据库（GitDB）在进程内读取；
+	状态和差异使用 GitPython 的 diff API（其内部仍会调用 Git）。
+	IndexFile.add 在进程内写入对象时不经过 clean/smudge 过滤器和换行符转换，
+	因此暂存和提交通过 GitPython 的命令接口执行，结果与命令行一致。
+	"""
+
+	name = "gitpython"
+
+	def __init__(self, repository):
+		super().__init__(repository)
+		self.gitpython = import_gitpython()
+		# GitDB 是纯 Python 的对象数据库（默认的 GitCmdObjectDB 经由 cat-file 进程读取），
+		# GitPython 已不推荐使用并会发出 DeprecationWarning，这里只用于按需启用的实现
+		with warnings.catch_warnings():
+			warnings.simplefilter("ignore", DeprecationWarning)
+			self.repo = self.gitpython.Repo(repository.path, odbt=self.gitpython.GitDB)
+		# 路径与命令行实现一样按字面匹配，不解释通配符
+		self.repo.git.update_environment(GIT_LITERAL_PATHSPECS="1", **GIT_ENV_OVERRIDES)
+		self._index = None
+		self._index_key = None
+		# 最近读取的提交的根树，GitPython 的树对象会缓存已解析的条目
+		self._tree = (None, None)
+
+	def _get_index(self):
+		"""返回索引对象，只有 .git/index 变化时才重新解析"""
+		try:
+			st = os.stat(os.path.join(self.repository.git_dir, "index"))
+			key = (st.st_mtime_ns, st.st_size)
+		except OSError:
+			key = None
+		if self._index is None or key != self._index_key:
+			self._index = self.gitpython.IndexFile(self.repo)
+			self._index_key = key
+		return self._index
+
+	def _head_commit(self):
+		try:
+			return self.repo.head.commit
+		except ValueError:
+			# 尚无提交
+			return None
+
+	def _record(self, argv, start, output_bytes, returncode):
+		"""将经由 GitPython 执行的命令记录到仓库共用的 CommandMetrics"""
+		self.repository.metrics.record(argv, time.perf_counter() - start, output_bytes, returncode)
+
+	def read_status(self, paths=None):
+		# GitPython 内部启动的 Git 进程同样占用仓库的进程额度
+		with self.repository.limiter.slot():
+			start = time.perf_counter()
+			returncode = 1
+			try:
+				status = self._read_status(paths)
+				returncode = 0
+				return status
+			finally:
+				# 内部的 diff、ls-files 和 rev-list 合计记为一次 status
+				self._record(["status"], start, 0, returncode)
+
+	def _read_status(self, paths):
+		status = {
+			'branch': "HEAD" if self.repo.head.is_detached else self.repo.head.ref.name,
+			'modified': [],
+			'untracked': [],
+			'staged': [],
+			'deleted': [],
+			'renamed': {},
+			'unmerged': [],
+			'head_oid': None,
+			'upstream': None,
+			'ahead': 0,
+			'behind': 0
+		}
+		index = self._get_index()
+		head = self._head_commit()
+		# 指定 paths 时作为 pathspec 传给 Git，只计算这些路径（目录包含其下所有文件）的差异
+		pathspecs = list(paths) if paths is not None else None
+		if head is not None:
+			status['head_oid'] = head.hexsha
+			# R=True 使 a 侧为 HEAD、b 侧为暂存区，与 status 的重命名方向一致
+			for d in index.diff(head, paths=pathspecs, R=True):
+				path = d.a_path if d.deleted_file else d.b_path
+				status['staged'].append(path)
+				if d.renamed_file:
+					status['renamed'][path] = d.a_path
+		else:
+			status['staged'] = sorted({path for path, _ in index.entries})
+
+		for d in index.diff(None, paths=pathspecs):
+			path = d.a_path or d.b_path
+			status['modified'].append(path)
+			if d.deleted_file:
+				status['deleted'].append(path)
+		if pathspecs is None:
+			status['untracked'] = self.repo.untracked_files
+			status['unmerged'] = sorted(index.unmerged_blobs())
+		else:
+			output = self.repo.git.ls_files("--others", "--exclude-standard", "-z", "--", *pathspecs)
+			status['untracked'] = [p for p in output.split("\0") if p]
+			specs = set(pathspecs)
+			status['unmerged'] = sorted(p for p in index.unmerged_blobs() if path_in_specs(p, specs))
+			if head is None:
+				status['staged'] = [p for p in status['staged'] if path_in_specs(p, specs)]
+
+		if not self.repo.head.is_detached:
+			upstream = self.repo.head.ref.tracking_branch()
+			if upstream is not None and upstream.is_valid():
+				status['upstream'] = upstream.name
+				output = self.repo.git.rev_list("--left-right", "--count", f"HEAD...{upstream.path}")
+				ahead, _, behind = output.partition("\t")
+				status['ahead'], status['behind'] = int(ahead or 0), int(behind or 0)
+
+		return status
+
+	def iter_diff_output(self, command, ok_codes=(0,)):
+		"""经由 GitPython 启动 diff 命令，从管道中逐块产出输出，完整的差异不会一次读入内存"""
+		with self.repository.limiter.slot():
+			# 返回的 AutoInterrupt 被回收时会终止进程，读取期间保持引用
+			start = time.perf_counter()
+			process = self.repo.git.execute(["git"] + list(command), as_process=True)
+			proc = process.proc
+			errors = []
+			stderr_thread = threading.Thread(target=lambda: errors.append(proc.stderr.read()), daemon=True)
+			stderr_thread.start()
+			completed = False
+			output_bytes = 0
+			try:
+				for chunk in iter_pipe_chunks(proc.stdout):
+					output_bytes += len(chunk)
+					yield chunk
+				completed = True
+			finally:
+				# 调用方提前停止读取（例如超出差异上限）时终止进程
+				if not completed and proc.poll() is None:
+					proc.kill()
+				proc.stdout.close()
+				proc.wait()
+				stderr_thread.join()
+				proc.stderr.close()
+				self._record(list(command), start, output_bytes, proc.returncode)
+		if proc.returncode not in ok_codes:
+			raise_git_error(b"".join(errors))
+
+	def _blob_stream(self, revision, file_path):
+		"""返回 GitDB 的对象流（按需解压），对象不存在时返回 None"""
+		try:
+			if revision == ":0":
+				entry = self._get_index().entries.get((file_path, 0))
+				if entry is None:
+					return None
+				return self.repo.odb.stream(entry.binsha)
+			commit = self.repo.commit(revision)
+			if self._tree[0] != commit.binsha:
+				self._tree = (commit.binsha, commit.tree)
+			blob = self._tree[1] / file_path
+			return blob.data_stream
+		except (KeyError, ValueError, self.gitpython.BadName):
+			return None
+
+	def read_blob(self, revision, file_path):
+		stream = self._blob_stream(revision, file_path)
+		return stream.read() if stream is not None else None
+
+	def read_blob_head(self, revision, file_path, max_bytes):
+		stream = self._blob_stream(revision, file_path)
+		if stream is None:
+			return None
+		return stream.read(max_bytes), stream.size > max_bytes
+
+	def head_oid(self):
+		head = self._head_commit()
+		return head.hexsha if head is not None else None
+
+	def _execute(self, command, input=None):
+		with self.repository.limiter.slot():
+			start = time.perf_counter()
+			process = self.repo.git.execute(["git"] + command, as_process=True, istream=subprocess.PIPE if input is not None else None)
+			output, error = process.proc.communicate(input)
+		self._record(command, start, len(output), process.proc.returncode)
+		if process.proc.returncode != 0:
+			raise_git_error(error)
+		return decode_output(output)
+
+	def list_branches(self):
+		return [head.name for head in self.repo.heads]
+
+	def current_branch(self):
+		return "HEAD" if self.repo.head.is_detached else self.repo.head.ref.name
+
+	def close(self):
+		self.repo.close()
+
+BACKENDS = {
+	SubprocessBackend.name: SubprocessBackend,
+	GitPythonBackend.name: GitPythonBackend
+}
+
+def create_backend(name, repository):
+	"""按名称创建实现，名称未知或 GitPython 不可用时回退到命令行实现"""
+	backend_class = BACKENDS.get(name or DEFAULT_BACKEND)
+	if backend_class is None:
+		logger.warning(f"未知的仓库实现: {name}，使用 {DEFAULT_BACKEND}")
+		backend_class = SubprocessBackend
+	try:
+		return backend_class(repository)
+	except Exception as e:
+		if backend_class is SubprocessBackend:
+			raise
+		logger.warning(f"无法使用 {backend_class.name} 实现: {str(e)}，使用 {DEFAULT_BACKEND}")
+		return SubprocessBackend(repository)
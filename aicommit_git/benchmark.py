@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import logging
+
+from aicommit_git.repository import GitRepository
+from aicommit_git.backends import BACKENDS
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 每项操作读取的文件数量上限
+BENCHMARK_FILE_LIMIT = 200
+
+def _measure(operation, repeat):
+	"""返回多次执行中最短的耗时（毫秒）"""
+	best = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		operation()
+		elapsed = (time.perf_counter() - start) * 1000
+		best = elapsed if best is None else min(best, elapsed)
+	return best
+
+def benchmark_backends(path, backends=None, repeat=5):
+	"""在同一个仓库上分别用各个实现执行常用操作，返回 实现 -> {操作: 最短耗时毫秒}
+
+	暂存测试只对未暂存的已修改文件执行暂存后再取消暂存，不会改变仓库状态；提交不参与测试。
+	"""
+	results = {}
+	for name in backends or list(BACKENDS):
+		repo = GitRepository(path, backend=name)
+		try:
+			if repo.backend.name != name:
+				logger.warning(f"实现 {name} 不可用，跳过")
+				continue
+
+			status = repo.get_status()
+			head = repo.get_head_oid()
+			committed = []
+			if head:
+				output = repo.git.run(["ls-tree", "-r", "-z", "--name-only", "HEAD"])
+				committed = [os.fsdecode(p) for p in output.split(b"\0") if p][:BENCHMARK_FILE_LIMIT]
+			output = repo.git.run(["ls-files", "-z"])
+			indexed = [os.fsdecode(p) for p in output.split(b"\0") if p][:BENCHMARK_FILE_LIMIT]
+			changed = [p for p, e in status.entries.items() if e.modified and not e.deleted][:BENCHMARK_FILE_LIMIT]
+			unstaged = [p for p in changed if p not in status.staged]
+
+			timings = {}
+			timings['status'] = _measure(repo.get_status, repeat)
+			if changed:
+				timings['diff'] = _measure(lambda: repo.get_diffs(changed, status), repeat)
+			if committed:
+				timings['read_blob'] = _measure(lambda: [repo.read_blob("HEAD", p) for p in committed], repeat)
+			if indexed:
+				timings['read_index_blob'] = _measure(lambda: [repo.read_blob(":0", p) for p in indexed], repeat)
+			if unstaged:
+				def stage_cycle():
+					repo.stage_files(unstaged)
+					repo.unstage_files(unstaged)
+				timings['stage'] = _measure(stage_cycle, repeat)
+			timings['branches'] = _measure(lambda: (repo.get_branches(), repo.get_current_branch()), repeat)
+			timings['head'] = _measure(repo.get_head_oid, repeat)
+			results[name] = timings
+		finally:
+			repo.close()
+	return results
+
+def format_results(results):
+	"""将测试结果格式化为表格，每项操作标出最快的实现"""
+	names = list(results)
+	operations = []
+	for timings in results.values():
+		operations += [op for op in timings if op not in operations]
+
+	lines = ["操作".ljust(18) + "".join(name.rjust(14) for name in names) + "  最快"]
+	for op in operations:
+		row = [results[name].get(op) for name in names]
+		measured = [(t, name) for t, name in zip(row, names) if t is not None]
+		fastest = min(measured)[1] if measured else ""
+		cells = "".join((f"{t:.2f}ms" if t is not None else "-").rjust(14) for t in row)
+		lines.append(op.ljust(18) + cells + f"  {fastest}")
+	return "\n".join(lines)
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("用法: python -m git.benchmark <仓库路径> [重复次数]")
+		sys.exit(1)
+	print(format_results(benchmark_backends(sys.argv[1], repeat=int(sys.argv[2]) if len(sys.argv) > 2 else 5)))
@@ -0,0 +1,148 @@
+import time
+import contextlib
+import subprocess
+import threading
+import logging
+
+from aicommit_git.runner import build_git_env
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 读取超出上限的对象内容时，每次从管道读出并丢弃的字节数
+DISCARD_CHUNK_SIZE = 64 * 1024
+
+class BlobReader:
+	"""常驻的 `git cat-file --batch-command` 进程，用于读取对象内容
+
+	所有请求经由同一个锁串行写入辅助进程并读取响应，因此可以在多个线程中安全调用。
+	辅助进程意外退出时会在下一次请求时自动重启。
+	指定 limiter（ProcessLimiter）时，辅助进程只在处理请求期间占用一个额度，空闲时不占用。
+	指定 metrics（CommandMetrics）时，每次请求（包括需要时启动辅助进程的耗时）记录为一次 cat-file 命令。
+	"""
+
+	def __init__(self, path, limiter=None, metrics=None):
+		self.path = path
+		self.limiter = limiter
+		self.metrics = metrics
+		self.process = None
+		self.lock = threading.Lock()
+		# 旧版本 Git (< 2.36) 不支持 --batch-command，此时回退到 --batch
+		self.batch_command = True
+
+	def _start(self):
+		"""启动辅助进程"""
+		mode = "--batch-command" if self.batch_command else "--batch"
+		logger.debug(f"启动 cat-file 辅助进程: git cat-file {mode} (在 {self.path})")
+		self.process = subprocess.Popen(
+			["git", "cat-file", mode],
+			stdin=subprocess.PIPE,
+			stdout=subprocess.PIPE,
+			stderr=subprocess.DEVNULL,
+			cwd=self.path,
+			env=build_git_env()
+		)
+
+	def _is_alive(self):
+		return self.process is not None and self.process.poll() is None
+
+	def _request(self, spec, limit=None):
+		"""发送一次请求并读取响应，返回 (内容, 完整大小)，对象不存在时返回 None
+
+		指定 limit 时只保留前 limit 字节，其余内容分块读出后丢弃，以保持与辅助进程的协议同步。
+		"""
+		if not self._is_alive():
+			self._start()
+
+		line = f"contents {spec}\n" if self.batch_command else f"{spec}\n"
+		self.process.stdin.write(line.encode('utf-8', errors='surrogateescape'))
+		self.process.stdin.flush()
+
+		header = self.process.stdout.readline()
+		if not header:
+			raise BrokenPipeError("cat-file 辅助进程已退出")
+
+		# 对象不存在或有歧义: "<spec> missing" / "<spec> ambiguous"
+		if header.endswith(b" missing\n") or header.endswith(b" ambiguous\n"):
+			return None
+
+		size = int(header.split()[2])
+		keep = size if limit is None else min(size, limit)
+		data = self.process.stdout.read(keep)
+		remaining = size - keep
+		while remaining > 0:
+			skipped = self.process.stdout.read(min(remaining, DISCARD_CHUNK_SIZE))
+			if not skipped:
+				raise BrokenPipeError("cat-file 辅助进程已退出")
+			remaining -= len(skipped)
+		# 内容后紧跟一个换行符
+		self.process.stdout.read(1)
+		return data, size
+
+	def _locked_request(self, spec, limit=None):
+		if "\n" in spec:
+			raise ValueError(f"对象名称不能包含换行符: {spec!r}")
+
+		with self.limiter.slot() if self.limiter is not None else contextlib.nullcontext(), self.lock:
+			start = time.perf_counter()
+			try:
+				result = self._request(spec, limit)
+			except (BrokenPipeError, OSError, ValueError, IndexError) as e:
+				logger.warning(f"cat-file 辅助进程异常，正在重启: {str(e)}")
+				returncode = self.process.poll() if self.process else None
+				self._stop()
+				# 129 表示参数错误，说明当前 Git 不支持 --batch-command
+				if returncode == 129 and self.batch_command:
+					logger.info("当前 Git 不支持 --batch-command，回退到 --batch")
+					self.batch_command = False
+				result = self._request(spec, limit)
+			if self.metrics is not None:
+				# 对象不存在时与 `git cat-file -e` 一样记为返回码 1
+				mode = "--batch-command" if self.batch_command else "--batch"
+				self.metrics.record(
+					["cat-file", mode, spec], time.perf_counter() - start,
+					len(result[0]) if result is not None else 0, 0 if result is not None else 1
+				)
+			return result
+
+	def read(self, spec):
+		"""按 <revision>:<path> 或对象 ID 读取对象内容（字节）"""
+		result = self._locked_request(spec)
+		return result[0] if result is not None else None
+
+	def read_head(self, spec, max_bytes):
+		"""读取对象的前 max_bytes 字节，返回 (内容, 是否截断)，对象不存在时返回 None"""
+		result = self._locked_request(spec, max_bytes)
+		if result is None:
+			return None
+		data, size = result
+		return data, size > max_bytes
+
+	def read_path(self, revision, path):
+		"""读取指定版本中某个路径的内容，revision 为空字符串时读取暂存区"""
+		return self.read(f"{revision}:{path}")
+
+	def read_path_head(self, revision, path, max_bytes):
+		"""读取指定版本中某个路径的前 max_bytes 字节，返回 (内容, 是否截断)"""
+		return self.read_head(f"{revision}:{path}", max_bytes)
+
+	def _stop(self):
+		"""停止辅助进程"""
+		process, self.process = self.process, None
+		if process is None:
+			return
+		try:
+			process.stdin.close()
+		except OSError:
+			pass
+		try:
+			process.wait(timeout=1)
+		except subprocess.TimeoutExpired:
+			process.kill()
+			process.wait()
+		process.stdout.close()
+
+	def close(self):
+		"""关闭辅助进程"""
+		with self.lock:
+			self._stop()
@@ -0,0 +1,177 @@
+import os
+import threading
+import logging
+
+from aicommit_git.gitdir import find_common_dir
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# for-each-ref 输出格式，字段以 NUL 分隔，每个引用一行（引用名中不允许出现控制字符）
+REF_FORMAT = "%(refname)%00%(objectname)%00%(upstream)%00%(committerdate:unix)%00%(HEAD)%00%(symref)"
+
+LOCAL_PREFIX = "refs/heads/"
+REMOTE_PREFIX = "refs/remotes/"
+
+def short_ref_name(ref):
+	"""去掉 refs/heads/ 或 refs/remotes/ 前缀"""
+	for prefix in (LOCAL_PREFIX, REMOTE_PREFIX):
+		if ref.startswith(prefix):
+			return ref[len(prefix):]
+	return ref
+
+class BranchIndex:
+	"""本地和远程分支的元数据索引
+
+	通过一次 `git for-each-ref` 获取所有分支的提交、上游和提交时间，
+	并以 HEAD、packed-refs 和 refs 目录的修改时间作为签名，签名不变时直接复用。
+	ahead/behind 按 (分支提交, 上游提交) 缓存，只在需要时计算。
+	"""
+
+	def __init__(self, runner, git_dir):
+		self.runner = runner
+		self.git_dir = git_dir
+		self.common_dir = find_common_dir(git_dir)
+		self.entries = []
+		self.by_name = {}
+		self.oids = {}
+		self.current = "HEAD"
+		# 每次重新加载后递增，供界面判断是否需要重建列表
+		self.version = 0
+		self._signature = None
+		self._ahead_behind = {}
+		self._lock = threading.Lock()
+		# ahead/behind 缓存在界面线程和后台刷新线程中都会读写
+		self._counts_lock = threading.Lock()
+
+	def _compute_signature(self):
+		"""HEAD、packed-refs 以及 refs 下各目录的修改时间
+
+		Git 通过锁文件重命名更新松散引用，因此引用的创建、修改和删除都会改变所在目录的修改时间。
+		"""
+		signature = []
+		for path in (os.path.join(self.git_dir, "HEAD"), os.path.join(self.common_dir, "packed-refs")):
+			try:
+				st = os.stat(path)
+				signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+			except OSError:
+				signature.append(None)
+
+		pending = [os.path.join(self.common_dir, "refs", "heads"), os.path.join(self.common_dir, "refs", "remotes")]
+		while pending:
+			directory = pending.pop()
+			try:
+				signature.append((directory, os.stat(directory).st_mtime_ns))
+				with os.scandir(directory) as it:
+					for entry in it:
+						if entry.is_dir(follow_symlinks=False):
+							pending.append(entry.path)
+			except OSError:
+				continue
+		return tuple(signature)
+
+	def refresh(self, force=False):
+		"""签名变化时重新加载分支列表，返回是否重新加载"""
+		with self._lock:
+			signature = self._compute_signature()
+			if not force and signature == self._signature:
+				return False
+			self._load()
+			self._signature = signature
+			return True
+
+	def _load(self):
+		entries = []
+		oids = {}
+		current = "HEAD"
+		lines = self.runner.iter_lines(
+			["for-each-ref", f"--format={REF_FORMAT}", LOCAL_PREFIX, REMOTE_PREFIX]
+		)
+		for line in lines:
+			fields = os.fsdecode(line).split("\0")
+			if len(fields) < 6:
+				continue
+			ref, oid, upstream, date, head, symref = fields[:6]
+			oids[ref] = oid
+			# 跳过 refs/remotes/origin/HEAD 这样的符号引用
+			if symref:
+				continue
+			entry = {
+				'name': short_ref_name(ref),
+				'ref': ref,
+				'oid': oid,
+				'upstream': short_ref_name(upstream) if upstream else None,
+				'upstream_ref': upstream or None,
+				'date': int(date) if date else 0,
+				'current': head == "*",
+				'remote': ref.startswith(REMOTE_PREFIX)
+			}
+			if entry['current']:
+				current = entry['name']
+			entries.append(entry)
+
+		# 本地分支在前，远程分支在后
+		entries.sort(key=lambda e: e['remote'])
+		self.entries = entries
+		self.by_name = {e['name']: e for e in entries}
+		self.oids = oids
+		self.current = current
+		self.version += 1
+
+		# 只保留仍然有效的 ahead/behind 缓存
+		valid = {(e['oid'], oids.get(e['upstream_ref'])) for e in entries if e['upstream_ref']}
+		with self._counts_lock:
+			self._ahead_behind = {k: v for k, v in self._ahead_behind.items() if k in valid}
+		logger.debug(f"加载分支索引: {len(entries)} 个分支，当前分支: {current}")
+
+	def get_branches(self, remote=False):
+		"""返回分支条目列表，remote 为 True 时包含远程分支"""
+		self.refresh()
+		if remote:
+			return list(self.entries)
+		return [e for e in self.entries if not e['remote']]
+
+	def current_branch(self):
+		"""返回当前分支名，分离头指针时返回 HEAD"""
+		self.refresh()
+		return self.current
+
+	def find(self, name):
+		"""按名称查找分支条目"""
+		self.refresh()
+		return self.by_name.get(name)
+
+	def search(self, text, remote=True, limit=None):
+		"""按名称模糊查找分支（不区分大小写的子串匹配）"""
+		self.refresh()
+		text = text.lower()
+		result = []
+		for entry in self.entries:
+			if entry['remote'] and not remote:
+				continue
+			if text in entry['name'].lower():
+				result.append(entry)
+				if limit and len(result) >= limit:
+					break
+		return result
+
+	def ahead_behind(self, name):
+		"""返回分支相对上游的 (ahead, behind)，没有上游或上游不存在时返回 None"""
+		entry = self.find(name)
+		if not entry or not entry['upstream_ref']:
+			return None
+		upstream_oid = self.oids.get(entry['upstream_ref'])
+		if not upstream_oid:
+			return None
+
+		key = (entry['oid'], upstream_oid)
+		with self._counts_lock:
+			counts = self._ahead_behind.get(key)
+		if counts is None:
+			# 计算期间不持有锁，两个线程同时计算同一对提交时结果相同
+			output = self.runner.run_text(["rev-list", "--left-right", "--count", f"{key[0]}...{key[1]}"])
+			ahead, _, behind = output.partition("\t")
+			counts = (int(ahead or 0), int(behind or 0))
+			with self._counts_lock:
+				self._ahead_behind[key] = counts
+		return counts
@@ -0,0 +1,196 @@
+import os
+import threading
+import logging
+
+from aicommit_git.status import iter_nul_records
+from aicommit_git.runner import PATHSPEC_ARG_LIMIT
+from aicommit_git.gitdir import find_common_dir, stat_signature
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 需要查询的属性
+CLASSIFY_ATTRIBUTES = ["binary", "diff", "linguist-generated", "filter"]
+
+# 超过该大小的文件视为大文件
+LARGE_FILE_SIZE = 1024 * 1024
+
+# 判断未跟踪文件是否为二进制时读取的字节数，与 Git 的 buffer_is_binary 一致
+BINARY_SNIFF_SIZE = 8000
+
+def _attribute_is_set(value):
+	return value not in ("unspecified", "unset", "false")
+
+def _skip_numstat(attributes):
+	"""LFS 文件和由属性确定为二进制的文件不需要 numstat
+
+	对它们执行 diff 会在工作区文件上运行 clean 过滤器（例如 git-lfs），代价很高且结果无用。
+	"""
+	return (
+		attributes.get("filter") == "lfs"
+		or attributes.get("diff") == "unset"
+		or _attribute_is_set(attributes.get("binary", "unspecified"))
+	)
+
+class FileClassifier:
+	"""对变更文件批量分类：二进制/文本、大小、LFS、生成文件、是否禁用 diff
+
+	属性来自一次 `git check-attr --stdin -z`，已跟踪文件的二进制判断来自随后的一次 `git diff --numstat -z`，
+	其中不包括 LFS 文件和属性已标记为二进制的文件；只有未跟踪文件才需要读取文件头。
+	结果按路径缓存，文件的修改时间和大小、HEAD 或属性文件变化时失效。
+	"""
+
+	def __init__(self, runner, repo_path, git_dir, attribute_files=None):
+		self.runner = runner
+		self.repo_path = repo_path
+		self.git_dir = git_dir
+		self.common_dir = find_common_dir(git_dir)
+		# 返回索引中 .gitattributes 文件相对路径的回调（与 CommandCache 共用），用于发现子目录中的属性文件
+		self.attribute_files = attribute_files
+		self.cache = {}
+		self._lock = threading.Lock()
+
+	def classify(self, paths, untracked=(), head_oid=None):
+		"""返回 路径 -> 分类信息 的字典
+
+		分类信息包含 binary、size（文件不存在时为 None）、large、lfs、generated、
+		diff（属性 -diff 时为 False）以及 added/deleted（numstat 行数，未知时为 None）。
+		"""
+		paths = list(dict.fromkeys(paths))
+		untracked = set(untracked)
+		attr_signature = self.attribute_signature()
+
+		result = {}
+		missing = []
+		keys = {}
+		with self._lock:
+			for path in paths:
+				key = self._stat_key(path, head_oid, attr_signature)
+				keys[path] = key
+				cached = self.cache.get(path)
+				if cached and cached[0] == key:
+					result[path] = cached[1]
+				else:
+					missing.append(path)
+
+		if not missing:
+			return result
+
+		attributes = self._read_attributes(missing)
+		numstat_paths = []
+		excluded = []
+		for path in missing:
+			if path in untracked:
+				continue
+			if _skip_numstat(attributes.get(path, {})):
+				excluded.append(path)
+			else:
+				numstat_paths.append(path)
+		numstat = self._read_numstat(numstat_paths, head_oid, excluded)
+
+		with self._lock:
+			for path in missing:
+				info = self._build_info(path, keys[path], numstat.get(path), attributes.get(path, {}))
+				self.cache[path] = (keys[path], info)
+				result[path] = info
+		logger.debug(f"分类文件: {len(missing)} 个新分类，{len(paths) - len(missing)} 个命中缓存")
+		return result
+
+	def attribute_signature(self):
+		"""info/attributes 以及根目录和索引中各 .gitattributes 的 stat，任一变化时分类缓存失效"""
+		paths = {".gitattributes"}
+		if self.attribute_files:
+			try:
+				paths.update(self.attribute_files())
+			except Exception as e:
+				logger.warning(f"读取属性文件列表失败: {str(e)}")
+		signature = [stat_signature(os.path.join(self.common_dir, "info", "attributes"))]
+		signature.extend((path, stat_signature(os.path.join(self.repo_path, path))) for path in sorted(paths))
+		return tuple(signature)
+
+	def _stat_key(self, path, head_oid, attr_signature):
+		try:
+			st = os.lstat(os.path.join(self.repo_path, path))
+			return (st.st_mtime_ns, st.st_size, head_oid, attr_signature)
+		except OSError:
+			return (None, None, head_oid, attr_signature)
+
+	def _read_numstat(self, paths, head_oid, excluded=()):
+		"""返回 路径 -> (added, deleted)，二进制文件为 (None, None)
+
+		路径过多无法逐个传给命令行时比较整个工作区，此时用排除规则去掉 excluded 中的路径。
+		"""
+		if not paths:
+			return {}
+		# 工作区与 HEAD 比较，同时覆盖已暂存和未暂存的修改；尚无提交时与空树比较暂存区
+		command = ["diff", "--numstat", "-z", "--no-renames", "--no-ext-diff"]
+		command += [head_oid] if head_oid else ["--cached"]
+		if len(paths) <= PATHSPEC_ARG_LIMIT:
+			command = ["--literal-pathspecs"] + command + ["--"] + paths
+		elif excluded and len(excluded) <= PATHSPEC_ARG_LIMIT:
+			command += ["--", "."] + [f":(exclude,literal){p}" for p in excluded]
+
+		numstat = {}
+		for record in iter_nul_records(self.runner.iter_chunks(command)):
+			added, _, rest = record.partition(b"\t")
+			deleted, _, path = rest.partition(b"\t")
+			if added == b"-":
+				numstat[os.fsdecode(path)] = (None, None)
+			elif added:
+				numstat[os.fsdecode(path)] = (int(added), int(deleted))
+		return numstat
+
+	def _read_attributes(self, paths):
+		"""返回 路径 -> {属性: 值}"""
+		data = b"".join(os.fsencode(p) + b"\0" for p in paths)
+		output = self.runner.run(["check-attr", "--stdin", "-z"] + CLASSIFY_ATTRIBUTES, input=data)
+		fields = output.split(b"\0")
+		attributes = {}
+		# 输出为 <路径> NUL <属性> NUL <值> NUL 的三元组
+		for i in range(0, len(fields) - 2, 3):
+			path = os.fsdecode(fields[i])
+			attributes.setdefault(path, {})[fields[i + 1].decode('ascii')] = fields[i + 2].decode('utf-8', errors='replace')
+		return attributes
+
+	def _build_info(self, path, key, counts, attributes):
+		size = key[1]
+		lfs = attributes.get("filter") == "lfs"
+		no_diff = attributes.get("diff") == "unset"
+
+		if _attribute_is_set(attributes.get("binary", "unspecified")) or no_diff:
+			binary = True
+		elif counts is not None:
+			binary = counts[0] is None
+		elif size:
+			# 未跟踪或没有变化的文件不在 numstat 中，按 Git 的规则检查文件头
+			binary = self._sniff_binary(path)
+		else:
+			binary = False
+
+		return {
+			'binary': binary,
+			'size': size,
+			'large': size is not None and size > LARGE_FILE_SIZE,
+			'lfs': lfs,
+			'generated': _attribute_is_set(attributes.get("linguist-generated", "unspecified")),
+			'diff': not no_diff,
+			'added': counts[0] if counts else None,
+			'deleted': counts[1] if counts else None
+		}
+
+	def _sniff_binary(self, path):
+		"""按 Git 的规则检查文件开头是否包含 NUL 字节"""
+		try:
+			with open(os.path.join(self.repo_path, path), 'rb') as f:
+				return b"\0" in f.read(BINARY_SNIFF_SIZE)
+		except OSError:
+			return False
+
+	def invalidate(self, paths=None):
+		"""清除指定路径（或全部）的缓存"""
+		with self._lock:
+			if paths is None:
+				self.cache.clear()
+			else:
+				for path in paths:
+					self.cache.pop(path, None)
@@ -0,0 +1,120 @@
+import os
+import shutil
+import asyncio
+import logging
+
+from aicommit_git.async_runner import AsyncGitRunner
+from aicommit_git.runner import REMOTE_ENV
+from aicommit_git.progress import parse_progress_line
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 默认同时进行的克隆数量
+DEFAULT_CLONE_WORKERS = 4
+
+def repo_name_from_url(url):
+	"""根据仓库 URL 推断本地目录名，规则与 git clone 一致"""
+	name = url.rstrip("/\\")
+	if name.endswith(".git"):
+		name = name[:-4]
+	name = name.rstrip("/\\")
+	for separator in ("/", "\\", ":"):
+		name = name.rsplit(separator, 1)[-1]
+	return name or "repository"
+
+def build_clone_command(url, path, filter_blobs=False, depth=None, single_branch=False, branch=None):
+	"""构建 git clone 的参数列表
+
+	filter_blobs 为部分克隆（--filter=blob:none，按需下载文件内容），
+	depth 为浅克隆的提交深度，single_branch 只克隆一个分支。
+	"""
+	command = ["clone", "--progress"]
+	if filter_blobs:
+		command.append("--filter=blob:none")
+	if depth:
+		command.append(f"--depth={int(depth)}")
+	if single_branch:
+		command.append("--single-branch")
+	if branch:
+		command += ["--branch", branch]
+	command += ["--", url, path]
+	return command
+
+class CloneManager:
+	"""并行克隆多个仓库
+
+	所有克隆共用一个 AsyncGitRunner，其进程额度即为同时运行的克隆数量上限。
+	"""
+
+	def __init__(self, max_workers=DEFAULT_CLONE_WORKERS):
+		self.runner = AsyncGitRunner(None, max_processes=max(1, int(max_workers)))
+
+	async def clone(self, url, path, progress=None, **options):
+		"""克隆单个仓库，返回本地路径
+
+		progress(url, info) 在事件循环线程中接收 parse_progress_line 格式的进度。
+		"""
+		on_line = None
+		if progress:
+			def on_line(line):
+				info = parse_progress_line(line)
+				if info:
+					progress(url, info)
+
+		path = os.path.abspath(path)
+		logger.info(f"克隆仓库: {url} -> {path}")
+		parent = os.path.dirname(path)
+		os.makedirs(parent, exist_ok=True)
+		# 只删除由本次克隆创建的目录，已存在的目录保持原样
+		existed = os.path.lexists(path)
+		try:
+			await self.runner.run(
+				build_clone_command(url, path, **options),
+				cwd=parent,
+				env=REMOTE_ENV,
+				on_stderr_line=on_line
+			)
+		except BaseException:
+			if not existed and os.path.lexists(path):
+				await asyncio.shield(self._remove_partial_clone(path))
+			raise
+		logger.info(f"克隆完成: {path}")
+		return path
+
+	async def _remove_partial_clone(self, path):
+		"""删除取消或失败的克隆留下的目录，在线程池中执行以免阻塞事件循环"""
+		logger.info(f"删除未完成的克隆: {path}")
+		loop = asyncio.get_running_loop()
+		await loop.run_in_executor(None, lambda: shutil.rmtree(path, ignore_errors=True))
+
+	def submit(self, url, path, progress=None, **options):
+		"""在后台克隆单个仓库，返回可取消的 Future"""
+		return self.runner.submit_coroutine(self.clone(url, path, progress, **options))
+
+	def submit_all(self, urls, directory, progress=None, **options):
+		"""将多个仓库克隆到 directory 下，返回 [(url, 本地路径, Future)]
+
+		重复的 URL 只克隆一次；不同 URL 推断出相同目录名时，后面的依次加上 -2、-3 等后缀。
+		"""
+		jobs = []
+		seen_urls = set()
+		used_names = set()
+		for url in urls:
+			if url in seen_urls:
+				logger.warning(f"忽略重复的仓库 URL: {url}")
+				continue
+			seen_urls.add(url)
+			base = repo_name_from_url(url)
+			name = base
+			suffix = 2
+			# 大小写不敏感的文件系统上只有大小写不同的目录名也会冲突
+			while name.lower() in used_names:
+				name = f"{base}-{suffix}"
+				suffix += 1
+			used_names.add(name.lower())
+			if name != base:
+				logger.info(f"目录名 {base} 已被同批次的其他仓库使用，{url} 克隆到 {name}")
+			path = os.path.join(directory, name)
+			jobs.append((url, path, self.submit(url, path, progress, **options)))
+		return jobs
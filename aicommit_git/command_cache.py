@@ -0,0 +1,268 @@
+import os
+import threading
+import logging
+
+from aicommit_git.gitdir import find_common_dir, stat_signature
+from aicommit_git.object_store import ObjectCache, OBJECT_CACHE_MAX_ENTRY_RATIO
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 只读命令输出缓存的默认字节上限
+COMMAND_CACHE_BYTES = 8 * 1024 * 1024
+
+# 输出只取决于 HEAD、索引和引用的子命令，可以直接缓存
+CACHEABLE_COMMANDS = {
+	"rev-parse", "rev-list", "ls-tree", "for-each-ref", "show-ref",
+	"merge-base", "log", "cat-file", "name-rev"
+}
+
+# 只读但输出还取决于工作区的子命令，不缓存也不会使缓存失效
+WORKTREE_READ_COMMANDS = {"status", "check-ignore", "check-attr", "grep", "blame", "version", "var"}
+
+# 选项后面跟一个独立参数的全局选项
+GLOBAL_OPTIONS_WITH_VALUE = {"-c", "-C", "--git-dir", "--work-tree", "--namespace"}
+
+# ls-files 中会读取工作区的选项
+LS_FILES_WORKTREE_OPTIONS = {
+	"-o", "--others", "-m", "--modified", "-d", "--deleted", "-k", "--killed",
+	"-i", "--ignored", "--directory", "-t", "-v", "-f", "--debug"
+}
+
+# branch 中只列出分支、不修改引用的选项
+BRANCH_LIST_OPTIONS = {
+	"-a", "--all", "-r", "--remotes", "-l", "--list", "-v", "-vv", "--verbose",
+	"--show-current", "--no-color", "--color", "--no-column", "--column"
+}
+
+def split_subcommand(argv):
+	"""返回 (子命令, 子命令参数)，跳过子命令之前的全局选项"""
+	i = 0
+	while i < len(argv):
+		arg = argv[i]
+		if arg in GLOBAL_OPTIONS_WITH_VALUE:
+			i += 2
+			continue
+		if arg.startswith("-"):
+			i += 1
+			continue
+		return arg, argv[i + 1:]
+	return None, []
+
+def _positionals(args):
+	"""返回 -- 之前的非选项参数"""
+	result = []
+	for arg in args:
+		if arg == "--":
+			break
+		if not arg.startswith("-"):
+			result.append(arg)
+	return result
+
+def classify_command(argv):
+	"""判断命令类型，返回 'cacheable'、'read' 或 'mutating'
+
+	cacheable 表示输出只取决于 HEAD、索引和引用；read 表示只读但会读取工作区；
+	其余命令（包括无法识别的命令）都视为可能修改仓库。
+	"""
+	subcommand, args = split_subcommand(argv)
+	if subcommand in CACHEABLE_COMMANDS:
+		# cat-file --batch 系列从标准输入读取请求
+		if subcommand == "cat-file" and any(a.startswith("--batch") for a in args):
+			return 'read'
+		return 'cacheable'
+	if subcommand in WORKTREE_READ_COMMANDS:
+		return 'read'
+	if subcommand == "ls-files":
+		if any(a.split("=", 1)[0] in LS_FILES_WORKTREE_OPTIONS for a in args):
+			return 'read'
+		return 'cacheable'
+	if subcommand == "diff":
+		if "--no-index" in args:
+			return 'read'
+		# 暂存区与 HEAD、或两个版本之间的比较不涉及工作区
+		if "--cached" in args or "--staged" in args or len(_positionals(args)) >= 2:
+			return 'cacheable'
+		return 'read'
+	if subcommand == "show":
+		return 'cacheable'
+	if subcommand == "branch":
+		if all(a in BRANCH_LIST_OPTIONS or a.startswith("--format") or a.startswith("--sort") for a in args):
+			return 'cacheable'
+		return 'mutating'
+	if subcommand == "config":
+		if any(a in ("--get", "--get-all", "--get-regexp", "-l", "--list") for a in args):
+			return 'read'
+		return 'mutating'
+	return 'mutating'
+
+class CommandCache:
+	"""只读 Git 命令的输出缓存
+
+	键为 (输出类型, 工作目录, 参数列表, 允许的返回码)，值按字节数以 LRU 淘汰（复用 ObjectCache）。
+	每次查询前计算仓库签名：HEAD、索引、packed-refs、配置文件、属性文件以及 refs 下各目录的 stat 信息，
+	签名变化时整体清空。diff --cached 和 show 的输出受 .gitattributes（diff 驱动、binary、textconv）影响，
+	因此工作区中的属性文件也计入签名。通过缓存执行器运行的修改类命令在执行前后都会使缓存失效，
+	签名则保证在外部（例如终端中）修改仓库后也不会返回旧的输出。
+
+	refs_watched 为 True 时（由文件监视器维护），refs 目录的遍历结果一直复用，直到调用 refs_changed()。
+	"""
+
+	def __init__(self, git_dir, max_bytes=COMMAND_CACHE_BYTES, work_tree=None, attribute_files=None):
+		self.git_dir = git_dir
+		self.common_dir = find_common_dir(git_dir)
+		self.work_tree = work_tree
+		# 返回索引中 .gitattributes 文件相对路径的回调，用于发现子目录中的属性文件
+		self.attribute_files = attribute_files
+		# core.attributesFile 的默认位置
+		self.global_attributes = os.path.join(
+			os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"), "git", "attributes"
+		)
+		self.entries = ObjectCache(max_bytes)
+		# 超过该大小的输出不缓存，流式读取时超出后不再保留已读取的块
+		self.max_entry_bytes = max_bytes // OBJECT_CACHE_MAX_ENTRY_RATIO
+		self.hits = 0
+		self.misses = 0
+		self.invalidations = 0
+		# 每次清空后递增，清空前开始执行的命令不会写入缓存
+		self.generation = 0
+		self._signature = None
+		# refs 目录 -> (修改时间, 子目录列表)，目录未变化时不必重新列出
+		self._subdirs = {}
+		self.refs_watched = False
+		self._refs_signature = None
+		self._lock = threading.Lock()
+
+	def _compute_signature(self):
+		signature = [
+			stat_signature(os.path.join(self.git_dir, "HEAD")),
+			stat_signature(os.path.join(self.git_dir, "index")),
+			stat_signature(os.path.join(self.common_dir, "packed-refs")),
+			stat_signature(os.path.join(self.common_dir, "config")),
+			stat_signature(os.path.join(self.common_dir, "info", "attributes")),
+			stat_signature(self.global_attributes)
+		]
+		signature.extend(self._attribute_signature())
+		if self._refs_signature is None or not self.refs_watched:
+			self._refs_signature = self._walk_refs()
+		signature.append(self._refs_signature)
+		return tuple(signature)
+
+	def _attribute_signature(self):
+		"""工作区中各 .gitattributes 的 stat，根目录的文件即使不在索引中也计入"""
+		if self.work_tree is None:
+			return []
+		paths = {".gitattributes"}
+		if self.attribute_files:
+			try:
+				paths.update(self.attribute_files())
+			except Exception as e:
+				logger.warning(f"读取属性文件列表失败: {str(e)}")
+		return [(path, stat_signature(os.path.join(self.work_tree, path))) for path in sorted(paths)]
+
+	def _walk_refs(self):
+		"""refs 下各目录的修改时间
+
+		松散引用通过锁文件重命名更新，引用的创建、修改和删除都会改变所在目录的修改时间。
+		"""
+		signature = []
+		pending = [os.path.join(self.common_dir, "refs")]
+		while pending:
+			directory = pending.pop()
+			try:
+				mtime = os.stat(directory).st_mtime_ns
+			except OSError:
+				continue
+			signature.append((directory, mtime))
+			cached = self._subdirs.get(directory)
+			if cached is None or cached[0] != mtime:
+				try:
+					with os.scandir(directory) as it:
+						cached = (mtime, [e.path for e in it if e.is_dir(follow_symlinks=False)])
+				except OSError:
+					continue
+				self._subdirs[directory] = cached
+			pending.extend(cached[1])
+		return tuple(signature)
+
+	def refs_changed(self):
+		"""文件监视器发现 refs 或 packed-refs 变化时调用，下次查询重新遍历 refs"""
+		with self._lock:
+			self._refs_signature = None
+
+	def lookup(self, kind, argv, cwd=None, input=None, ok_codes=(0,)):
+		"""返回命令的缓存令牌，命令不可缓存时返回 None
+
+		kind 区分同一命令的不同输出形式（字节或解码后的文本）。
+		"""
+		if input is not None or classify_command(argv) != 'cacheable':
+			return None
+		with self._lock:
+			signature = self._compute_signature()
+			if signature != self._signature:
+				if self._signature is not None:
+					self._clear()
+				self._signature = signature
+			return ((kind, cwd, tuple(argv), tuple(ok_codes)), self.generation)
+
+	def run(self, kind, argv, execute, cwd=None, input=None, ok_codes=(0,)):
+		"""通过缓存执行命令，execute() 实际执行命令并返回输出
+
+		修改类命令在执行前后各清空一次缓存：执行前清空使正在运行的只读命令不再写入，
+		执行后清空丢弃执行期间写入的结果。
+		"""
+		if classify_command(argv) == 'mutating':
+			self.invalidate()
+			try:
+				return execute()
+			finally:
+				self.invalidate()
+
+		token = self.lookup(kind, argv, cwd, input, ok_codes)
+		if token is None:
+			return execute()
+		output = self.get(token)
+		if output is None:
+			output = execute()
+			self.put(token, output)
+		return output
+
+	def get(self, token):
+		"""返回缓存的输出，未命中时返回 None"""
+		value = self.entries.get(token[0])
+		with self._lock:
+			if value is None:
+				self.misses += 1
+				return None
+			self.hits += 1
+		return value[1]
+
+	def put(self, token, output):
+		"""缓存命令输出，命令执行期间缓存被清空过时不写入"""
+		with self._lock:
+			if token[1] != self.generation:
+				return
+		self.entries.put(token[0], (token[0][0], output))
+
+	def invalidate(self):
+		"""清空缓存"""
+		with self._lock:
+			self._clear()
+			self._signature = None
+			self._refs_signature = None
+
+	def _clear(self):
+		self.entries.clear()
+		self.generation += 1
+		self.invalidations += 1
+
+	def stats(self):
+		"""返回命中、未命中、失效次数以及当前缓存的条目数和字节数"""
+		with self._lock:
+			return {
+				'hits': self.hits,
+				'misses': self.misses,
+				'invalidations': self.invalidations,
+				'entries': len(self.entries.entries),
+				'bytes': self.entries.size
+			}
@@ -0,0 +1,26 @@
+import os
+
+from aicommit_git.runner import GitCommandRunner
+from aicommit_git.clone import build_clone_command
+
+class GitCommands:
+	@staticmethod
+	def run_command(command, cwd=None):
+		"""运行 Git 命令
+
+		command 可以是参数列表或完整的命令字符串，均不经过 shell 直接执行。
+		"""
+		output = GitCommandRunner(cwd).run(command)
+		return output.decode('utf-8', errors='replace')
+
+	@staticmethod
+	def clone(url, path, **options):
+		"""克隆仓库，options 参见 build_clone_command"""
+		return GitCommands.run_command(build_clone_command(url, path, **options))
+
+	@staticmethod
+	def init(path):
+		"""初始化仓库"""
+		if not os.path.exists(path):
+			os.makedirs(path)
+		return GitCommands.run_command(["init"], cwd=path)
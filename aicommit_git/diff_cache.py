@@ -0,0 +1,335 @@
+import os
+import sys
+import time
+import zlib
+import shutil
+import sqlite3
+import hashlib
+import threading
+import logging
+
+from aicommit_git.object_store import ObjectCache
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 持久差异缓存的目录，所有仓库共用
+DIFF_CACHE_DIR = os.path.join(os.path.expanduser("~/.aicommit"), "cache", "diffs")
+
+# 保存差异的 SQLite 数据库文件名
+DIFF_CACHE_DATABASE = "diffs.sqlite3"
+
+# 磁盘上压缩后差异的默认总字节数上限
+DIFF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# 超过上限时淘汰到该比例，避免每次保存都触发淘汰
+DIFF_CACHE_LOW_WATERMARK = 0.8
+
+# zlib 压缩级别，差异文本重复度高，中等级别已接近最高压缩率
+DIFF_CACHE_COMPRESSION_LEVEL = 6
+
+# 空闲页超过该数量时归还给文件系统
+DIFF_CACHE_VACUUM_PAGES = 1024
+
+# 批量查询时每条 SQL 的参数数量，低于 SQLite 的默认上限
+DIFF_CACHE_QUERY_BATCH = 500
+
+# 内存中保存的差异的默认字节数上限
+DIFF_MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+
+# 差异文本格式的版本，get_diffs 的输出格式变化时递增，使旧的缓存条目不再命中
+DIFF_CACHE_FORMAT = 1
+
+# 超过该时间（秒）未使用的条目在 save() 时删除
+DIFF_CACHE_MAX_AGE = 7 * 24 * 3600
+
+# 修改时间距今不足该时间（纳秒）的文件可能在同一时间粒度内再次被修改，stat 不能代表内容，不生成标识
+DIFF_CACHE_RACY_NS = 2 * 1000000000
+
+DIFF_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS diffs (
+	key TEXT PRIMARY KEY,
+	data BLOB NOT NULL,
+	size INTEGER NOT NULL,
+	raw_size INTEGER NOT NULL,
+	accessed REAL NOT NULL,
+	repository TEXT
+);
+CREATE INDEX IF NOT EXISTS diffs_accessed ON diffs (accessed);
+"""
+
+def diff_cache_key(*parts):
+	"""由各组成部分计算缓存标识（十六进制 SHA-1）"""
+	digest = hashlib.sha1()
+	for part in parts:
+		digest.update(repr(part).encode('utf-8', errors='surrogateescape'))
+		digest.update(b"\0")
+	return digest.hexdigest()
+
+class DiffMemoryCache(ObjectCache):
+	"""差异的内存 LRU 层，值为 (是否已写入磁盘, 差异文本)，按字符串实际占用的内存计算大小"""
+
+	def sizeof(self, value):
+		return sys.getsizeof(value[1])
+
+class DiffCache:
+	"""按内容标识寻址的持久差异缓存
+
+	标识由文件在 HEAD 和暂存区中的对象 ID、工作区的 stat 签名以及差异选项计算
+	（参见 GitRepository.get_diff_keys），内容不变时跨进程保持不变，重新打开仓库后无需重新计算。
+
+	所有仓库的差异以 zlib 压缩后保存在同一个 SQLite 数据库中（WAL 模式，每个线程一个连接），
+	写入和淘汰都在事务中完成，进程崩溃不会留下写了一半的条目。压缩后的总大小超过 max_bytes 时，
+	put_many() 在写入的同一事务中按最近使用时间淘汰；save() 写回最近使用时间并删除超过
+	max_age 未使用的条目。淘汰后通过增量 VACUUM 把空闲页还给文件系统。
+
+	磁盘之前是按字节数限制的内存 LRU 层（memory_bytes），最近查看的差异不需要读数据库；
+	标识包含路径和内容版本，内容变化后旧版本不再被访问，自然被淘汰。
+	无法确定内容标识的差异以 persist=False 写入，只保存在内存层中，被淘汰后需要重新获取。
+	"""
+
+	def __init__(self, root=DIFF_CACHE_DIR, memory_bytes=DIFF_MEMORY_CACHE_BYTES,
+				max_bytes=DIFF_CACHE_MAX_BYTES, max_age=DIFF_CACHE_MAX_AGE):
+		self.root = root
+		self.database_path = os.path.join(root, DIFF_CACHE_DATABASE)
+		self.max_bytes = max_bytes
+		self.max_age = max_age
+		self.memory = DiffMemoryCache(memory_bytes)
+		self.memory_hits = 0
+		self.disk_hits = 0
+		self.misses = 0
+		self.disk_evictions = 0
+		# 命中过的持久条目，save() 时一并更新最近使用时间
+		self._touched = set()
+		# 数据库中压缩后的总字节数，写入时累加（已存在的条目也计入，偏大），淘汰时按实际值校正
+		self._disk_bytes = 0
+		# 保护计数器、_touched 和 _disk_bytes，线程池中的线程会同时更新它们
+		self._stats_lock = threading.Lock()
+		self._local = threading.local()
+		os.makedirs(root, exist_ok=True)
+		self._remove_legacy_files()
+		self._open_database()
+
+	def _remove_legacy_files(self):
+		"""删除旧版本每个差异一个文件的缓存"""
+		shutil.rmtree(os.path.join(self.root, "objects"), ignore_errors=True)
+		try:
+			os.remove(os.path.join(self.root, "index.json"))
+		except OSError:
+			pass
+
+	def _open_database(self):
+		"""打开数据库并建立表结构，数据库损坏时删除后重建"""
+		try:
+			self._prepare(self._connection())
+			return
+		except sqlite3.DatabaseError as e:
+			logger.warning(f"差异缓存数据库损坏，重新建立: {str(e)}")
+		self._close_connection()
+		for suffix in ("", "-wal", "-shm"):
+			try:
+				os.remove(self.database_path + suffix)
+			except OSError:
+				pass
+		self._prepare(self._connection())
+
+	def _prepare(self, connection):
+		if connection.execute("PRAGMA quick_check(1)").fetchone()[0] != "ok":
+			raise sqlite3.DatabaseError("quick_check 未通过")
+		version = connection.execute("PRAGMA user_version").fetchone()[0]
+		if version not in (0, DIFF_CACHE_FORMAT):
+			connection.execute("DROP TABLE IF EXISTS diffs")
+		connection.executescript(DIFF_CACHE_SCHEMA)
+		connection.execute(f"PRAGMA user_version = {DIFF_CACHE_FORMAT}")
+		# 新数据库在连接时已设置增量回收；以前不带该设置建立的数据库需要 VACUUM 一次才能生效
+		if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+			logger.info("差异缓存数据库启用增量回收")
+			connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+			connection.execute("VACUUM")
+		with self._stats_lock:
+			self._disk_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM diffs").fetchone()[0]
+
+	def _connection(self):
+		"""返回当前线程的数据库连接"""
+		connection = getattr(self._local, 'connection', None)
+		if connection is None:
+			connection = sqlite3.connect(self.database_path, timeout=10, isolation_level=None)
+			self._local.connection = connection
+			# auto_vacuum 必须在切换到 WAL 和建表之前设置，否则写入文件头后不再生效
+			connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+			connection.execute("PRAGMA journal_mode = WAL")
+			connection.execute("PRAGMA synchronous = NORMAL")
+		return connection
+
+	def _close_connection(self):
+		connection = getattr(self._local, 'connection', None)
+		if connection is not None:
+			connection.close()
+			self._local.connection = None
+
+	def get(self, key):
+		"""返回标识对应的差异文本，不存在时返回 None"""
+		value = self.memory.get(key)
+		if value is not None:
+			with self._stats_lock:
+				self.memory_hits += 1
+				if value[0]:
+					self._touched.add(key)
+			return value[1]
+		try:
+			row = self._connection().execute("SELECT data FROM diffs WHERE key = ?", (key,)).fetchone()
+			text = zlib.decompress(row[0]).decode('utf-8', errors='surrogateescape') if row else None
+		except (sqlite3.Error, zlib.error) as e:
+			logger.error(f"读取差异缓存失败: {str(e)}")
+			text = None
+		if text is None:
+			with self._stats_lock:
+				self.misses += 1
+			return None
+		self.memory.put(key, (True, text))
+		with self._stats_lock:
+			self._touched.add(key)
+			self.disk_hits += 1
+		return text
+
+	def __contains__(self, key):
+		return bool(self.contains_many([key]))
+
+	def contains_many(self, keys):
+		"""返回 keys 中已缓存的标识集合"""
+		found = {key for key in keys if key in self.memory.entries}
+		rest = [key for key in keys if key not in found]
+		try:
+			connection = self._connection()
+			for start in range(0, len(rest), DIFF_CACHE_QUERY_BATCH):
+				batch = rest[start:start + DIFF_CACHE_QUERY_BATCH]
+				placeholders = ",".join("?" * len(batch))
+				rows = connection.execute(f"SELECT key FROM diffs WHERE key IN ({placeholders})", batch)
+				found.update(row[0] for row in rows)
+		except sqlite3.Error as e:
+			logger.error(f"查询差异缓存失败: {str(e)}")
+		return found
+
+	def put(self, key, text, repository=None, persist=True):
+		"""写入差异文本，同一标识的内容相同，已存在时只更新使用时间"""
+		self.put_many({key: text}, repository, persist)
+
+	def put_many(self, diffs, repository=None, persist=True):
+		"""在一个事务中写入多个 标识 -> 差异文本"""
+		for key, text in diffs.items():
+			self.memory.put(key, (persist, text))
+		if not persist or not diffs:
+			return
+		# 压缩在事务之外进行，缩短持有写锁的时间
+		now = time.time()
+		rows = []
+		for key, text in diffs.items():
+			data = text.encode('utf-8', errors='surrogateescape')
+			compressed = zlib.compress(data, DIFF_CACHE_COMPRESSION_LEVEL)
+			rows.append((key, compressed, len(compressed), len(data), now, repository))
+		with self._stats_lock:
+			self._disk_bytes += sum(row[2] for row in rows)
+			over_limit = self._disk_bytes > self.max_bytes
+		try:
+			connection = self._connection()
+			evicted = 0
+			with connection:
+				connection.execute("BEGIN IMMEDIATE")
+				connection.executemany(
+					"INSERT INTO diffs (key, data, size, raw_size, accessed, repository) VALUES (?, ?, ?, ?, ?, ?) "
+					"ON CONFLICT (key) DO UPDATE SET accessed = excluded.accessed",
+					rows
+				)
+				# 一次刷新写入的差异也不能超过上限，超过时在同一事务中淘汰
+				if over_limit:
+					evicted = self._enforce_limit(connection)
+			if evicted:
+				self._compact(connection)
+		except sqlite3.Error as e:
+			logger.error(f"写入差异缓存失败: {str(e)}")
+
+	def release(self, key):
+		"""不再使用某个标识，只保存在内存中的条目随之丢弃，持久条目保留供以后复用"""
+		value = self.memory.get(key)
+		if value is not None and not value[0]:
+			self.memory.discard(key)
+
+	def save(self):
+		"""写回最近使用时间，按年龄和总大小淘汰条目，回收空闲页"""
+		with self._stats_lock:
+			touched, self._touched = self._touched, set()
+		now = time.time()
+		try:
+			connection = self._connection()
+			with connection:
+				connection.execute("BEGIN IMMEDIATE")
+				connection.executemany("UPDATE diffs SET accessed = ? WHERE key = ?", ((now, key) for key in touched))
+				expired = connection.execute("DELETE FROM diffs WHERE accessed < ?", (now - self.max_age,)).rowcount
+				if expired:
+					self._count_evictions(expired)
+				self._enforce_limit(connection)
+			self._compact(connection)
+		except sqlite3.Error as e:
+			logger.error(f"保存差异缓存失败: {str(e)}")
+
+	def _enforce_limit(self, connection):
+		"""在当前事务中校正总大小，超过 max_bytes 时按最近使用时间淘汰到低水位，返回删除的条目数"""
+		total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM diffs").fetchone()[0]
+		evicted = 0
+		if total > self.max_bytes:
+			excess = total - int(self.max_bytes * DIFF_CACHE_LOW_WATERMARK)
+			keys = []
+			freed = 0
+			for key, size in connection.execute("SELECT key, size FROM diffs ORDER BY accessed"):
+				keys.append((key,))
+				freed += size
+				if freed >= excess:
+					break
+			connection.executemany("DELETE FROM diffs WHERE key = ?", keys)
+			total -= freed
+			evicted = len(keys)
+			self._count_evictions(evicted)
+		with self._stats_lock:
+			self._disk_bytes = total
+		return evicted
+
+	def _count_evictions(self, count):
+		with self._stats_lock:
+			self.disk_evictions += count
+		logger.debug(f"差异缓存淘汰 {count} 个条目")
+
+	def _compact(self, connection):
+		"""空闲页较多时归还给文件系统，并截断 WAL 文件
+
+		两者都由 SQLite 在自身的日志保护下完成，中途崩溃不会损坏数据库。
+		"""
+		free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+		if free_pages > DIFF_CACHE_VACUUM_PAGES:
+			connection.execute("PRAGMA incremental_vacuum").fetchall()
+			logger.debug(f"差异缓存回收 {free_pages} 个空闲页")
+		connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+	def stats(self):
+		try:
+			entries, size, raw_size = self._connection().execute(
+				"SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM diffs"
+			).fetchone()
+		except sqlite3.Error:
+			entries = size = raw_size = 0
+		memory = self.memory
+		with self._stats_lock:
+			memory_hits, disk_hits, misses, disk_evictions = self.memory_hits, self.disk_hits, self.misses, self.disk_evictions
+		return {
+			'entries': entries,
+			'bytes': size,
+			'raw_bytes': raw_size,
+			'limit': self.max_bytes,
+			'disk_evictions': disk_evictions,
+			'memory_entries': len(memory.entries),
+			'memory_bytes': memory.size,
+			'memory_limit': memory.max_bytes,
+			'memory_hits': memory_hits,
+			'disk_hits': disk_hits,
+			'misses': misses,
+			'evictions': memory.evictions
+		}
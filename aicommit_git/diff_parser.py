@@ -0,0 +1,200 @@
+import os
+
+# 补丁中每个文件的起始行
+FILE_HEADER_PREFIXES = (b"diff --git ", b"diff --cc ", b"diff --combined ")
+
+# 扩展头中会改变目标路径的行
+TARGET_PATH_PREFIXES = (b"rename to ", b"copy to ")
+
+# 未合并文件的提示行，不属于任何补丁
+UNMERGED_PREFIX = b"* Unmerged path "
+
+# Git C 风格路径转义
+C_ESCAPES = {
+	ord("a"): 7, ord("b"): 8, ord("t"): 9, ord("n"): 10,
+	ord("v"): 11, ord("f"): 12, ord("r"): 13,
+	ord('"'): ord('"'), ord("\\"): ord("\\")
+}
+
+def iter_lines(chunks, max_length=None):
+	"""将字节块流切分为行（不含换行符），逐行产出
+
+	跨块的不完整行追加到 bytearray 中，在每块内用 find 查找换行符，很长的行不会被反复复制。
+	指定 max_length 时，超长的行只保留前 max_length + 1 字节（调用方据此判断超出上限），
+	其余部分直到换行符为止直接丢弃，单行占用的内存不超过上限。
+	"""
+	limit = None if max_length is None else max_length + 1
+	pending = bytearray()
+	for chunk in chunks:
+		if not chunk:
+			continue
+		start = 0
+		end = chunk.find(b"\n")
+		while end >= 0:
+			stop = end if limit is None else min(end, start + limit - len(pending))
+			if pending:
+				pending += chunk[start:stop]
+				yield bytes(pending)
+				pending.clear()
+			else:
+				yield chunk[start:stop]
+			start = end + 1
+			end = chunk.find(b"\n", start)
+		# 最后一段可能不完整，留到下一块继续拼接
+		stop = len(chunk) if limit is None else min(len(chunk), start + limit - len(pending))
+		if stop > start:
+			pending += chunk[start:stop]
+	if pending:
+		yield bytes(pending)
+
+def unquote_c_path(data):
+	"""解析 Git 的 C 风格引号路径，返回 (路径字节, 剩余字节)
+
+	未加引号的输入原样返回，剩余部分为空。
+	"""
+	if not data.startswith(b'"'):
+		return data, b""
+
+	result = bytearray()
+	i = 1
+	while i < len(data):
+		c = data[i]
+		if c == ord('"'):
+			return bytes(result), data[i + 1:]
+		if c == ord("\\") and i + 1 < len(data):
+			nxt = data[i + 1]
+			if ord("0") <= nxt <= ord("7"):
+				result.append(int(data[i + 1:i + 4], 8))
+				i += 4
+				continue
+			result.append(C_ESCAPES.get(nxt, nxt))
+			i += 2
+			continue
+		result.append(c)
+		i += 1
+	return bytes(result), b""
+
+def parse_header_path(line):
+	"""从文件头中解析目标路径"""
+	for prefix in (b"diff --cc ", b"diff --combined "):
+		if line.startswith(prefix):
+			return os.fsdecode(unquote_c_path(line[len(prefix):])[0])
+
+	rest = line[len(b"diff --git "):]
+	if rest.endswith(b'"'):
+		# 目标路径带引号，取最后一个以 "b/ 开头的部分
+		target = unquote_c_path(rest[rest.rfind(b' "b/') + 1:])[0]
+	elif rest.startswith(b'"'):
+		# 只有源路径带引号
+		target = unquote_c_path(rest)[1].lstrip(b" ")
+	else:
+		# 两侧都未加引号时，非重命名的文件两侧路径相同，取后半部分
+		target = rest[(len(rest) + 1) // 2:]
+	return os.fsdecode(target[2:])
+
+def iter_diff_events(chunks, max_bytes=None, max_lines=None):
+	"""流式解析 `git diff --patch` 的输出，按顺序产出文件头和 hunk 事件
+
+	事件为字典:
+	- {'type': 'file', 'path': 路径, 'lines': [文件头各行]}
+	- {'type': 'hunk', 'path': 路径, 'header': "@@ ... @@" 行, 'lines': [各行]}
+	- {'type': 'truncated', 'path': 路径, 'reason': 'bytes' 或 'lines', 'limit': 上限}
+	行均为不含换行符的字节串。max_bytes/max_lines 为每个文件的上限，超出时产出已读取的部分和
+	truncated 事件，并丢弃该文件剩余的内容，因此内存占用与补丁总大小无关。
+	"""
+	path = None
+	header = None
+	hunk = None
+	used_bytes = used_lines = 0
+	truncated = False
+
+	# 单行超过字节上限时同样只保留上限以内的部分，该文件随后被截断
+	for line in iter_lines(chunks, max_bytes or None):
+		if line.startswith(FILE_HEADER_PREFIXES):
+			if header is not None:
+				yield {'type': 'file', 'path': path, 'lines': header}
+			if hunk is not None:
+				yield hunk
+			path = parse_header_path(line)
+			header = [line]
+			hunk = None
+			used_bytes = len(line) + 1
+			used_lines = 1
+			truncated = False
+			continue
+
+		if line.startswith(UNMERGED_PREFIX) or truncated or path is None:
+			continue
+
+		used_bytes += len(line) + 1
+		used_lines += 1
+		if (max_bytes and used_bytes > max_bytes) or (max_lines and used_lines > max_lines):
+			# 超出上限: 产出已读取的部分，丢弃该文件剩余的内容
+			if header is not None:
+				yield {'type': 'file', 'path': path, 'lines': header}
+				header = None
+			if hunk is not None:
+				yield hunk
+				hunk = None
+			if max_bytes and used_bytes > max_bytes:
+				yield {'type': 'truncated', 'path': path, 'reason': 'bytes', 'limit': max_bytes}
+			else:
+				yield {'type': 'truncated', 'path': path, 'reason': 'lines', 'limit': max_lines}
+			truncated = True
+			continue
+
+		if line.startswith(b"@@"):
+			if header is not None:
+				yield {'type': 'file', 'path': path, 'lines': header}
+				header = None
+			if hunk is not None:
+				yield hunk
+			hunk = {'type': 'hunk', 'path': path, 'header': line, 'lines': []}
+		elif hunk is not None:
+			hunk['lines'].append(line)
+		elif header is not None:
+			# 扩展头中的 rename to/copy to 会改变目标路径
+			if line.startswith(TARGET_PATH_PREFIXES):
+				target = line.split(b" ", 2)[2]
+				path = os.fsdecode(unquote_c_path(target)[0])
+			header.append(line)
+
+	if header is not None:
+		yield {'type': 'file', 'path': path, 'lines': header}
+	if hunk is not None:
+		yield hunk
+
+def truncation_marker(event):
+	"""truncated 事件对应的提示行"""
+	unit = "字节" if event['reason'] == 'bytes' else "行"
+	return f"[差异已截断: 超过 {event['limit']} {unit}]".encode('utf-8')
+
+def iter_event_lines(events):
+	"""将事件还原为补丁的各行（字节），截断处插入提示行"""
+	for event in events:
+		if event['type'] == 'file':
+			yield from event['lines']
+		elif event['type'] == 'hunk':
+			yield event['header']
+			yield from event['lines']
+		else:
+			yield truncation_marker(event)
+
+def iter_file_patches(chunks, max_bytes=None, max_lines=None):
+	"""解析 `git diff --patch` 的输出，按文件逐个产出 (路径, 补丁字节)
+
+	路径取自 `diff --git` 头，重命名和复制以 `rename to`/`copy to` 行为准。
+	每次只在内存中保留一个文件的补丁，超过上限的部分以提示行代替。
+	"""
+	path = None
+	current = []
+	for event in iter_diff_events(chunks, max_bytes, max_lines):
+		# 每个文件恰好产出一个 file 事件，且位于该文件的 hunk 之前
+		if event['type'] == 'file':
+			if path is not None:
+				yield path, b"\n".join(current)
+			path = event['path']
+			current = []
+		current.extend(iter_event_lines([event]))
+	if path is not None:
+		yield path, b"\n".join(current)
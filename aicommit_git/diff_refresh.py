@@ -0,0 +1,133 @@
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 所有仓库的差异刷新共用的线程数上限
+DIFF_REFRESH_WORKERS = 4
+
+# 每批获取差异的文件数，每批运行一次暂存区和一次工作区的 git diff；
+# 不超过 PATHSPEC_ARG_LIMIT，使路径直接作为 pathspec 传给 Git
+DIFF_REFRESH_BATCH = 200
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_refresh_executor():
+	"""获取（必要时创建）差异刷新共用的线程池"""
+	global _executor
+	with _executor_lock:
+		if _executor is None:
+			_executor = ThreadPoolExecutor(max_workers=DIFF_REFRESH_WORKERS, thread_name_prefix="diff-refresh")
+		return _executor
+
+class DiffRefresher:
+	"""在有界线程池中分批刷新差异缓存
+
+	每次 start() 得到一个新的代号，旧代号的刷新随即失效：尚未开始的批次不再执行，
+	正在执行的批次完成后其结果不再回调。待刷新的路径保存在一个队列中，
+	prioritize() 可以随时把路径（如可见或选中的文件）移到队首。
+	回调在线程池的线程中调用，调用方需要自行切换到界面线程。
+	"""
+
+	def __init__(self, executor=None, batch_size=DIFF_REFRESH_BATCH, workers=DIFF_REFRESH_WORKERS):
+		self.executor = executor or get_refresh_executor()
+		self.batch_size = batch_size
+		self.workers = workers
+		self.generation = 0
+		self._lock = threading.Lock()
+		self._pending = deque()
+		self._queued = set()
+		self._active = 0
+
+	def start(self, repo, status, paths, priority=(), on_batch=None, on_done=None):
+		"""取消正在进行的刷新，开始刷新 paths 中文件的差异，返回本次刷新的代号
+
+		on_batch(代号, 路径 -> 差异文本) 在每批完成后调用，
+		on_done(代号, 文件数, 耗时秒) 在全部批次完成且刷新未被取消时调用。
+		"""
+		paths = list(dict.fromkeys(paths))
+		with self._lock:
+			self.generation += 1
+			generation = self.generation
+			self._pending = deque(paths)
+			self._queued = set(paths)
+			self._prioritize_locked(priority)
+			workers = min(self.workers, -(-len(paths) // self.batch_size))
+			self._active = workers
+		logger.debug(f"开始刷新差异缓存 (代号 {generation}): {len(paths)} 个文件，{workers} 个线程")
+
+		if not workers:
+			if on_done:
+				on_done(generation, 0, 0.0)
+			return generation
+
+		started = time.time()
+		for _ in range(workers):
+			self.executor.submit(self._work, generation, repo, status, on_batch, on_done, len(paths), started)
+		return generation
+
+	def prioritize(self, paths):
+		"""将仍在等待的路径按给定顺序移到队首，已在处理或已完成的路径忽略"""
+		with self._lock:
+			self._prioritize_locked(paths)
+
+	def _prioritize_locked(self, paths):
+		front = [p for p in dict.fromkeys(paths) if p in self._queued]
+		if not front:
+			return
+		wanted = set(front)
+		self._pending = deque(front + [p for p in self._pending if p not in wanted])
+
+	def cancel(self):
+		"""取消正在进行的刷新"""
+		with self._lock:
+			self.generation += 1
+			self._pending = deque()
+			self._queued = set()
+
+	def is_current(self, generation):
+		return generation == self.generation
+
+	def _next_batch(self, generation):
+		"""取出下一批路径，返回 (批次, 是否为最后一个结束的线程)；队列为空或代号失效时批次为 None"""
+		with self._lock:
+			if generation != self.generation:
+				return None, False
+			batch = []
+			while self._pending and len(batch) < self.batch_size:
+				path = self._pending.popleft()
+				self._queued.discard(path)
+				batch.append(path)
+			if batch:
+				return batch, False
+			self._active -= 1
+			return None, self._active == 0
+
+	def _work(self, generation, repo, status, on_batch, on_done, total, started):
+		"""线程池任务: 依次取出批次获取差异，直到队列为空或代号失效"""
+		while True:
+			batch, last = self._next_batch(generation)
+			if batch is None:
+				break
+			try:
+				diffs = repo.get_diffs(batch, status)
+			except Exception as e:
+				logger.error(f"刷新差异缓存失败: {str(e)}", exc_info=True)
+				continue
+			if on_batch and self.is_current(generation):
+				on_batch(generation, diffs)
+
+		if not self.is_current(generation):
+			logger.debug(f"差异缓存刷新已取消 (代号 {generation})")
+			return
+		if not last:
+			return
+		elapsed = time.time() - started
+		logger.debug(f"差异缓存刷新完成 (代号 {generation})，共 {total} 个文件，耗时: {elapsed:.3f}秒")
+		if on_done:
+			on_done(generation, total, elapsed)
@@ -0,0 +1,49 @@
+import os
+
+def find_git_dir(path):
+	"""查找工作区对应的 Git 目录，支持 `.git` 文件形式的工作树和子模块"""
+	current = os.path.abspath(path)
+	while True:
+		dot_git = os.path.join(current, ".git")
+		if os.path.isdir(dot_git):
+			return dot_git
+		if os.path.isfile(dot_git):
+			with open(dot_git, 'r', encoding='utf-8') as f:
+				content = f.read().strip()
+			if content.startswith("gitdir:"):
+				git_dir = content[len("gitdir:"):].strip()
+				return os.path.normpath(os.path.join(current, git_dir))
+		parent = os.path.dirname(current)
+		if parent == current:
+			return None
+		current = parent
+
+def find_common_dir(git_dir):
+	"""获取共享的 Git 目录（对象库和引用所在位置），普通仓库即 Git 目录本身"""
+	commondir_file = os.path.join(git_dir, "commondir")
+	if os.path.isfile(commondir_file):
+		with open(commondir_file, 'r', encoding='utf-8') as f:
+			common_dir = f.read().strip()
+		return os.path.normpath(os.path.join(git_dir, common_dir))
+	return git_dir
+
+def read_hash_size(git_dir):
+	"""根据 extensions.objectFormat 返回对象 ID 的字节长度"""
+	config_file = os.path.join(find_common_dir(git_dir), "config")
+	try:
+		with open(config_file, 'r', encoding='utf-8', errors='replace') as f:
+			for line in f:
+				key, _, value = line.partition("=")
+				if key.strip().lower() == "objectformat" and value.strip().lower() == "sha256":
+					return 32
+	except OSError:
+		pass
+	return 20
+
+def stat_signature(path):
+	"""返回文件的 (mtime_ns, size, inode)，文件不存在时返回 None"""
+	try:
+		st = os.stat(path)
+	except OSError:
+		return None
+	return (st.st_mtime_ns, st.st_size, st.st_ino)
@@ -0,0 +1,198 @@
+import os
+import time
+import logging
+
+from aicommit_git.runner import GitCommandRunner
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 每项操作的测量次数，取最短耗时
+HEALTH_REPEAT = 3
+
+# 测量 log 时读取的提交数量
+HEALTH_LOG_COMMITS = 2000
+
+# 松散对象或 pack 数量超过这些值时建议运行维护任务
+MAINTENANCE_LOOSE_OBJECTS = 5000
+MAINTENANCE_PACKS = 20
+
+# 计时的操作：名称 -> Git 参数
+HEALTH_OPERATIONS = {
+	'status': ["status", "--porcelain=v2", "-z", "--untracked-files=all"],
+	'diff': ["diff", "--no-ext-diff", "--name-only", "-z"],
+	'log': ["log", f"-n{HEALTH_LOG_COMMITS}", "--format=%H"]
+}
+
+def _config_enabled(value):
+	return value.strip().lower() in ("true", "yes", "on", "1")
+
+class RepositoryDoctor:
+	"""检查仓库是否启用了 Git 的加速选项，按需启用并比较启用前后的耗时
+
+	计时使用单独的执行器，不经过仓库的命令缓存，也不计入命令统计。
+	check() 返回的每项检查为字典：key、name、state（'ok'、'missing'、'not_needed'、'unsupported'）、
+	detail、fixable；fix() 只处理 state 为 missing 的项目。
+	"""
+
+	def __init__(self, repo):
+		self.repo = repo
+		# 与仓库共用进程额度，测量时不会与后台刷新同时占满 CPU
+		self.runner = GitCommandRunner(repo.path, limiter=repo.limiter)
+
+	def measure(self, repeat=HEALTH_REPEAT):
+		"""返回 操作 -> 最短耗时毫秒；没有提交的仓库不测量 log
+
+		每项操作先不计时地运行一次，让文件系统缓存、fsmonitor 守护进程和未跟踪文件缓存进入稳定状态。
+		"""
+		has_head = self._run(["rev-parse", "--verify", "--quiet", "HEAD"], ok_codes=(0, 1)).strip() != ""
+		timings = {}
+		for name, command in HEALTH_OPERATIONS.items():
+			if name == 'log' and not has_head:
+				continue
+			self.runner.run(command)
+			best = None
+			for _ in range(repeat):
+				start = time.perf_counter()
+				self.runner.run(command)
+				elapsed = (time.perf_counter() - start) * 1000
+				best = elapsed if best is None else min(best, elapsed)
+			timings[name] = best
+		logger.info(f"仓库耗时测量: {timings}")
+		return timings
+
+	def _run(self, command, ok_codes=(0,)):
+		return self.runner.run(command, ok_codes=ok_codes).decode('utf-8', errors='replace')
+
+	def _get_config(self, key):
+		# 返回码 1 表示未设置
+		return self._run(["config", "--get", key], ok_codes=(0, 1)).strip()
+
+	def _build_options(self):
+		return self._run(["version", "--build-options"])
+
+	def _count_objects(self):
+		counts = {}
+		for line in self._run(["count-objects", "-v"]).splitlines():
+			key, _, value = line.partition(":")
+			try:
+				counts[key.strip()] = int(value.strip())
+			except ValueError:
+				pass
+		return counts
+
+	def _maintenance_tasks(self):
+		"""按对象数量选择维护任务，incremental-repack 在没有 pack 时会失败"""
+		counts = self._count_objects()
+		tasks = ["--task=pack-refs"]
+		if counts.get('count', 0) > MAINTENANCE_LOOSE_OBJECTS:
+			tasks.append("--task=loose-objects")
+		if counts.get('packs', 0) > MAINTENANCE_PACKS:
+			tasks.append("--task=incremental-repack")
+		return tasks
+
+	def _start_fsmonitor(self):
+		"""启动 fsmonitor 守护进程，否则第一次 status 才启动它，测量结果包含守护进程的首次扫描"""
+		try:
+			self.runner.run(["fsmonitor--daemon", "start"])
+		except Exception as e:
+			# 守护进程已在运行时 start 返回错误
+			if "already running" not in str(e):
+				raise
+
+	def check(self):
+		"""检查各项加速选项，返回检查结果列表"""
+		results = []
+
+		def add(key, name, state, detail):
+			results.append({'key': key, 'name': name, 'state': state, 'detail': detail, 'fixable': state == 'missing'})
+
+		many_files = _config_enabled(self._get_config("feature.manyFiles"))
+		untracked_cache = self._get_config("core.untrackedCache")
+		if _config_enabled(untracked_cache) or (many_files and not untracked_cache):
+			add('untracked_cache', "未跟踪文件缓存 (core.untrackedCache)", 'ok', "已启用")
+		else:
+			add('untracked_cache', "未跟踪文件缓存 (core.untrackedCache)", 'missing', "git status 每次都要扫描所有目录")
+
+		if "fsmonitor--daemon" not in self._build_options():
+			add('fsmonitor', "文件系统监视 (core.fsmonitor)", 'unsupported', "当前平台的 Git 不包含内置的 fsmonitor 守护进程")
+		elif _config_enabled(self._get_config("core.fsmonitor")):
+			add('fsmonitor', "文件系统监视 (core.fsmonitor)", 'ok', "已启用")
+		else:
+			add('fsmonitor', "文件系统监视 (core.fsmonitor)", 'missing', "git status 需要对每个文件执行 lstat")
+
+		if many_files:
+			add('many_files', "大仓库默认配置 (feature.manyFiles)", 'ok', "已启用")
+		else:
+			add('many_files', "大仓库默认配置 (feature.manyFiles)", 'missing', "未使用索引 v4 等适合大仓库的默认值")
+
+		# 索引读取器不支持拆分索引（link 扩展），启用后刷新状态会回退到完整的 git status
+		if _config_enabled(self._get_config("core.splitIndex")):
+			add('split_index', "关闭拆分索引 (core.splitIndex)", 'missing', "拆分索引使快速状态检查回退到 git status")
+		else:
+			add('split_index', "关闭拆分索引 (core.splitIndex)", 'ok', "未启用")
+
+		objects_dir = os.path.join(self.repo.objects.common_dir if self.repo.objects else self.repo.git_dir, "objects")
+		has_graph = (
+			os.path.exists(os.path.join(objects_dir, "info", "commit-graph"))
+			or os.path.isdir(os.path.join(objects_dir, "info", "commit-graphs"))
+		)
+		if self._get_config("core.commitGraph").lower() == "false":
+			add('commit_graph', "提交图 (commit-graph)", 'missing', "core.commitGraph 已被关闭")
+		elif has_graph:
+			add('commit_graph', "提交图 (commit-graph)", 'ok', "已生成")
+		else:
+			add('commit_graph', "提交图 (commit-graph)", 'missing', "log 和 ahead/behind 需要逐个解析提交对象")
+
+		counts = self._count_objects()
+		loose, packs = counts.get('count', 0), counts.get('packs', 0)
+		if loose > MAINTENANCE_LOOSE_OBJECTS or packs > MAINTENANCE_PACKS:
+			add('maintenance', "对象维护 (git maintenance)", 'missing', f"{loose} 个松散对象，{packs} 个 pack")
+		else:
+			add('maintenance', "对象维护 (git maintenance)", 'ok', f"{loose} 个松散对象，{packs} 个 pack")
+		return results
+
+	def fix(self, keys):
+		"""启用指定的加速选项或运行维护任务，返回实际处理的项目"""
+		fixers = {
+			'untracked_cache': [
+				["config", "core.untrackedCache", "true"],
+				["update-index", "--untracked-cache"]
+			],
+			'fsmonitor': [["config", "core.fsmonitor", "true"], self._start_fsmonitor],
+			'many_files': [["config", "feature.manyFiles", "true"], ["update-index", "--index-version", "4"]],
+			'split_index': [["config", "core.splitIndex", "false"], ["update-index", "--no-split-index"]],
+			'commit_graph': [
+				["config", "core.commitGraph", "true"],
+				["commit-graph", "write", "--reachable", "--changed-paths"]
+			],
+			# loose-objects 任务只在下一次运行时删除已打包的松散对象，这里直接用 prune-packed 清理
+			'maintenance': [["maintenance", "run"] + self._maintenance_tasks(), ["prune-packed"]]
+		}
+		applied = []
+		try:
+			for key in keys:
+				commands = fixers.get(key)
+				if not commands:
+					continue
+				logger.info(f"启用仓库加速选项: {key}")
+				for command in commands:
+					if callable(command):
+						command()
+					else:
+						self.runner.run(command)
+				applied.append(key)
+		finally:
+			# 配置、索引格式和对象布局都可能已变化
+			self.repo.commands.invalidate()
+			if self.repo.objects:
+				self.repo.objects.close()
+				self.repo.objects = self.repo._open_object_store()
+		return applied
+
+	def run(self, keys, repeat=HEALTH_REPEAT):
+		"""测量、启用指定项目、再次测量，返回 {'before', 'after', 'applied'}"""
+		before = self.measure(repeat)
+		applied = self.fix(keys)
+		after = self.measure(repeat)
+		return {'before': before, 'after': after, 'applied': applied}
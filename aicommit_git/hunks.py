@@ -0,0 +1,123 @@
+import re
+import hashlib
+
+from aicommit_git.diff_parser import truncation_marker
+
+# hunk 头: @@ -旧起始行[,旧行数] +新起始行[,新行数] @@ 函数上下文
+HUNK_HEADER_RE = re.compile(rb"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$")
+
+# hunk ID 的十六进制位数
+HUNK_ID_LENGTH = 12
+
+def parse_hunk_header(header):
+	"""解析 hunk 头，返回 (旧起始行, 旧行数, 新起始行, 新行数, 函数上下文)，格式不符时返回 None"""
+	match = HUNK_HEADER_RE.match(header)
+	if not match:
+		return None
+	old_start, old_count, new_start, new_count, section = match.groups()
+	return (
+		int(old_start), 1 if old_count is None else int(old_count),
+		int(new_start), 1 if new_count is None else int(new_count),
+		section
+	)
+
+def collect_hunks(events, staged=False):
+	"""从 iter_diff_events 产出的单个文件的事件中收集 hunk 模型
+
+	返回 {'header': [文件头各行], 'hunks': [hunk], 'staged': staged, 'truncated': truncated 事件或 None}，hunk 为字典:
+	id、path、staged、header、old_start、old_count、new_start、new_count、section、lines。
+	id 由路径、所属一侧和 hunk 内容计算，不含行号，因此暂存其他 hunk 后仍保持不变；
+	内容完全相同的 hunk 按出现顺序添加序号区分。
+	差异被截断时最后一个 hunk 可能不完整，不会出现在结果中；截断之后的更改无法单独选择，暂存时总是包含在内。
+	"""
+	header = []
+	hunks = []
+	truncated = None
+	seen = {}
+	for event in events:
+		if event['type'] == 'file':
+			header = list(event['lines'])
+		elif event['type'] == 'hunk':
+			parsed = parse_hunk_header(event['header'])
+			if parsed is None:
+				continue
+			digest = hashlib.sha1(event['path'].encode('utf-8', errors='surrogateescape'))
+			digest.update(b"\0staged\0" if staged else b"\0worktree\0")
+			digest.update(b"\n".join(event['lines']))
+			hunk_id = digest.hexdigest()[:HUNK_ID_LENGTH]
+			seen[hunk_id] = seen.get(hunk_id, 0) + 1
+			if seen[hunk_id] > 1:
+				hunk_id = f"{hunk_id}-{seen[hunk_id]}"
+			old_start, old_count, new_start, new_count, section = parsed
+			hunks.append({
+				'id': hunk_id,
+				'path': event['path'],
+				'staged': staged,
+				'header': event['header'],
+				'old_start': old_start,
+				'old_count': old_count,
+				'new_start': new_start,
+				'new_count': new_count,
+				'section': section,
+				'lines': event['lines']
+			})
+		elif event['type'] == 'truncated':
+			truncated = event
+			if hunks:
+				hunks.pop()
+	return {'header': header, 'hunks': hunks, 'staged': staged, 'truncated': truncated}
+
+def hunk_stats(hunk):
+	"""返回 hunk 中 (新增行数, 删除行数)"""
+	added = removed = 0
+	for line in hunk['lines']:
+		if line.startswith(b"+"):
+			added += 1
+		elif line.startswith(b"-"):
+			removed += 1
+	return added, removed
+
+def build_patch(header, hunks, reverse=False):
+	"""用文件头和选中的 hunk 生成最小补丁（字节）
+
+	hunks 须按在文件中的顺序排列。未选中的 hunk 不再应用，之后各 hunk 在结果一侧的起始行
+	按已选中 hunk 的行数变化重新计算；行数由 `git apply --recount` 重新统计。
+	reverse 为 True 表示补丁将以 --reverse 应用（取消暂存），此时新的一侧是应用前的内容。
+	"""
+	lines = list(header)
+	offset = 0
+	for hunk in hunks:
+		if reverse:
+			new_start = hunk['new_start']
+			old_start = new_start - offset
+		else:
+			old_start = hunk['old_start']
+			new_start = old_start + offset
+		offset += hunk['new_count'] - hunk['old_count']
+		lines.append(
+			b"@@ -%d,%d +%d,%d @@" % (old_start, hunk['old_count'], new_start, hunk['new_count']) + hunk['section']
+		)
+		lines.extend(hunk['lines'])
+	return b"\n".join(lines) + b"\n"
+
+def render_hunks(models, excluded=()):
+	"""将 hunk 模型中未排除的 hunk 还原为差异文本，用于显示或生成提交信息
+
+	models 为 collect_hunks 的结果列表（通常依次为暂存区和工作区），全部 hunk 都被排除的一侧不输出。
+	被截断的一侧在末尾加上提示行：截断之后的更改不在模型中，无法排除，提交时总是包含在内。
+	"""
+	parts = []
+	for model in models:
+		hunks = [h for h in model['hunks'] if h['id'] not in excluded]
+		truncated = model['truncated']
+		if not hunks and not truncated:
+			continue
+		lines = list(model['header'])
+		for hunk in hunks:
+			lines.append(hunk['header'])
+			lines.extend(hunk['lines'])
+		if truncated:
+			lines.append(truncation_marker(truncated) + "，之后的更改未显示但会一并提交".encode('utf-8'))
+		text = b"\n".join(lines).decode('utf-8', errors='replace')
+		parts.append(f"已暂存的更改:\n{text}" if model['staged'] else text)
+	return "\n".join(parts)
@@ -0,0 +1,436 @@
+import os
+import mmap
+import stat
+import time
+import struct
+import threading
+import logging
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from aicommit_git.gitdir import stat_signature
+from aicommit_git.runner import PATHSPEC_ARG_LIMIT
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 索引文件头: 签名、版本、条目数
+INDEX_HEADER = struct.Struct(">4sLL")
+
+# 条目固定部分: ctime(s, ns), mtime(s, ns), dev, ino, mode, uid, gid, size
+ENTRY_STAT = struct.Struct(">LLLLLLLLLL")
+FLAGS = struct.Struct(">H")
+
+# 条目标志位
+FLAG_ASSUME_VALID = 0x8000
+FLAG_EXTENDED = 0x4000
+FLAG_NAME_MASK = 0x0fff
+FLAG_STAGE_SHIFT = 12
+EXT_FLAG_SKIP_WORKTREE = 0x4000
+
+# 需要回退到完整 git status 的索引扩展（拆分索引和稀疏索引）
+UNSUPPORTED_EXTENSIONS = (b"link", b"sdir")
+
+S_IFGITLINK = 0o160000
+UINT32_MASK = 0xffffffff
+
+# 并行扫描目录的线程数上限及启用并行的最少目录数
+MAX_SCAN_WORKERS = 8
+PARALLEL_SCAN_THRESHOLD = 64
+
+# 比较 stat 时只关心文件类型和可执行位
+STAT_MODE_MASK = 0o170100
+
+def worktree_signature(st):
+	"""将工作区文件的 stat 结果转换为与索引条目可比较的签名"""
+	return (st.st_mtime_ns, st.st_size & UINT32_MASK, st.st_ino & UINT32_MASK, st.st_mode & STAT_MODE_MASK)
+
+class GitIndex:
+	"""`.git/index` 的只读表示
+
+	通过 mmap 读取索引文件（支持 v2/v3/v4 格式），
+	每个字段保存在一个独立的 array 中，路径保存在列表中，按索引下标对应。
+	"""
+
+	def __init__(self, version):
+		self.version = version
+		self.paths = []
+		self.oids = []
+		self.mtime_s = array('L')
+		self.mtime_ns = array('L')
+		self.ino = array('L')
+		self.mode = array('L')
+		self.size = array('L')
+		self.flags = array('H')
+		self.skip = array('b')
+		# 是否包含本读取器无法完整处理的扩展
+		self.unsupported = False
+		# 路径 -> 阶段 0 条目下标，按需构建
+		self._positions = None
+		self._attribute_files = None
+
+	def __len__(self):
+		return len(self.paths)
+
+	@classmethod
+	def read(cls, index_path, hash_size=20):
+		"""读取索引文件，文件不存在时返回空索引"""
+		try:
+			with open(index_path, 'rb') as f:
+				if os.fstat(f.fileno()).st_size == 0:
+					return cls(2)
+				with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+					return cls._parse(data, hash_size)
+		except FileNotFoundError:
+			return cls(2)
+
+	@classmethod
+	def _parse(cls, data, hash_size):
+		signature, version, count = INDEX_HEADER.unpack_from(data, 0)
+		if signature != b"DIRC":
+			raise ValueError("无效的索引文件签名")
+		if version not in (2, 3, 4):
+			raise ValueError(f"不支持的索引版本: {version}")
+
+		index = cls(version)
+		fixed_size = ENTRY_STAT.size + hash_size
+		offset = INDEX_HEADER.size
+		previous_path = b""
+
+		for _ in range(count):
+			fields = ENTRY_STAT.unpack_from(data, offset)
+			fields_end = offset + ENTRY_STAT.size
+			flags = FLAGS.unpack_from(data, offset + fixed_size)[0]
+			path_start = offset + fixed_size + FLAGS.size
+
+			ext_flags = 0
+			if flags & FLAG_EXTENDED and version >= 3:
+				ext_flags = FLAGS.unpack_from(data, path_start)[0]
+				path_start += FLAGS.size
+
+			if version == 4:
+				# v4: 路径相对上一条目做前缀压缩，先是要删除的尾部字节数，再是以 NUL 结尾的后缀
+				strip, path_start = _read_varint(data, path_start)
+				path_end = data.find(b"\0", path_start)
+				path = previous_path[:len(previous_path) - strip] + data[path_start:path_end]
+				offset = path_end + 1
+			else:
+				name_length = flags & FLAG_NAME_MASK
+				if name_length < FLAG_NAME_MASK:
+					path_end = path_start + name_length
+				else:
+					path_end = data.find(b"\0", path_start)
+				path = data[path_start:path_end]
+				# v2/v3: 条目以 1 到 8 个 NUL 填充到 8 字节对齐
+				offset += (path_end - offset + 8) & ~7
+
+			previous_path = path
+			index.paths.append(os.fsdecode(path))
+			index.oids.append(bytes(data[fields_end:fields_end + hash_size]))
+			index.mtime_s.append(fields[2])
+			index.mtime_ns.append(fields[3])
+			index.ino.append(fields[5])
+			index.mode.append(fields[6])
+			index.size.append(fields[9])
+			index.flags.append(flags)
+			index.skip.append(1 if (flags & FLAG_ASSUME_VALID or ext_flags & EXT_FLAG_SKIP_WORKTREE) else 0)
+
+		# 检查扩展，拆分索引或稀疏索引中的条目不完整
+		end = len(data) - hash_size
+		while offset + 8 <= end:
+			name = data[offset:offset + 4]
+			length = struct.unpack_from(">L", data, offset + 4)[0]
+			if name in UNSUPPORTED_EXTENSIONS:
+				index.unsupported = True
+			offset += 8 + length
+
+		return index
+
+	def stage(self, i):
+		"""返回条目的合并阶段，0 表示普通条目"""
+		return (self.flags[i] >> FLAG_STAGE_SHIFT) & 0x3
+
+	def find_oid(self, path):
+		"""返回路径对应的普通条目（阶段 0）的对象 ID（字节），不存在时返回 None"""
+		if self._positions is None:
+			self._positions = {p: i for i, p in enumerate(self.paths) if self.stage(i) == 0}
+		i = self._positions.get(path)
+		return self.oids[i] if i is not None else None
+
+	def attribute_files(self):
+		"""返回索引中所有 .gitattributes 文件的路径"""
+		if self._attribute_files is None:
+			self._attribute_files = [
+				p for p in self.paths if p == ".gitattributes" or p.endswith("/.gitattributes")
+			]
+		return self._attribute_files
+
+	def is_trackable(self, i):
+		"""条目是否可以通过 stat 比较检测变化"""
+		return not self.skip[i] and self.stage(i) == 0 and (self.mode[i] & 0o170000) != S_IFGITLINK
+
+	def expected_signature(self, i):
+		"""返回条目对应的工作区 stat 签名 (mtime_ns, size, inode, 类型和可执行位)
+
+		与 worktree_signature() 的结果直接比较即可判断 stat 信息是否一致。
+		"""
+		mode = self.mode[i] & STAT_MODE_MASK
+		if stat.S_ISLNK(mode):
+			# 符号链接的权限位总是 0777
+			mode |= 0o100
+		return (
+			self.mtime_s[i] * 1000000000 + self.mtime_ns[i],
+			self.size[i],
+			self.ino[i],
+			mode
+		)
+
+	def is_racy(self, i, index_mtime_ns):
+		"""条目的修改时间不早于索引文件本身时，stat 一致也不能证明内容未变"""
+		entry_mtime_ns = self.mtime_s[i] * 1000000000 + self.mtime_ns[i]
+		return entry_mtime_ns >= index_mtime_ns
+
+	def group_by_directory(self):
+		"""按所在目录分组，返回 目录 -> [(文件名, 条目下标)]"""
+		groups = {}
+		for i, path in enumerate(self.paths):
+			directory, _, name = path.rpartition("/")
+			groups.setdefault(directory, []).append((name, i))
+		return groups
+
+def _read_varint(data, offset):
+	"""读取 v4 索引中使用的偏移变长整数"""
+	byte = data[offset]
+	offset += 1
+	value = byte & 0x7f
+	while byte & 0x80:
+		byte = data[offset]
+		offset += 1
+		value = ((value + 1) << 7) | (byte & 0x7f)
+	return value, offset
+
+class WorktreeProbe:
+	"""基于 stat 信息判断工作区自上次状态以来是否有变化
+
+	capture() 在每次完整的 git status 之后记录基线：索引和 HEAD 的 stat、
+	相关目录的修改时间，以及已知有变化的文件当前的 stat。
+	has_changes() 通过 os.scandir 逐目录比较，只有修改时间不早于索引文件的
+	“竞态干净”条目才交给 git diff 确认（每批最多 PATHSPEC_ARG_LIMIT 个路径）。
+
+	扫描的耗时主要是每个条目一次 lstat 系统调用，在文件多、CPU 少时可能比 git status 更慢
+	（git 使用多线程预读索引）。扫描耗时超过上一次完整 status 的耗时时，改为调用 read_status
+	比较状态是否与基线一致，此时每次检查都会启动一次 git status，不再是免子进程的快速路径；
+	last_check 记录最近一次检查使用的方式（'stat' 或 'status'）。索引文件变化后重新测量扫描耗时。
+	"""
+
+	def __init__(self, repo_path, git_dir, hash_size=20, run_git=None, read_status=None):
+		self.repo_path = repo_path
+		self.git_dir = git_dir
+		self.hash_size = hash_size
+		# 用于确认竞态条目的回调，参数为路径列表，返回其中有变化的路径
+		self.run_git = run_git
+		# 执行完整状态查询的回调，返回 StatusSnapshot
+		self.read_status = read_status
+		self.index_path = os.path.join(git_dir, "index")
+		self.head_path = os.path.join(git_dir, "HEAD")
+
+		# 刷新线程和界面线程都会读取索引，_lock 保护下面三个字段
+		self._lock = threading.Lock()
+		self.index = None
+		self.index_signature = None
+		self.index_directories = set()
+		self.baseline = None
+		# 最近一次扫描普通条目和完整 git status 的耗时（秒）
+		self.scan_seconds = None
+		self.status_seconds = None
+		# 最近一次 has_changes() 使用的方式，'stat' 或 'status'
+		self.last_check = None
+
+	def _load_index(self):
+		"""索引文件变化时重新读取，返回 (索引文件签名, GitIndex, 索引中的目录集合)"""
+		with self._lock:
+			signature = stat_signature(self.index_path)
+			if self.index is None or signature != self.index_signature:
+				index = GitIndex.read(self.index_path, self.hash_size)
+				self.index = index
+				self.index_signature = signature
+				self.index_directories = {path.rpartition("/")[0] for path in index.paths}
+				# 条目数量可能已变化，重新测量扫描耗时
+				self.scan_seconds = None
+			return signature, self.index, self.index_directories
+
+	def current_index(self):
+		"""返回与索引文件当前内容一致的 GitIndex，无法读取时返回 None"""
+		try:
+			return self._load_index()[1]
+		except Exception as e:
+			logger.warning(f"读取索引失败: {str(e)}")
+			return None
+
+	def _head_signature(self):
+		try:
+			with open(self.head_path, 'rb') as f:
+				head = f.read()
+		except OSError:
+			head = None
+		return head, stat_signature(self.head_path)
+
+	def _lstat_signature(self, relative_path):
+		try:
+			return worktree_signature(os.lstat(os.path.join(self.repo_path, relative_path)))
+		except OSError:
+			return None
+
+	def capture(self, status, seconds=None):
+		"""在完整的状态查询之后记录基线，seconds 为这次查询的耗时"""
+		if seconds is not None:
+			self.status_seconds = seconds
+		try:
+			index_signature, index, index_directories = self._load_index()
+		except Exception as e:
+			logger.warning(f"读取索引失败，无法使用快速变化检测: {str(e)}")
+			self.baseline = None
+			return
+
+		if index.unsupported:
+			self.baseline = None
+			return
+
+		# 已知有变化的文件（包括未跟踪文件）记录当前 stat，之后与之比较
+		dirty = {}
+		for path in status.entries:
+			dirty[path] = self._lstat_signature(path)
+
+		# 目录的修改时间可以反映新增和删除的文件
+		directories = set(index_directories)
+		for path in dirty:
+			directories.add(path.rpartition("/")[0])
+		directory_mtimes = {}
+		for directory in directories:
+			signature = stat_signature(os.path.join(self.repo_path, directory))
+			directory_mtimes[directory] = signature[0] if signature else None
+
+		self.baseline = {
+			'index': index_signature,
+			'index_data': index,
+			'head': self._head_signature(),
+			'entries': status.entries,
+			'dirty': dirty,
+			'directories': directory_mtimes,
+			# 按目录分组的期望 stat 签名在第一次检查时才计算
+			'groups': None,
+			'racy': None
+		}
+
+	def _prepare_groups(self, baseline):
+		"""将基线之外的索引条目按目录分组，并预先计算期望的 stat 签名"""
+		index = baseline['index_data']
+		dirty = baseline['dirty']
+		index_mtime_ns = baseline['index'][0] if baseline['index'] else 0
+		groups = {}
+		racy = {}
+		for i, path in enumerate(index.paths):
+			if path in dirty or not index.is_trackable(i):
+				continue
+			if index.is_racy(i, index_mtime_ns):
+				racy[path] = index.expected_signature(i)
+				continue
+			directory, _, name = path.rpartition("/")
+			groups.setdefault(directory, {})[name] = index.expected_signature(i)
+		baseline['groups'] = list(groups.items())
+		baseline['racy'] = racy
+
+	def _directory_changed(self, group):
+		"""扫描一个目录，判断其中的普通条目是否与索引不一致"""
+		directory, expected = group
+		matched = 0
+		try:
+			with os.scandir(os.path.join(self.repo_path, directory)) as it:
+				for entry in it:
+					signature = expected.get(entry.name)
+					if signature is None:
+						continue
+					st = entry.stat(follow_symlinks=False)
+					if (st.st_mtime_ns, st.st_size & UINT32_MASK, st.st_ino & UINT32_MASK, st.st_mode & STAT_MODE_MASK) != signature:
+						return True
+					matched += 1
+		except OSError:
+			return True
+		# 有条目对应的文件已不存在
+		return matched != len(expected)
+
+	def _scan_is_slower(self):
+		return (
+			self.read_status is not None and self.scan_seconds is not None
+			and self.status_seconds is not None and self.scan_seconds > self.status_seconds
+		)
+
+	def _scan_changed(self, baseline):
+		"""逐目录比较普通条目的 stat，并记录耗时"""
+		if baseline['groups'] is None:
+			self._prepare_groups(baseline)
+		groups = baseline['groups']
+		start = time.perf_counter()
+		workers = min(MAX_SCAN_WORKERS, os.cpu_count() or 1)
+		if workers > 1 and len(groups) >= PARALLEL_SCAN_THRESHOLD:
+			with ThreadPoolExecutor(max_workers=workers) as executor:
+				changed = any(executor.map(self._directory_changed, groups))
+		else:
+			changed = any(map(self._directory_changed, groups))
+		# 提前发现变化时扫描不完整，耗时不能代表完整扫描
+		if not changed:
+			self.scan_seconds = time.perf_counter() - start
+		return changed
+
+	def has_changes(self):
+		"""判断自上次 capture() 以来是否可能有变化，无法判断时返回 True"""
+		baseline = self.baseline
+		if baseline is None:
+			return True
+		if stat_signature(self.index_path) != baseline['index']:
+			return True
+		if self._head_signature() != baseline['head']:
+			return True
+
+		for directory, mtime in baseline['directories'].items():
+			signature = stat_signature(os.path.join(self.repo_path, directory))
+			if (signature[0] if signature else None) != mtime:
+				return True
+
+		# 已知有变化的文件: 与基线时的 stat 比较
+		for path, signature in baseline['dirty'].items():
+			if self._lstat_signature(path) != signature:
+				return True
+
+		# 扫描比 git status 慢时，普通条目和竞态条目都由 git status 判断
+		if self._scan_is_slower():
+			if self.last_check != 'status':
+				logger.info(
+					f"逐个 stat 耗时 {self.scan_seconds * 1000:.1f} ms，超过 git status 的 "
+					f"{self.status_seconds * 1000:.1f} ms，变化检测改为运行 git status"
+				)
+			self.last_check = 'status'
+			return self.read_status().entries != baseline['entries']
+		self.last_check = 'stat'
+
+		# 普通条目: 与索引中记录的 stat 比较，目录较多时并行扫描
+		if self._scan_changed(baseline):
+			return True
+
+		# 竞态干净的条目: stat 一致时交给 git 确认内容
+		racy = []
+		for path, expected in baseline['racy'].items():
+			if self._lstat_signature(path) != expected:
+				return True
+			racy.append(path)
+
+		if racy:
+			if self.run_git is None:
+				return True
+			logger.debug(f"{len(racy)} 个竞态干净的条目需要由 git 确认")
+			# 分批作为命令行参数传入，避免超出系统的参数长度限制
+			for start in range(0, len(racy), PATHSPEC_ARG_LIMIT):
+				if self.run_git(racy[start:start + PATHSPEC_ARG_LIMIT]):
+					return True
+
+		return False
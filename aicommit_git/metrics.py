@@ -0,0 +1,198 @@
+import json
+import time
+import threading
+import traceback
+import logging
+from collections import deque, Counter
+
+from aicommit_git.command_cache import split_subcommand
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 超过该耗时（毫秒）的命令记录为慢命令
+SLOW_COMMAND_MS = 500
+
+# 保留的最近慢命令数量
+SLOW_COMMAND_HISTORY = 50
+
+# 慢命令记录的调用栈层数
+SLOW_COMMAND_STACK_DEPTH = 12
+
+# 慢命令记录中命令行的最大长度，路径很多时截断
+SLOW_COMMAND_TEXT_LIMIT = 500
+
+# 直方图每个 2 的幂区间内的子桶数，相对误差不超过 1/HISTOGRAM_SUB_BUCKETS
+HISTOGRAM_SUB_BUCKETS = 16
+
+# 汇总时输出的百分位
+REPORT_PERCENTILES = (50, 90, 99)
+
+class Histogram:
+	"""对数线性分桶的直方图（HDR 直方图的简化版）
+
+	值为非负整数。小于 HISTOGRAM_SUB_BUCKETS 的值各占一个桶，更大的值按所在的 2 的幂区间
+	再等分为 HISTOGRAM_SUB_BUCKETS 个子桶，任何量级下的相对误差都有上限，内存只与量级数有关。
+	"""
+
+	def __init__(self):
+		self.buckets = Counter()
+		self.count = 0
+		self.total = 0
+		self.min = None
+		self.max = None
+
+	@staticmethod
+	def _bucket(value):
+		if value < HISTOGRAM_SUB_BUCKETS:
+			return value
+		shift = value.bit_length() - HISTOGRAM_SUB_BUCKETS.bit_length()
+		# 保留最高的几位作为桶的下界
+		return (value >> shift) << shift
+
+	@staticmethod
+	def _bucket_upper(lower):
+		if lower < HISTOGRAM_SUB_BUCKETS:
+			return lower
+		shift = lower.bit_length() - HISTOGRAM_SUB_BUCKETS.bit_length()
+		return lower + (1 << shift) - 1
+
+	def record(self, value):
+		value = max(0, int(value))
+		self.buckets[self._bucket(value)] += 1
+		self.count += 1
+		self.total += value
+		self.min = value if self.min is None else min(self.min, value)
+		self.max = value if self.max is None else max(self.max, value)
+
+	def percentile(self, p):
+		"""返回第 p 百分位的值（所在桶的上界，不超过最大值），没有数据时返回 0"""
+		if not self.count:
+			return 0
+		target = max(1, -(-self.count * p // 100))
+		seen = 0
+		for lower in sorted(self.buckets):
+			seen += self.buckets[lower]
+			if seen >= target:
+				return min(self._bucket_upper(lower), self.max)
+		return self.max
+
+	def to_dict(self):
+		result = {
+			'count': self.count,
+			'total': self.total,
+			'min': self.min or 0,
+			'max': self.max or 0,
+			'mean': self.total / self.count if self.count else 0
+		}
+		for p in REPORT_PERCENTILES:
+			result[f'p{p}'] = self.percentile(p)
+		result['buckets'] = {str(lower): n for lower, n in sorted(self.buckets.items())}
+		return result
+
+class CommandMetrics:
+	"""按子命令统计 Git 命令的耗时、输出字节数和返回码
+
+	耗时以微秒记录在 Histogram 中。耗时超过 slow_threshold_ms 的命令连同调用栈写入日志，
+	并保留最近 SLOW_COMMAND_HISTORY 条供界面显示。
+	"""
+
+	def __init__(self, slow_threshold_ms=SLOW_COMMAND_MS):
+		self.slow_threshold_ms = slow_threshold_ms
+		self.commands = {}
+		self.slow_commands = deque(maxlen=SLOW_COMMAND_HISTORY)
+		self.started = time.time()
+		self._lock = threading.Lock()
+
+	def record(self, argv, elapsed, output_bytes, returncode, caller=None):
+		"""记录一次命令执行，elapsed 为秒
+
+		caller 为发起调用的栈帧，命令在其他线程中执行时由调用方提供；未提供时使用当前调用栈。
+		"""
+		subcommand = split_subcommand(argv)[0] or "git"
+		elapsed_us = int(elapsed * 1000000)
+		with self._lock:
+			entry = self.commands.get(subcommand)
+			if entry is None:
+				entry = self.commands[subcommand] = {
+					'time_us': Histogram(),
+					'bytes': Histogram(),
+					'exit_codes': Counter()
+				}
+			entry['time_us'].record(elapsed_us)
+			entry['bytes'].record(output_bytes)
+			entry['exit_codes'][returncode] += 1
+
+		elapsed_ms = elapsed * 1000
+		if self.slow_threshold_ms and elapsed_ms >= self.slow_threshold_ms:
+			if caller is not None:
+				stack = traceback.format_stack(caller, limit=SLOW_COMMAND_STACK_DEPTH)
+			else:
+				# 去掉 record 及执行器内部的栈帧
+				stack = traceback.format_stack(limit=SLOW_COMMAND_STACK_DEPTH + 2)[:-2]
+			command = " ".join(argv)
+			if len(command) > SLOW_COMMAND_TEXT_LIMIT:
+				command = command[:SLOW_COMMAND_TEXT_LIMIT] + f" ...（共 {len(argv)} 个参数）"
+			self.slow_commands.append({
+				'command': command,
+				'elapsed_ms': round(elapsed_ms, 1),
+				'bytes': output_bytes,
+				'exit_code': returncode,
+				'time': time.time(),
+				'stack': "".join(stack)
+			})
+			logger.warning(f"慢 Git 命令 ({elapsed_ms:.0f}ms, {output_bytes} 字节, 返回码 {returncode}): git {command}\n{''.join(stack)}")
+
+	def summary(self):
+		"""返回按总耗时降序排列的各子命令汇总"""
+		with self._lock:
+			rows = []
+			for subcommand, entry in self.commands.items():
+				times = entry['time_us']
+				row = {
+					'command': subcommand,
+					'count': times.count,
+					'total_ms': times.total / 1000,
+					'max_ms': (times.max or 0) / 1000,
+					'bytes': entry['bytes'].total,
+					'exit_codes': dict(entry['exit_codes'])
+				}
+				for p in REPORT_PERCENTILES:
+					row[f'p{p}_ms'] = times.percentile(p) / 1000
+				rows.append(row)
+		rows.sort(key=lambda r: r['total_ms'], reverse=True)
+		return rows
+
+	def to_dict(self):
+		"""返回完整的统计数据（包括直方图的桶），可直接序列化为 JSON"""
+		with self._lock:
+			commands = {
+				subcommand: {
+					'time_us': entry['time_us'].to_dict(),
+					'bytes': entry['bytes'].to_dict(),
+					'exit_codes': {str(code): n for code, n in entry['exit_codes'].items()}
+				}
+				for subcommand, entry in self.commands.items()
+			}
+			slow_commands = list(self.slow_commands)
+		return {
+			'started': self.started,
+			'dumped': time.time(),
+			'slow_threshold_ms': self.slow_threshold_ms,
+			'commands': commands,
+			'slow_commands': slow_commands
+		}
+
+	def dump_json(self, path, extra=None):
+		"""将统计数据写入 JSON 文件，extra 中的字段一并写入"""
+		data = self.to_dict()
+		if extra:
+			data.update(extra)
+		with open(path, 'w', encoding='utf-8') as f:
+			json.dump(data, f, indent=4, ensure_ascii=False)
+
+	def reset(self):
+		with self._lock:
+			self.commands.clear()
+			self.slow_commands.clear()
+			self.started = time.time()
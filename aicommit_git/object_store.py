@@ -0,0 +1,698 @@
+import os
+import mmap
+import zlib
+import struct
+import threading
+import logging
+from collections import OrderedDict
+
+from aicommit_git.gitdir import find_common_dir, read_hash_size, stat_signature
+from aicommit_git.index_reader import GitIndex
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 对象类型编号（packfile 中的 3 位类型字段）
+OBJ_COMMIT = 1
+OBJ_TREE = 2
+OBJ_BLOB = 3
+OBJ_TAG = 4
+OBJ_OFS_DELTA = 6
+OBJ_REF_DELTA = 7
+
+TYPE_NAMES = {OBJ_COMMIT: b"commit", OBJ_TREE: b"tree", OBJ_BLOB: b"blob", OBJ_TAG: b"tag"}
+TYPE_NUMBERS = {name: number for number, name in TYPE_NAMES.items()}
+
+# 解压后对象缓存的默认字节上限
+OBJECT_CACHE_BYTES = 32 * 1024 * 1024
+
+# 单个对象超过缓存上限的该比例时不缓存，避免一个大文件挤掉所有树对象
+OBJECT_CACHE_MAX_ENTRY_RATIO = 4
+
+# 缓存的已解析树对象（名称 -> 条目字典）的数量上限
+TREE_CACHE_SIZE = 256
+
+# 从 packfile 中解压对象时每次送入 zlib 的字节数
+INFLATE_CHUNK_SIZE = 64 * 1024
+
+# 增量链的最大长度，超过时视为损坏（Git 默认 --depth 为 50）
+MAX_DELTA_CHAIN = 10000
+
+# .idx 文件头
+IDX_MAGIC = b"\377tOc"
+IDX_HEADER = struct.Struct(">4sL")
+UINT32 = struct.Struct(">L")
+UINT64 = struct.Struct(">Q")
+
+# 树条目中子模块的文件模式
+TREE_MODE_GITLINK = b"160000"
+
+def _read_size_varint(data, pos):
+	"""读取增量数据头部的小端变长整数"""
+	value = 0
+	shift = 0
+	while True:
+		byte = data[pos]
+		pos += 1
+		value |= (byte & 0x7f) << shift
+		shift += 7
+		if not byte & 0x80:
+			return value, pos
+
+def apply_delta(base, delta):
+	"""将 Git 增量数据应用到基础对象上，返回目标对象内容"""
+	base_size, pos = _read_size_varint(delta, 0)
+	result_size, pos = _read_size_varint(delta, pos)
+	if base_size != len(base):
+		raise ValueError("增量数据与基础对象大小不一致")
+
+	source = memoryview(base)
+	result = bytearray()
+	end = len(delta)
+	while pos < end:
+		op = delta[pos]
+		pos += 1
+		if op & 0x80:
+			# 复制指令: 低 4 位标记偏移的字节，接下来 3 位标记长度的字节
+			offset = size = 0
+			if op & 0x01:
+				offset = delta[pos]
+				pos += 1
+			if op & 0x02:
+				offset |= delta[pos] << 8
+				pos += 1
+			if op & 0x04:
+				offset |= delta[pos] << 16
+				pos += 1
+			if op & 0x08:
+				offset |= delta[pos] << 24
+				pos += 1
+			if op & 0x10:
+				size = delta[pos]
+				pos += 1
+			if op & 0x20:
+				size |= delta[pos] << 8
+				pos += 1
+			if op & 0x40:
+				size |= delta[pos] << 16
+				pos += 1
+			result += source[offset:offset + (size or 0x10000)]
+		elif op:
+			# 插入指令: op 即字面数据的长度
+			result += delta[pos:pos + op]
+			pos += op
+		else:
+			raise ValueError("无效的增量指令")
+
+	if len(result) != result_size:
+		raise ValueError("增量结果大小不一致")
+	return bytes(result)
+
+class ObjectCache:
+	"""按字节数限制容量的 LRU 缓存，值为 (类型, 内容)
+
+	锁只在字典操作期间持有。超过容量 1/OBJECT_CACHE_MAX_ENTRY_RATIO 的值不缓存，
+	避免一个大对象挤掉所有其他条目。条目大小由 sizeof() 计算，子类可以改写。
+	"""
+
+	def __init__(self, max_bytes=OBJECT_CACHE_BYTES):
+		self.max_bytes = max_bytes
+		self.size = 0
+		self.evictions = 0
+		self.entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def sizeof(self, value):
+		return len(value[1])
+
+	def get(self, key):
+		with self._lock:
+			value = self.entries.get(key)
+			if value is not None:
+				self.entries.move_to_end(key)
+			return value
+
+	def put(self, key, value):
+		size = self.sizeof(value)
+		if size * OBJECT_CACHE_MAX_ENTRY_RATIO > self.max_bytes:
+			return
+		with self._lock:
+			old = self.entries.pop(key, None)
+			if old is not None:
+				self.size -= self.sizeof(old)
+			self.entries[key] = value
+			self.size += size
+			while self.size > self.max_bytes and self.entries:
+				_, evicted = self.entries.popitem(last=False)
+				self.size -= self.sizeof(evicted)
+				self.evictions += 1
+
+	def discard(self, key):
+		with self._lock:
+			old = self.entries.pop(key, None)
+			if old is not None:
+				self.size -= self.sizeof(old)
+
+	def clear(self):
+		with self._lock:
+			self.entries.clear()
+			self.size = 0
+
+class PackFile:
+	"""一个 packfile 及其 .idx 索引，两者都通过 mmap 读取
+
+	对象查找先用 fanout 表确定首字节的范围，再在有序的对象 ID 表中二分查找。
+	"""
+
+	def __init__(self, pack_path, hash_size=20):
+		self.pack_path = pack_path
+		self.hash_size = hash_size
+		self._files = []
+		try:
+			self.idx = self._map(pack_path[:-len(".pack")] + ".idx")
+			self.pack = self._map(pack_path)
+			self._parse_idx()
+		except Exception:
+			self.close()
+			raise
+
+	def _map(self, path):
+		f = open(path, 'rb')
+		self._files.append(f)
+		data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		self._files.append(data)
+		return data
+
+	def _parse_idx(self):
+		idx = self.idx
+		if idx[:4] == IDX_MAGIC:
+			magic, version = IDX_HEADER.unpack_from(idx, 0)
+			if version != 2:
+				raise ValueError(f"不支持的 idx 版本: {version}")
+			fanout_start = IDX_HEADER.size
+			self.version = 2
+		else:
+			fanout_start = 0
+			self.version = 1
+		self.fanout = struct.unpack_from(">256L", idx, fanout_start)
+		self.count = self.fanout[255]
+		table_start = fanout_start + 256 * 4
+
+		if self.version == 2:
+			# v2: 对象 ID 表、CRC32 表、32 位偏移表，最后是 64 位偏移表
+			self.names_start = table_start
+			self.entry_size = self.hash_size
+			self.name_offset = 0
+			self.offsets_start = table_start + self.count * (self.hash_size + 4)
+			self.large_offsets_start = self.offsets_start + self.count * 4
+		else:
+			# v1: 每个条目为 4 字节偏移加对象 ID
+			self.names_start = table_start
+			self.entry_size = 4 + self.hash_size
+			self.name_offset = 4
+
+	def close(self):
+		for f in reversed(self._files):
+			try:
+				f.close()
+			except (OSError, ValueError, BufferError):
+				pass
+		self._files = []
+
+	def _name_at(self, i):
+		start = self.names_start + i * self.entry_size + self.name_offset
+		return self.idx[start:start + self.hash_size]
+
+	def find_offset(self, binsha):
+		"""返回对象在 packfile 中的偏移，不存在时返回 None"""
+		first = binsha[0]
+		low = self.fanout[first - 1] if first else 0
+		high = self.fanout[first]
+		while low < high:
+			middle = (low + high) // 2
+			name = self._name_at(middle)
+			if name < binsha:
+				low = middle + 1
+			elif name > binsha:
+				high = middle
+			else:
+				return self._offset_at(middle)
+		return None
+
+	def _offset_at(self, i):
+		if self.version == 1:
+			return UINT32.unpack_from(self.idx, self.names_start + i * self.entry_size)[0]
+		offset = UINT32.unpack_from(self.idx, self.offsets_start + i * 4)[0]
+		if offset & 0x80000000:
+			# 最高位表示该值是 64 位偏移表中的下标
+			offset = UINT64.unpack_from(self.idx, self.large_offsets_start + (offset & 0x7fffffff) * 8)[0]
+		return offset
+
+	def read_header(self, offset):
+		"""解析对象头，返回 (类型, 解压后大小, 数据起始位置, 增量基础)
+
+		增量基础对 OFS_DELTA 为基础对象的偏移，对 REF_DELTA 为基础对象 ID，其他类型为 None。
+		"""
+		pack = self.pack
+		byte = pack[offset]
+		pos = offset + 1
+		obj_type = (byte >> 4) & 0x7
+		size = byte & 0x0f
+		shift = 4
+		while byte & 0x80:
+			byte = pack[pos]
+			pos += 1
+			size |= (byte & 0x7f) << shift
+			shift += 7
+
+		base = None
+		if obj_type == OBJ_OFS_DELTA:
+			byte = pack[pos]
+			pos += 1
+			distance = byte & 0x7f
+			while byte & 0x80:
+				byte = pack[pos]
+				pos += 1
+				distance = ((distance + 1) << 7) | (byte & 0x7f)
+			base = offset - distance
+		elif obj_type == OBJ_REF_DELTA:
+			base = pack[pos:pos + self.hash_size]
+			pos += self.hash_size
+		return obj_type, size, pos, base
+
+	def inflate(self, pos, size):
+		"""从 pos 开始解压 zlib 数据，解压结果应为 size 字节"""
+		view = memoryview(self.pack)
+		try:
+			decompressor = zlib.decompressobj()
+			parts = []
+			# 压缩数据最多比原始数据多出少量头部，小对象一次送入即可，多余部分会被 zlib 复制保留
+			chunk = min(size + 64, INFLATE_CHUNK_SIZE)
+			end = len(view)
+			while not decompressor.eof:
+				if pos >= end:
+					raise ValueError("packfile 数据不完整")
+				parts.append(decompressor.decompress(view[pos:pos + chunk]))
+				pos += chunk
+				chunk = INFLATE_CHUNK_SIZE
+			data = b"".join(parts)
+		finally:
+			view.release()
+		if len(data) != size:
+			raise ValueError("解压后的对象大小不一致")
+		return data
+
+	def inflate_head(self, pos, limit):
+		"""从 pos 开始解压 zlib 数据，得到前 limit 字节后停止，不解压其余部分"""
+		view = memoryview(self.pack)
+		try:
+			decompressor = zlib.decompressobj()
+			data = bytearray()
+			end = len(view)
+			while len(data) < limit and not decompressor.eof:
+				# max_length 限制每次的输出，未消耗的输入保留在 unconsumed_tail 中
+				if decompressor.unconsumed_tail:
+					data += decompressor.decompress(decompressor.unconsumed_tail, INFLATE_CHUNK_SIZE)
+					continue
+				if pos >= end:
+					raise ValueError("packfile 数据不完整")
+				data += decompressor.decompress(view[pos:pos + INFLATE_CHUNK_SIZE], INFLATE_CHUNK_SIZE)
+				pos += INFLATE_CHUNK_SIZE
+		finally:
+			view.release()
+		return bytes(data[:limit])
+
+class ObjectStore:
+	"""只读的纯 Python 对象库，读取松散对象和 packfile 中的对象，不启动子进程
+
+	支持 HEAD、引用名、分支名、完整对象 ID 以及 ":0"（暂存区）形式的版本，
+	无法处理的情况（其他版本表达式、部分克隆中缺失的对象等）返回 None，由调用方回退到 Git。
+	"""
+
+	def __init__(self, git_dir, cache_bytes=OBJECT_CACHE_BYTES):
+		self.git_dir = git_dir
+		self.common_dir = find_common_dir(git_dir)
+		self.hash_size = read_hash_size(git_dir)
+		self.object_dirs = self._find_object_dirs()
+		self.cache = ObjectCache(cache_bytes)
+		self.trees = OrderedDict()
+		self.packs = {}
+		self._packed_refs = (None, {})
+		self._index = (None, None)
+		self._lock = threading.Lock()
+		self._scan_packs()
+
+	def _find_object_dirs(self):
+		"""对象目录以及 objects/info/alternates 中列出的备用对象目录"""
+		object_dirs = []
+		pending = [os.path.join(self.common_dir, "objects")]
+		while pending:
+			directory = os.path.normpath(pending.pop(0))
+			if directory in object_dirs or not os.path.isdir(directory):
+				continue
+			object_dirs.append(directory)
+			try:
+				with open(os.path.join(directory, "info", "alternates"), 'r', encoding='utf-8') as f:
+					for line in f:
+						line = line.strip()
+						if line and not line.startswith("#"):
+							pending.append(os.path.join(directory, line))
+			except OSError:
+				pass
+		return object_dirs
+
+	def _scan_packs(self):
+		"""重新扫描 pack 目录，打开新的 packfile 并关闭已删除的，返回是否有变化"""
+		with self._lock:
+			found = set()
+			for object_dir in self.object_dirs:
+				pack_dir = os.path.join(object_dir, "pack")
+				try:
+					names = os.listdir(pack_dir)
+				except OSError:
+					continue
+				for name in names:
+					if name.endswith(".pack") and name[:-len(".pack")] + ".idx" in names:
+						found.add(os.path.join(pack_dir, name))
+
+			changed = False
+			for path in list(self.packs):
+				if path not in found:
+					self.packs.pop(path).close()
+					changed = True
+			for path in found - set(self.packs):
+				try:
+					self.packs[path] = PackFile(path, self.hash_size)
+					changed = True
+				except (OSError, ValueError) as e:
+					logger.warning(f"无法读取 packfile {path}: {str(e)}")
+			return changed
+
+	def close(self):
+		with self._lock:
+			for pack in self.packs.values():
+				pack.close()
+			self.packs = {}
+			self.trees.clear()
+		self.cache.clear()
+
+	def read_object(self, binsha):
+		"""读取对象，返回 (类型编号, 内容)，对象不存在时返回 None"""
+		cached = self.cache.get(binsha)
+		if cached is not None:
+			return cached
+
+		result = self._read_uncached(binsha)
+		if result is None and self._scan_packs():
+			# fetch 或 gc 之后可能出现了新的 packfile
+			result = self._read_uncached(binsha)
+		if result is not None:
+			self.cache.put(binsha, result)
+		return result
+
+	def _read_uncached(self, binsha):
+		for pack in list(self.packs.values()):
+			offset = pack.find_offset(binsha)
+			if offset is not None:
+				return self._read_packed(pack, offset)
+		return self._read_loose(binsha)
+
+	def _read_loose(self, binsha):
+		hex_sha = binsha.hex()
+		for object_dir in self.object_dirs:
+			try:
+				with open(os.path.join(object_dir, hex_sha[:2], hex_sha[2:]), 'rb') as f:
+					data = zlib.decompress(f.read())
+			except FileNotFoundError:
+				continue
+			header, _, content = data.partition(b"\0")
+			type_name, _, size = header.partition(b" ")
+			if int(size) != len(content) or type_name not in TYPE_NUMBERS:
+				raise ValueError(f"损坏的松散对象: {hex_sha}")
+			return TYPE_NUMBERS[type_name], content
+		return None
+
+	def read_object_head(self, binsha, limit):
+		"""读取对象的前 limit 字节，返回 (类型编号, 完整大小, 内容)，对象不存在时返回 None
+
+		松散对象和 packfile 中的完整对象只解压需要的部分；增量对象必须先还原完整内容，
+		由 read_object 读取后截取。
+		"""
+		cached = self.cache.get(binsha)
+		if cached is not None:
+			return cached[0], len(cached[1]), cached[1][:limit]
+
+		result = self._read_head_uncached(binsha, limit)
+		if result is None and self._scan_packs():
+			result = self._read_head_uncached(binsha, limit)
+		return result
+
+	def _read_head_uncached(self, binsha, limit):
+		for pack in list(self.packs.values()):
+			offset = pack.find_offset(binsha)
+			if offset is None:
+				continue
+			obj_type, size, pos, _ = pack.read_header(offset)
+			if obj_type in TYPE_NAMES:
+				return obj_type, size, pack.inflate_head(pos, limit)
+			obj = self.read_object(binsha)
+			return (obj[0], len(obj[1]), obj[1][:limit]) if obj is not None else None
+		return self._read_loose_head(binsha, limit)
+
+	def _read_loose_head(self, binsha, limit):
+		"""逐块读取并解压松散对象，得到对象头和前 limit 字节内容后停止"""
+		hex_sha = binsha.hex()
+		for object_dir in self.object_dirs:
+			try:
+				f = open(os.path.join(object_dir, hex_sha[:2], hex_sha[2:]), 'rb')
+			except FileNotFoundError:
+				continue
+			with f:
+				decompressor = zlib.decompressobj()
+				data = bytearray()
+				header_end = -1
+				while not decompressor.eof and (header_end < 0 or len(data) - header_end - 1 < limit):
+					chunk = decompressor.unconsumed_tail or f.read(INFLATE_CHUNK_SIZE)
+					if not chunk:
+						raise ValueError(f"损坏的松散对象: {hex_sha}")
+					data += decompressor.decompress(chunk, INFLATE_CHUNK_SIZE)
+					if header_end < 0:
+						header_end = data.find(b"\0")
+			if header_end < 0:
+				raise ValueError(f"损坏的松散对象: {hex_sha}")
+			type_name, _, size = bytes(data[:header_end]).partition(b" ")
+			size = int(size)
+			content = bytes(data[header_end + 1:header_end + 1 + limit])
+			if type_name not in TYPE_NUMBERS or (decompressor.eof and len(data) - header_end - 1 != size):
+				raise ValueError(f"损坏的松散对象: {hex_sha}")
+			return TYPE_NUMBERS[type_name], size, content
+		return None
+
+	def _read_packed(self, pack, offset):
+		"""读取 packfile 中的对象，沿增量链找到基础对象后依次应用增量"""
+		deltas = []
+		while True:
+			cache_key = (pack.pack_path, offset)
+			cached = self.cache.get(cache_key)
+			if cached is not None:
+				obj_type, data = cached
+				break
+
+			obj_type, size, pos, base = pack.read_header(offset)
+			if obj_type == OBJ_OFS_DELTA:
+				deltas.append(pack.inflate(pos, size))
+				offset = base
+			elif obj_type == OBJ_REF_DELTA:
+				deltas.append(pack.inflate(pos, size))
+				# 基础对象可能位于其他 packfile 或松散对象中
+				base_object = self.read_object(base)
+				if base_object is None:
+					return None
+				obj_type, data = base_object
+				break
+			elif obj_type in TYPE_NAMES:
+				data = pack.inflate(pos, size)
+				self.cache.put(cache_key, (obj_type, data))
+				break
+			else:
+				raise ValueError(f"未知的对象类型: {obj_type}")
+			if len(deltas) > MAX_DELTA_CHAIN:
+				raise ValueError("增量链过长")
+
+		# 只缓存链的基础对象和最终结果（由 read_object 按对象 ID 缓存），
+		# 缓存每个中间结果会让一条长增量链挤掉缓存中的其他对象
+		for delta in reversed(deltas):
+			data = apply_delta(data, delta)
+		return obj_type, data
+
+	def _read_ref_file(self, ref):
+		for directory in (self.git_dir, self.common_dir):
+			try:
+				with open(os.path.join(directory, ref), 'rb') as f:
+					return f.read().strip()
+			except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+				continue
+		return None
+
+	def _get_packed_refs(self):
+		path = os.path.join(self.common_dir, "packed-refs")
+		signature = stat_signature(path)
+		if signature != self._packed_refs[0]:
+			refs = {}
+			if signature is not None:
+				with open(path, 'rb') as f:
+					for line in f:
+						if line.startswith((b"#", b"^")):
+							continue
+						oid, _, name = line.strip().partition(b" ")
+						refs[name.decode('utf-8', errors='replace')] = oid
+			self._packed_refs = (signature, refs)
+		return self._packed_refs[1]
+
+	def resolve_ref(self, ref):
+		"""解析引用（跟随符号引用），返回对象 ID（字节），无法解析时返回 None"""
+		for _ in range(10):
+			value = self._read_ref_file(ref)
+			if value is None:
+				value = self._get_packed_refs().get(ref)
+				if value is None:
+					return None
+			if value.startswith(b"ref:"):
+				ref = value[4:].strip().decode('utf-8', errors='replace')
+				continue
+			try:
+				return bytes.fromhex(value.decode('ascii'))
+			except ValueError:
+				return None
+		return None
+
+	def resolve_revision(self, revision):
+		"""解析 HEAD、完整引用名、分支名或完整对象 ID，其他形式返回 None"""
+		if len(revision) == self.hash_size * 2:
+			try:
+				return bytes.fromhex(revision)
+			except ValueError:
+				pass
+		if revision == "HEAD" or revision.startswith("refs/"):
+			return self.resolve_ref(revision)
+		for prefix in ("refs/heads/", "refs/tags/", "refs/remotes/"):
+			binsha = self.resolve_ref(prefix + revision)
+			if binsha is not None:
+				return binsha
+		return None
+
+	def _peel_to_tree(self, binsha):
+		"""从标签或提交找到对应的树对象"""
+		for _ in range(10):
+			obj = self.read_object(binsha)
+			if obj is None:
+				return None
+			obj_type, data = obj
+			if obj_type == OBJ_TREE:
+				return binsha
+			if obj_type not in (OBJ_COMMIT, OBJ_TAG):
+				return None
+			# 提交以 "tree <id>" 开头，标签以 "object <id>" 开头
+			first_line = data[:data.find(b"\n")]
+			binsha = bytes.fromhex(first_line.split(b" ", 1)[1].decode('ascii'))
+		return None
+
+	def resolve_tree(self, revision):
+		"""返回版本对应的树对象 ID（字节），无法在进程内解析时返回 None"""
+		commit_sha = self.resolve_revision(revision)
+		return self._peel_to_tree(commit_sha) if commit_sha else None
+
+	def find_in_tree(self, tree_sha, path):
+		"""在树中按路径查找条目，返回 (文件模式, 对象 ID)，不存在时返回 None"""
+		components = os.fsencode(path).split(b"/")
+		mode = b"40000"
+		binsha = tree_sha
+		for component in components:
+			if not mode.startswith(b"4"):
+				return None
+			entries = self._read_tree(binsha)
+			if entries is None:
+				return None
+			entry = entries.get(component)
+			if entry is None:
+				return None
+			mode, binsha = entry
+		return mode, binsha
+
+	def _read_tree(self, binsha):
+		"""读取并解析树对象，返回 名称 -> (文件模式, 对象 ID)，结果按对象 ID 缓存"""
+		with self._lock:
+			entries = self.trees.get(binsha)
+			if entries is not None:
+				self.trees.move_to_end(binsha)
+				return entries
+
+		obj = self.read_object(binsha)
+		if obj is None or obj[0] != OBJ_TREE:
+			return None
+		# 条目格式为 "<mode> <name>\0<id>"
+		data = obj[1]
+		hash_size = self.hash_size
+		entries = {}
+		pos = 0
+		end = len(data)
+		while pos < end:
+			space = data.find(b" ", pos)
+			nul = data.find(b"\0", space)
+			entries[data[space + 1:nul]] = (data[pos:space], data[nul + 1:nul + 1 + hash_size])
+			pos = nul + 1 + hash_size
+
+		with self._lock:
+			self.trees[binsha] = entries
+			while len(self.trees) > TREE_CACHE_SIZE:
+				self.trees.popitem(last=False)
+		return entries
+
+	def _index_oid(self, path):
+		"""从 .git/index 中读取暂存区条目的对象 ID"""
+		index_path = os.path.join(self.git_dir, "index")
+		signature = stat_signature(index_path)
+		if self._index[0] != signature:
+			self._index = (signature, GitIndex.read(index_path, self.hash_size))
+		index = self._index[1]
+		if index.unsupported:
+			return None
+		return index.find_oid(path)
+
+	def _path_oid(self, revision, path):
+		"""返回指定版本中文件的对象 ID，revision 为 ":0" 时查找暂存区"""
+		if revision == ":0":
+			return self._index_oid(path)
+		tree_sha = self.resolve_tree(revision)
+		entry = self.find_in_tree(tree_sha, path) if tree_sha else None
+		if entry is None or entry[0] == TREE_MODE_GITLINK or entry[0].startswith(b"4"):
+			return None
+		return entry[1]
+
+	def read_path(self, revision, path):
+		"""读取指定版本中文件的内容（字节），revision 为 ":0" 时读取暂存区
+
+		无法在进程内读取时返回 None。
+		"""
+		binsha = self._path_oid(revision, path)
+		if binsha is None:
+			return None
+
+		obj = self.read_object(binsha)
+		if obj is None or obj[0] != OBJ_BLOB:
+			return None
+		return obj[1]
+
+	def read_path_head(self, revision, path, max_bytes):
+		"""读取指定版本中文件的前 max_bytes 字节，返回 (内容, 是否截断)
+
+		大文件不会被整个解压到内存中（增量对象除外），无法在进程内读取时返回 None。
+		"""
+		binsha = self._path_oid(revision, path)
+		if binsha is None:
+			return None
+
+		obj = self.read_object_head(binsha, max_bytes)
+		if obj is None or obj[0] != OBJ_BLOB:
+			return None
+		return obj[2], obj[1] > max_bytes
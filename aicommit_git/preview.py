@@ -0,0 +1,130 @@
+import os
+import mmap
+import codecs
+import threading
+import logging
+
+from aicommit_git.diff_parser import truncation_marker
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 检测编码时检查的字节数
+ENCODING_SNIFF_SIZE = 64 * 1024
+
+# 文件超过预览上限时额外显示的末尾字节数，0 表示只显示开头
+PREVIEW_TAIL_BYTES = 16 * 1024
+
+def detect_encoding(sample, complete=True):
+	"""根据文件开头的字节判断编码，返回 utf-8-sig、utf-8 或 latin-1
+
+	complete 为 False 表示样本只是文件的一部分，此时末尾被截断的多字节字符不视为错误。
+	"""
+	if sample.startswith(codecs.BOM_UTF8):
+		return 'utf-8-sig'
+	try:
+		sample.decode('utf-8')
+	except UnicodeDecodeError as e:
+		if complete or e.reason != 'unexpected end of data':
+			return 'latin-1'
+	return 'utf-8'
+
+class FilePreview:
+	"""通过 mmap 映射的文件，按需从开头和末尾的窗口中逐行解码
+
+	只有实际产出的行会被读取和解码，文件的其余部分不会进入内存。
+	"""
+
+	def __init__(self, full_path, encodings):
+		self.file = open(full_path, 'rb')
+		try:
+			st = os.fstat(self.file.fileno())
+			self.size = st.st_size
+			# 空文件无法映射
+			self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+			self.encoding = encodings.lookup(full_path, st, self.buffer)
+		except Exception:
+			self.file.close()
+			raise
+
+	def close(self):
+		if isinstance(self.buffer, mmap.mmap):
+			self.buffer.close()
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def iter_lines(self, max_bytes=None, max_lines=None, prefix="", tail_bytes=0):
+		"""逐行产出预览文本（不含换行符），每行添加 prefix
+
+		开头窗口最多 max_bytes 字节、max_lines 行，超出时产出截断提示；
+		按字节截断且 tail_bytes 大于 0 时，再产出文件末尾 tail_bytes 字节内的完整行。
+		"""
+		start = len(codecs.BOM_UTF8) if self.encoding == 'utf-8-sig' else 0
+		end = min(self.size, start + max_bytes) if max_bytes else self.size
+
+		count = 0
+		for line in self._iter_range(start, end):
+			if max_lines and count >= max_lines:
+				yield truncation_marker({'reason': 'lines', 'limit': max_lines}).decode('utf-8')
+				return
+			count += 1
+			yield prefix + line
+
+		if end >= self.size:
+			return
+		yield truncation_marker({'reason': 'bytes', 'limit': max_bytes}).decode('utf-8')
+
+		if tail_bytes:
+			# 末尾窗口从第一个完整的行开始
+			newline = self.buffer.find(b"\n", max(end, self.size - tail_bytes) - 1)
+			if newline != -1:
+				for line in self._iter_range(newline + 1, self.size):
+					yield prefix + line
+
+	def _iter_range(self, start, end):
+		encoding = 'utf-8' if self.encoding == 'utf-8-sig' else self.encoding
+		position = start
+		while position < end:
+			newline = self.buffer.find(b"\n", position, end)
+			stop = end if newline == -1 else newline
+			yield self.buffer[position:stop].rstrip(b"\r").decode(encoding, errors='replace')
+			position = stop + 1
+
+class PreviewReader:
+	"""文件预览的入口，编码检测结果按 (路径, 大小, 修改时间) 缓存"""
+
+	def __init__(self):
+		self.encodings = {}
+		self._lock = threading.Lock()
+
+	def open(self, full_path):
+		"""映射文件并返回 FilePreview，使用完毕后需要关闭（支持 with 语句）"""
+		return FilePreview(full_path, self)
+
+	def lookup(self, full_path, st, buffer):
+		"""返回文件的编码，只有文件的大小或修改时间变化时才重新检测"""
+		key = (st.st_size, st.st_mtime_ns)
+		with self._lock:
+			cached = self.encodings.get(full_path)
+		if cached and cached[0] == key:
+			return cached[1]
+
+		encoding = detect_encoding(buffer[:ENCODING_SNIFF_SIZE], complete=len(buffer) <= ENCODING_SNIFF_SIZE)
+		with self._lock:
+			self.encodings[full_path] = (key, encoding)
+		logger.debug(f"检测文件编码: {full_path} -> {encoding}")
+		return encoding
+
+	def invalidate(self, paths=None):
+		"""清除指定路径（或全部）的编码缓存"""
+		with self._lock:
+			if paths is None:
+				self.encodings.clear()
+			else:
+				for path in paths:
+					self.encodings.pop(path, None)
@@ -0,0 +1,82 @@
+import re
+
+# 带百分比的进度行，例如 "Receiving objects:  45% (450/1000), 1.20 MiB | 500.00 KiB/s"
+PERCENT_PATTERN = re.compile(r"^(remote: )?([A-Za-z ]+):\s+(\d+)% \((\d+)/(\d+)\)(?:,\s*(.*))?$")
+
+# 只有计数的进度行，例如 "Enumerating objects: 1234, done."
+COUNT_PATTERN = re.compile(r"^(remote: )?([A-Za-z ]+):\s+(\d+)$")
+
+# 阶段完成时行尾的标记
+DONE_SUFFIX = ", done."
+
+# 进度阶段的中文名称（Git 输出在 LC_ALL=C 下固定为英文）
+PHASE_NAMES = {
+	"Enumerating objects": "枚举对象",
+	"Counting objects": "计数对象",
+	"Compressing objects": "压缩对象",
+	"Receiving objects": "接收对象",
+	"Resolving deltas": "处理增量",
+	"Writing objects": "写入对象",
+	"Updating files": "更新文件",
+	"Checking out files": "检出文件",
+	"Unpacking objects": "解包对象",
+	"Total": "总计"
+}
+
+def split_progress_lines(pending, chunk):
+	"""将标准错误数据按 \\r 和 \\n 切分，返回 (完整的行列表, 剩余的不完整部分)
+
+	Git 用 \\r 覆盖同一行来刷新进度，因此两者都视为行结束。
+	"""
+	data = (pending + chunk).replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+	lines = data.split(b"\n")
+	return lines[:-1], lines[-1]
+
+def parse_progress_line(line):
+	"""解析一行 Git 进度输出，不是进度信息时返回 None
+
+	返回的字典包含 phase、percent（可能为 None）、current、total（可能为 None）、
+	detail（传输量和速度等附加信息）、done（该阶段是否完成）以及 remote（是否来自远端）。
+	"""
+	line = line.strip()
+	done = line.endswith(DONE_SUFFIX)
+	if done:
+		line = line[:-len(DONE_SUFFIX)]
+	match = PERCENT_PATTERN.match(line)
+	if match:
+		remote, phase, percent, current, total, detail = match.groups()
+		return {
+			'phase': phase.strip(),
+			'percent': int(percent),
+			'current': int(current),
+			'total': int(total),
+			'detail': (detail or "").strip(),
+			'done': done,
+			'remote': bool(remote)
+		}
+
+	match = COUNT_PATTERN.match(line)
+	if match and match.group(2).strip() in PHASE_NAMES:
+		remote, phase, current = match.groups()
+		return {
+			'phase': phase.strip(),
+			'percent': None,
+			'current': int(current),
+			'total': None,
+			'detail': "",
+			'done': done,
+			'remote': bool(remote)
+		}
+	return None
+
+def format_progress(info):
+	"""将进度信息格式化为状态栏显示的文本"""
+	phase = PHASE_NAMES.get(info['phase'], info['phase'])
+	if info['remote']:
+		phase = f"远端: {phase}"
+	if info['percent'] is None:
+		return f"{phase}: {info['current']}"
+	text = f"{phase}: {info['percent']}% ({info['current']}/{info['total']})"
+	if info['detail']:
+		text += f", {info['detail']}"
+	return text
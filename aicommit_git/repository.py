@@ -0,0 +1,647 @@
+import os
+import time
+import logging
+
+from aicommit_git.blob_reader import BlobReader
+from aicommit_git.object_store import ObjectStore
+from aicommit_git.diff_parser import iter_file_patches, iter_diff_events, iter_event_lines, truncation_marker
+from aicommit_git.gitdir import find_git_dir, read_hash_size
+from aicommit_git.index_reader import WorktreeProbe, worktree_signature
+from aicommit_git.async_runner import AsyncGitRunner
+from aicommit_git.runner import GitCommandRunner, ProcessLimiter, REMOTE_ENV, PATHSPEC_ARG_LIMIT, to_argv
+from aicommit_git.command_cache import CommandCache
+from aicommit_git.metrics import CommandMetrics
+from aicommit_git.hunks import collect_hunks, build_patch
+from aicommit_git.classify import FileClassifier
+from aicommit_git.preview import PreviewReader, PREVIEW_TAIL_BYTES
+from aicommit_git.branches import BranchIndex
+from aicommit_git.progress import parse_progress_line
+from aicommit_git.backends import create_backend
+from aicommit_git.status import StatusSnapshot, StatusEntry
+from aicommit_git.diff_cache import diff_cache_key, DIFF_CACHE_FORMAT, DIFF_CACHE_RACY_NS
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 单个文件差异的默认上限，超出的部分以截断提示代替
+DIFF_MAX_BYTES = 2 * 1024 * 1024
+DIFF_MAX_LINES = 20000
+
+# 非 UTF-8 文本（按 latin-1 解码显示）的标题附注
+NON_UTF8_NOTE = " (非UTF-8编码)"
+
+class GitRepository:
+	def __init__(self, path, backend=None):
+		"""初始化 Git 仓库对象
+
+		backend 为状态、差异、文件读取、暂存、提交和分支操作的实现名称（参见 aicommit_git.backends），
+		默认使用命令行实现。
+		"""
+		logger.info(f"初始化仓库: {path}")
+		if not os.path.exists(path):
+			logger.error(f"路径不存在: {path}")
+			raise ValueError(f"路径不存在: {path}")
+
+		# 各子命令的耗时、输出字节数和返回码统计
+		self.metrics = CommandMetrics()
+		# 所有 Git 进程（同步、异步、流式读取和 cat-file）共用的进程额度
+		self.limiter = ProcessLimiter()
+		# 同步执行器，用于需要完整字节输出或流式读取的命令
+		self.git = GitCommandRunner(path, metrics=self.metrics, limiter=self.limiter)
+		# 异步命令执行器
+		self.runner = AsyncGitRunner(path, metrics=self.metrics, limiter=self.limiter)
+		# 只读命令的输出缓存，找到 Git 目录后创建
+		self.commands = None
+
+		# 检查是否是有效的 Git 仓库
+		try:
+			self._run_git_command("status", cwd=path)
+			logger.info(f"成功打开仓库: {path}")
+		except Exception as e:
+			logger.error(f"无效的 Git 仓库: {path}, 错误: {str(e)}")
+			raise ValueError(f"无效的 Git 仓库: {path}")
+
+		self.path = path
+		self.git_dir = find_git_dir(path)
+		self.commands = CommandCache(self.git_dir, work_tree=path, attribute_files=self._index_attribute_files)
+		self.git.cache = self.commands
+		# 进程内的对象库，HEAD 和暂存区中的文件内容直接从松散对象和 packfile 读取
+		self.objects = self._open_object_store()
+		# 常驻的对象读取进程，对象库无法处理的读取回退到它
+		self.blob_reader = BlobReader(path, limiter=self.limiter, metrics=self.metrics)
+		# 基于索引 stat 信息的快速变化检测
+		self.probe = WorktreeProbe(
+			path, self.git_dir, read_hash_size(self.git_dir),
+			run_git=self._get_changed_paths,
+			read_status=lambda: StatusSnapshot.from_dict(self.backend.read_status(None))
+		)
+		# 分支元数据索引
+		self.branches = BranchIndex(self.git, self.git_dir)
+		# 单个文件差异的大小和行数上限
+		self.diff_max_bytes = DIFF_MAX_BYTES
+		self.diff_max_lines = DIFF_MAX_LINES
+		self.preview_tail_bytes = PREVIEW_TAIL_BYTES
+		self.previews = PreviewReader()
+		# 变更文件分类（二进制、大小、LFS、生成文件）
+		self.classifier = FileClassifier(self.git, path, self.git_dir, attribute_files=self._index_attribute_files)
+		self.backend = create_backend(backend, self)
+		logger.info(f"仓库实现: {self.backend.name}")
+
+	def _open_object_store(self):
+		try:
+			return ObjectStore(self.git_dir)
+		except Exception as e:
+			logger.warning(f"无法打开对象库，文件内容将通过 git cat-file 读取: {str(e)}")
+			return None
+
+	def close(self):
+		"""释放仓库占用的后台进程"""
+		logger.debug(f"命令缓存统计: {self.commands.stats()}")
+		self.backend.close()
+		self.blob_reader.close()
+		if self.objects:
+			self.objects.close()
+
+	def dump_metrics(self, path):
+		"""将命令统计和命令缓存的命中情况写入 JSON 文件"""
+		self.metrics.dump_json(path, {
+			'repository': self.path,
+			'backend': self.backend.name,
+			'command_cache': self.commands.stats()
+		})
+
+	def read_blob(self, revision, file_path):
+		"""读取指定版本中文件的内容（字节），revision 为 ":0" 时读取暂存区"""
+		data = self.backend.read_blob(revision, file_path)
+		if data is None:
+			raise Exception(f"对象不存在: {revision}:{file_path}")
+		return data
+
+	def read_blob_text(self, revision, file_path):
+		"""读取指定版本中文件的内容并解码为文本"""
+		return self.read_blob(revision, file_path).decode('utf-8', errors='replace')
+
+	def _run_git_command(self, command, cwd=None, timeout=None, input=None):
+		"""执行 Git 命令并返回输出
+
+		同步封装，实际由 AsyncGitRunner 在后台事件循环中执行，
+		字符串命令按 shell 规则拆分为参数，不再经过 shell。
+		只读命令的输出通过 CommandCache 缓存，修改类命令会使缓存失效。
+		"""
+		argv = to_argv(command)
+		execute = lambda: self.runner.run_sync(argv, timeout=timeout, input=input, cwd=cwd)
+		if self.commands is None:
+			return execute()
+		return self.commands.run('text', argv, execute, cwd, input)
+
+	def _invalidate_on_done(self, future):
+		"""修改类命令提交时和完成后各清空一次命令缓存"""
+		self.commands.invalidate()
+		future.add_done_callback(lambda _: self.commands.invalidate())
+
+	def get_status(self, paths=None):
+		"""获取仓库状态
+
+		只调用一次 `git status --porcelain=v2 -z --branch`，并以流的方式解析输出。
+		指定 paths 时只查询这些路径（目录包含其下所有文件）的状态。
+		返回不可变的 StatusSnapshot。
+		"""
+		logger.debug(f"获取仓库状态: {self.path}")
+		partial = paths is not None and len(paths) <= PATHSPEC_ARG_LIMIT
+		try:
+			start = time.perf_counter()
+			status = StatusSnapshot.from_dict(self.backend.read_status(list(paths) if partial else None))
+			logger.debug(f"仓库状态: {status}")
+			if not partial:
+				self.probe.capture(status, time.perf_counter() - start)
+			return status
+		except Exception as e:
+			logger.error(f"获取仓库状态失败: {str(e)}")
+			raise
+
+	def _index_attribute_files(self):
+		index = self.probe.current_index()
+		return index.attribute_files() if index is not None else []
+
+	def has_changes(self):
+		"""判断自上次 get_status 以来工作区、索引或 HEAD 是否可能有变化
+
+		读取 .git/index 并比较 stat 信息，竞态干净的条目由 git diff 确认；
+		逐个 stat 比 git status 更慢的大仓库每次都运行一次 git status 比较（参见 WorktreeProbe.last_check）。
+		"""
+		try:
+			return self.probe.has_changes()
+		except Exception as e:
+			logger.warning(f"变化检测失败: {str(e)}")
+			return True
+
+	def get_ignored_paths(self, paths):
+		"""返回 paths 中被 .gitignore 忽略的路径集合"""
+		if not paths:
+			return set()
+		data = b"".join(os.fsencode(p) + b"\0" for p in paths)
+		# 返回码 1 表示没有被忽略的路径
+		output = self.git.run(["check-ignore", "--stdin", "-z"], input=data, ok_codes=(0, 1))
+		return {os.fsdecode(p) for p in output.split(b"\0") if p}
+
+	def _get_changed_paths(self, paths):
+		"""通过 git diff 确认给定路径中内容有变化的文件"""
+		output = self.git.run(["--literal-pathspecs", "diff", "--name-only", "-z", "--"] + list(paths))
+		return [os.fsdecode(p) for p in output.split(b"\0") if p]
+
+	def stage_file(self, file_path):
+		"""暂存文件"""
+		self.stage_files([file_path])
+
+	def unstage_file(self, file_path):
+		"""取消暂存文件"""
+		self.unstage_files([file_path])
+
+	def stage_files(self, paths, progress=None):
+		"""批量暂存文件
+
+		路径以 NUL 分隔通过标准输入传给 git add，不受命令行长度限制，
+		也不需要对空格等特殊字符转义。progress(已完成数, 总数) 在每批完成后调用。
+		"""
+		logger.info(f"暂存 {len(paths)} 个文件")
+		self.backend.stage(paths, progress)
+
+	def unstage_files(self, paths, progress=None):
+		"""批量取消暂存文件"""
+		logger.info(f"取消暂存 {len(paths)} 个文件")
+		self.backend.unstage(paths, progress)
+
+	def commit(self, message):
+		"""提交更改"""
+		logger.info(f"提交更改: {message}")
+		self.backend.commit(message)
+
+	def pull(self):
+		"""拉取更改"""
+		self.submit_pull().result()
+
+	def push(self):
+		"""推送更改"""
+		self.submit_push().result()
+
+	def fetch(self):
+		"""获取远端更新"""
+		self.submit_fetch().result()
+
+	def submit_pull(self, progress=None):
+		"""在后台拉取更改，返回可取消的 Future"""
+		logger.info("拉取更改")
+		return self.submit_remote_command(["pull", "--progress"], progress)
+
+	def submit_push(self, progress=None):
+		"""在后台推送更改，返回可取消的 Future"""
+		logger.info("推送更改")
+		return self.submit_remote_command(["push", "--progress"], progress)
+
+	def submit_fetch(self, progress=None):
+		"""在后台获取远端更新，返回可取消的 Future"""
+		logger.info("获取远端更新")
+		return self.submit_remote_command(["fetch", "--progress"], progress)
+
+	def submit_remote_command(self, command, progress=None):
+		"""在后台执行网络命令，progress 在事件循环线程中接收 parse_progress_line 格式的进度"""
+		on_line = None
+		if progress:
+			def on_line(line):
+				info = parse_progress_line(line)
+				if info:
+					progress(info)
+		future = self.runner.submit(command, env=REMOTE_ENV, on_stderr_line=on_line)
+		self._invalidate_on_done(future)
+		return future
+
+	def get_head_oid(self):
+		"""返回 HEAD 指向的提交，尚无提交时返回 None"""
+		return self.backend.head_oid()
+
+	def get_changed_files(self, old_revision, new_revision):
+		"""返回两个版本之间内容有变化的文件"""
+		output = self.git.run(["diff", "--name-only", "--no-renames", "-z", old_revision, new_revision, "--"])
+		return [os.fsdecode(p) for p in output.split(b"\0") if p]
+
+	def get_diff(self, file_path, status=None):
+		"""获取文件差异，status 为调用方已有的状态快照，未提供时只查询该文件的状态"""
+		logger.debug(f"获取文件差异: {file_path}")
+
+		try:
+			# 检查文件状态
+			if status is None:
+				status = self.get_status(paths=[file_path])
+			entry = status.entry(file_path) or StatusEntry(file_path)
+
+			# 如果是未跟踪的文件，显示文件内容
+			if entry.untracked:
+				logger.debug(f"显示未跟踪文件内容: {file_path}")
+				# 与 get_file_diff 相同，是否为二进制由分类器（属性和文件头中的 NUL）决定
+				info = self.classify_files([file_path], untracked=[file_path])[file_path]
+				placeholder = self._get_placeholder(file_path, info)
+				if placeholder:
+					return f"New file: {file_path}\n\n{placeholder}"
+				if info['binary']:
+					return f"New file: {file_path}\n\n[Binary file, content cannot be displayed]"
+				try:
+					with self.previews.open(os.path.join(self.path, file_path)) as preview:
+						note = NON_UTF8_NOTE if preview.encoding == 'latin-1' else ""
+						# 格式化为类似 diff 的输出，以便高亮显示
+						lines = preview.iter_lines(self.diff_max_bytes, self.diff_max_lines, '+', self.preview_tail_bytes)
+						return f"New file{note}: {file_path}\n\n" + "\n".join(lines)
+				except FileNotFoundError:
+					return f"File not found: {file_path}"
+
+			# 如果是已删除的文件，显示删除信息
+			elif entry.deleted:
+				logger.debug(f"显示已删除文件: {file_path}")
+				# 尝试获取删除前的文件内容
+				try:
+					content, truncated = self._read_blob_head("HEAD", file_path)
+					# 格式化为类似 diff 的输出
+					return f"Deleted file: {file_path}\n\n{self._prefix_lines(content, '-', truncated)}"
+				except Exception:
+					return f"Deleted file: {file_path}\n\n[Cannot display content before deletion]"
+
+			# 如果是已暂存的文件，使用 --cached 选项
+			elif entry.staged:
+				logger.debug(f"显示已暂存文件差异: {file_path}")
+				diff_output = self._read_diff(self.iter_diff(file_path, cached=True))
+				# 如果输出为空（例如新添加的文件），则显示完整内容
+				if not diff_output.strip():
+					try:
+						# 获取暂存区中的文件内容
+						content, truncated = self._read_blob_head(":0", file_path)
+						# 格式化为类似 diff 的输出
+						return f"Staged new file: {file_path}\n\n{self._prefix_lines(content, '+', truncated)}"
+					except Exception:
+						return f"Staged new file: {file_path}\n\n[Cannot display content]"
+				return diff_output
+
+			# 如果是已修改但未暂存的文件，使用普通 diff
+			else:
+				logger.debug(f"显示未暂存文件差异: {file_path}")
+				# 使用 -U10 选项显示更多上下文
+				return self._read_diff(self.iter_diff(file_path, context_lines=10))
+		except Exception as e:
+			logger.error(f"获取差异失败: {str(e)}")
+			raise
+
+	def get_branches(self):
+		"""获取所有本地分支"""
+		branches = self.backend.list_branches()
+		logger.debug(f"分支列表: {branches}")
+		return branches
+
+	def get_current_branch(self):
+		"""获取当前分支名，分离头指针时返回 HEAD"""
+		return self.backend.current_branch()
+
+	def checkout_branch(self, branch_name):
+		"""切换分支"""
+		logger.info(f"切换分支: {branch_name}")
+		self._run_git_command(["checkout", branch_name])
+
+	def create_branch(self, branch_name):
+		"""创建新分支"""
+		logger.info(f"创建分支: {branch_name}")
+		self._run_git_command(["branch", branch_name])
+
+	def get_file_diff(self, file_path, status=None):
+		"""获取文件差异，不触发状态刷新
+
+		status 为调用方已有的状态快照，文件在快照中时直接据此判断是否未跟踪。
+		"""
+		logger.debug(f"获取文件差异: {file_path}")
+		
+		# 检查文件是否存在
+		full_path = os.path.join(self.path, file_path)
+		
+		# 对于未跟踪的文件，显示文件内容
+		if not os.path.exists(full_path):
+			return f"文件不存在: {file_path}"
+		
+		# 获取文件状态
+		try:
+			# 检查文件是否已暂存
+			staged_output = self._read_diff(self.iter_diff(file_path, cached=True))
+			if staged_output:
+				return f"已暂存的更改:\n{staged_output}"
+			
+			# 检查文件是否已修改
+			modified_output = self._read_diff(self.iter_diff(file_path))
+			if modified_output:
+				return modified_output
+			
+			# 检查文件是否未跟踪
+			if status is not None and file_path in status:
+				untracked = file_path in status.untracked
+			else:
+				# 只查询这一个路径，不列出整个工作区的未跟踪文件
+				output = self.git.run(["--literal-pathspecs", "ls-files", "--others", "--exclude-standard", "-z", "--", file_path])
+				untracked = os.fsencode(file_path) in output.split(b"\0")
+			info = self.classify_files([file_path], untracked=[file_path] if untracked else [])[file_path]
+			if untracked:
+				logger.debug(f"显示未跟踪文件内容: {file_path}")
+			
+			# 未跟踪或没有变化的文件，显示文件内容
+			return self._get_content_preview(file_path, full_path, untracked, info)
+		except Exception as e:
+			logger.error(f"获取文件差异失败: {str(e)}", exc_info=True)
+			return f"获取差异失败: {str(e)}"
+
+	def get_diffs(self, paths, status=None):
+		"""批量获取多个文件的差异，返回 路径 -> 差异文本 的字典
+
+		暂存区和工作区各只调用一次 `git diff --patch`，并按文件流式切分输出；
+		没有差异的文件（如未跟踪文件）直接读取文件内容。
+		结果格式与 get_file_diff 一致。
+		"""
+		paths = list(dict.fromkeys(paths))
+		logger.debug(f"批量获取文件差异: {len(paths)} 个文件")
+		if not paths:
+			return {}
+
+		try:
+			if status is None:
+				status = self.get_status()
+
+			# 先批量分类，LFS、生成文件和禁用 diff 的文件不生成补丁也不读取内容
+			classes = self.classify_files(paths, status)
+			diffs = {}
+			for file_path, info in classes.items():
+				placeholder = self._get_placeholder(file_path, info)
+				if placeholder:
+					diffs[file_path] = placeholder
+			patch_paths = [p for p in paths if p not in diffs]
+
+			staged_diffs = self._get_patches(["--cached"], patch_paths)
+			worktree_diffs = self._get_patches([], patch_paths)
+		except Exception as e:
+			logger.error(f"批量获取文件差异失败: {str(e)}", exc_info=True)
+			return {file_path: f"获取差异失败: {str(e)}" for file_path in paths}
+
+		untracked = status.untracked
+		for file_path in patch_paths:
+			if file_path in staged_diffs:
+				diffs[file_path] = f"已暂存的更改:\n{staged_diffs[file_path]}"
+			elif file_path in worktree_diffs:
+				diffs[file_path] = worktree_diffs[file_path]
+			else:
+				full_path = os.path.join(self.path, file_path)
+				if not os.path.exists(full_path):
+					diffs[file_path] = f"文件不存在: {file_path}"
+				else:
+					diffs[file_path] = self._get_content_preview(
+						file_path, full_path, file_path in untracked, classes[file_path]
+					)
+		return diffs
+
+	def get_diff_keys(self, paths, status):
+		"""返回 路径 -> 差异内容标识，用于持久差异缓存（参见 aicommit_git.diff_cache）
+
+		标识由文件在 HEAD 和暂存区中的对象 ID、工作区的 stat 签名、状态条目、属性文件和差异选项计算，
+		与 get_diffs 结果有关的输入不变时标识不变，且不依赖进程。
+		对象库或索引无法在进程内读取，或者文件刚被修改、stat 不能代表内容时，路径不在结果中。
+		"""
+		if self.objects is None:
+			return {}
+		index = self.probe.current_index()
+		if index is None or index.unsupported:
+			return {}
+		try:
+			head_tree = self.objects.resolve_tree("HEAD")
+		except Exception as e:
+			logger.warning(f"无法解析 HEAD，差异不写入持久缓存: {str(e)}")
+			return {}
+
+		options = (
+			DIFF_CACHE_FORMAT, self.diff_max_bytes, self.diff_max_lines, self.preview_tail_bytes,
+			self.classifier.attribute_signature()
+		)
+		now = time.time_ns()
+		keys = {}
+		for path in paths:
+			entry = status.entry(path)
+			if entry is None:
+				continue
+			try:
+				st = os.lstat(os.path.join(self.path, path))
+				if now - st.st_mtime_ns < DIFF_CACHE_RACY_NS:
+					continue
+				worktree = worktree_signature(st)
+			except OSError:
+				worktree = None
+			head = self.objects.find_in_tree(head_tree, path) if head_tree else None
+			keys[path] = diff_cache_key(
+				options,
+				path,
+				(entry.staged, entry.modified, entry.deleted, entry.untracked, entry.unmerged),
+				head,
+				index.find_oid(path),
+				worktree
+			)
+		return keys
+
+	def classify_files(self, paths, status=None, untracked=None):
+		"""批量分类文件，返回 路径 -> 分类信息，参见 FileClassifier.classify"""
+		if status is not None:
+			untracked = status.untracked
+			head_oid = status.head_oid
+		else:
+			head_oid = self.get_head_oid()
+		return self.classifier.classify(paths, untracked or (), head_oid)
+
+	def _get_placeholder(self, file_path, info):
+		"""不需要显示内容的文件返回占位文本，否则返回 None"""
+		if info['lfs']:
+			return f"[LFS file {file_path} not shown]"
+		if info['generated']:
+			return f"[Generated file {file_path} not shown]"
+		if not info['diff']:
+			return f"[Binary file {file_path} not shown]"
+		return None
+
+	def iter_diff(self, file_path, cached=False, untracked=False, context_lines=None, max_bytes=None, max_lines=None):
+		"""流式产出单个文件的差异事件（文件头、hunk、截断提示），格式参见 iter_diff_events
+
+		cached 为 True 时比较暂存区与 HEAD；untracked 为 True 时与空文件比较以显示完整内容；
+		context_lines 为上下文行数，默认与 git diff 相同。
+		达到上限后立即停止读取并结束 Git 进程，不会在内存中保留完整的差异。
+		"""
+		max_bytes = self.diff_max_bytes if max_bytes is None else max_bytes
+		max_lines = self.diff_max_lines if max_lines is None else max_lines
+		command = ["diff", "--patch", "--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/"]
+		if context_lines is not None:
+			command.append(f"-U{int(context_lines)}")
+		if untracked:
+			# --no-index 在存在差异时返回 1
+			chunks = self.backend.iter_diff_output(command + ["--no-index", "--", "/dev/null", file_path], ok_codes=(0, 1))
+		else:
+			if cached:
+				command.append("--cached")
+			chunks = self.backend.iter_diff_output(["--literal-pathspecs"] + command + ["--", file_path])
+
+		try:
+			for event in iter_diff_events(chunks, max_bytes, max_lines):
+				yield event
+				if event['type'] == 'truncated':
+					break
+		finally:
+			chunks.close()
+
+	@staticmethod
+	def _read_diff(events):
+		"""将 iter_diff 的事件拼接为差异文本"""
+		return b"\n".join(iter_event_lines(events)).decode('utf-8', errors='replace').rstrip("\n")
+
+	def get_hunks(self, file_path, cached=False, max_bytes=None, max_lines=None):
+		"""返回文件暂存区（cached 为 True）或工作区差异的 hunk 模型，参见 collect_hunks
+
+		默认使用与差异显示相同的上限，max_bytes/max_lines 为 0 时读取完整差异。
+		"""
+		return collect_hunks(self.iter_diff(file_path, cached=cached, max_bytes=max_bytes, max_lines=max_lines), staged=cached)
+
+	def stage_hunks(self, file_path, hunk_ids):
+		"""只暂存工作区差异中指定的 hunk"""
+		self._apply_hunks(file_path, set(hunk_ids), cached=False)
+
+	def unstage_hunks(self, file_path, hunk_ids):
+		"""只取消暂存暂存区差异中指定的 hunk"""
+		self._apply_hunks(file_path, set(hunk_ids), cached=True)
+
+	def apply_hunk_selection(self, file_path, excluded_ids):
+		"""按 hunk 选择更新暂存区：暂存未排除的工作区 hunk，取消暂存被排除的已暂存 hunk"""
+		excluded_ids = set(excluded_ids)
+		worktree = self.get_hunks(file_path, max_bytes=0, max_lines=0)
+		selected = {h['id'] for h in worktree['hunks'] if h['id'] not in excluded_ids}
+		if selected:
+			self._apply_model(worktree, selected, reverse=False)
+		if excluded_ids:
+			staged = self.get_hunks(file_path, cached=True, max_bytes=0, max_lines=0)
+			selected = {h['id'] for h in staged['hunks'] if h['id'] in excluded_ids}
+			if selected:
+				self._apply_model(staged, selected, reverse=True)
+
+	def _apply_hunks(self, file_path, hunk_ids, cached):
+		model = self.get_hunks(file_path, cached=cached, max_bytes=0, max_lines=0)
+		missing = hunk_ids - {h['id'] for h in model['hunks']}
+		if missing:
+			raise Exception(f"差异已变化，请刷新后重新选择: {file_path}")
+		self._apply_model(model, hunk_ids, reverse=cached)
+
+	def _apply_model(self, model, hunk_ids, reverse):
+		"""用选中的 hunk 生成最小补丁，通过 `git apply --cached --recount` 应用到暂存区"""
+		hunks = [h for h in model['hunks'] if h['id'] in hunk_ids]
+		if not hunks:
+			return
+		patch = build_patch(model['header'], hunks, reverse=reverse)
+		command = ["apply", "--cached", "--recount"]
+		if reverse:
+			command.append("--reverse")
+		logger.info(f"{'取消暂存' if reverse else '暂存'} {len(hunks)} 个差异块: {hunks[0]['path']}")
+		self._run_git_command(command + ["-"], input=patch)
+
+	def _get_patches(self, options, paths):
+		"""运行一次 git diff 并按文件切分补丁，只保留 paths 中的文件"""
+		wanted = set(paths)
+		# 固定前缀并禁用颜色和外部 diff 工具，保证输出可以被解析
+		command = [
+			"--literal-pathspecs", "diff", "--patch", "--no-color", "--no-ext-diff",
+			"--src-prefix=a/", "--dst-prefix=b/"
+		] + options
+		# 路径较少时传给 Git 以缩小 diff 范围，否则取完整 diff 后再过滤，避免命令行过长
+		if len(paths) <= PATHSPEC_ARG_LIMIT:
+			command += ["--"] + list(paths)
+
+		patches = {}
+		chunks = self.backend.iter_diff_output(command)
+		for file_path, patch in iter_file_patches(chunks, self.diff_max_bytes, self.diff_max_lines):
+			if file_path in wanted:
+				patches[file_path] = patch.decode('utf-8', errors='replace').rstrip("\n")
+		return patches
+
+	def _get_content_preview(self, file_path, full_path, untracked, info):
+		"""读取文件内容作为预览，二进制文件只显示提示"""
+		if untracked:
+			title = "新文件"
+			error_title = "无法读取未跟踪文件"
+		else:
+			title = "文件内容"
+			error_title = "无法读取文件"
+
+		if info['binary']:
+			# 对于二进制文件，使用 Git 原生格式
+			return f"[Binary file {file_path} not shown]"
+
+		# 对于文本文件，映射文件并只解码预览窗口内的行
+		try:
+			with self.previews.open(full_path) as preview:
+				if preview.encoding == 'latin-1':
+					title += NON_UTF8_NOTE
+				lines = preview.iter_lines(self.diff_max_bytes, self.diff_max_lines, tail_bytes=self.preview_tail_bytes)
+				return f"{title}: {file_path}\n\n" + "\n".join(lines)
+		except Exception as e:
+			return f"{error_title}: {file_path}\n{str(e)}"
+
+	def _read_blob_head(self, revision, file_path):
+		"""经由仓库实现读取对象的前 diff_max_bytes 字节
+
+		返回 (文本, 是否按字节数截断)，大文件不会被整个读入内存，也不会为单个文件启动新的 Git 进程。
+		"""
+		result = self.backend.read_blob_head(revision, file_path, self.diff_max_bytes)
+		if result is None:
+			raise Exception(f"对象不存在: {revision}:{file_path}")
+		data, truncated = result
+		return data.decode('utf-8', errors='replace'), truncated
+
+	def _prefix_lines(self, content, prefix, truncated=False):
+		"""为每一行添加 +/- 前缀，格式化为类似 diff 的输出，truncated 表示内容已按字节数截断"""
+		lines = content.splitlines()
+		text = "".join(f"{prefix}{line}\n" for line in lines[:self.diff_max_lines])
+		if len(lines) > self.diff_max_lines:
+			return text + truncation_marker({'reason': 'lines', 'limit': self.diff_max_lines}).decode('utf-8')
+		if truncated:
+			return text + truncation_marker({'reason': 'bytes', 'limit': self.diff_max_bytes}).decode('utf-8')
+		return text
@@ -0,0 +1,285 @@
+import os
+import time
+import shlex
+import asyncio
+import threading
+import contextlib
+import subprocess
+import collections
+import logging
+
+from aicommit_git.status import iter_nul_records, iter_pipe_chunks
+from aicommit_git.diff_parser import iter_lines
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# 所有 Git 子进程共用的环境变量：
+# LC_ALL=C 避免本地化输出和字符集转换，GIT_OPTIONAL_LOCKS=0 避免只读命令刷新索引
+GIT_ENV_OVERRIDES = {"LC_ALL": "C", "GIT_OPTIONAL_LOCKS": "0"}
+
+# 直接作为 pathspec 传给 Git 的最大路径数，超过时取完整输出后再过滤，避免命令行过长
+PATHSPEC_ARG_LIMIT = 500
+
+# 网络操作额外使用的环境变量，没有终端时不等待输入凭据，直接失败
+REMOTE_ENV = {"GIT_TERMINAL_PROMPT": "0"}
+
+# 每个仓库同时运行的 Git 进程数上限
+DEFAULT_MAX_PROCESSES = 4
+
+def build_git_env(extra=None):
+	"""基于当前进程环境构建 Git 子进程的环境变量"""
+	env = dict(os.environ)
+	env.update(GIT_ENV_OVERRIDES)
+	if extra:
+		env.update(extra)
+	return env
+
+def to_argv(command):
+	"""将字符串或列表形式的 Git 命令转换为参数列表（不含 git 本身）"""
+	if isinstance(command, str):
+		argv = shlex.split(command, posix=(os.name != "nt"))
+		# 兼容以 "git " 开头的完整命令字符串
+		if argv and argv[0] == "git":
+			argv = argv[1:]
+		return argv
+	return list(command)
+
+def decode_output(data):
+	"""以 UTF-8 解码命令输出，统一换行符并去掉首尾空白"""
+	return data.decode('utf-8', errors='replace').replace("\r\n", "\n").strip()
+
+def raise_git_error(error):
+	"""记录并抛出 Git 命令失败的异常"""
+	error_msg = decode_output(error)
+	logger.error(f"Git 命令失败: {error_msg}")
+	raise Exception(f"Git 命令失败: {error_msg}")
+
+def _grant(future):
+	if not future.done():
+		future.set_result(None)
+
+class ProcessLimiter:
+	"""限制一个仓库同时运行的 Git 进程数，线程和事件循环中的协程共用同一个额度
+
+	线程通过 with limiter.slot(): 阻塞等待；协程 await acquire_async() 后在 finally 中调用 release()。
+	等待者按先后顺序获得额度，释放时额度直接交给队首的等待者。
+	已持有额度的线程再次申请时不再等待（例如边读取一个命令的输出边执行另一个命令），
+	否则所有额度都可能被互相等待的调用占满。
+	"""
+
+	def __init__(self, max_processes=DEFAULT_MAX_PROCESSES):
+		self.max_processes = max_processes
+		self._lock = threading.Lock()
+		self._running = 0
+		# 等待者的唤醒函数，按申请顺序排列
+		self._waiters = collections.deque()
+		# 线程 ID -> 该线程嵌套持有的层数
+		self._depth = {}
+
+	def held(self):
+		"""当前线程是否已持有额度"""
+		with self._lock:
+			return threading.get_ident() in self._depth
+
+	def acquire(self):
+		"""在当前线程中阻塞获取额度，返回交给 release() 的令牌"""
+		ident = threading.get_ident()
+		with self._lock:
+			depth = self._depth.get(ident, 0)
+			self._depth[ident] = depth + 1
+			if depth:
+				return ident
+			if self._running < self.max_processes and not self._waiters:
+				self._running += 1
+				return ident
+			event = threading.Event()
+			self._waiters.append(event.set)
+		event.wait()
+		return ident
+
+	async def acquire_async(self):
+		"""在事件循环中等待额度，不占用线程；之后以 release() 释放"""
+		loop = asyncio.get_running_loop()
+		with self._lock:
+			if self._running < self.max_processes and not self._waiters:
+				self._running += 1
+				return
+			future = loop.create_future()
+			waiter = lambda: loop.call_soon_threadsafe(_grant, future)
+			self._waiters.append(waiter)
+		try:
+			await future
+		except asyncio.CancelledError:
+			with self._lock:
+				granted = waiter not in self._waiters
+				if not granted:
+					self._waiters.remove(waiter)
+			# 取消前额度已经交给了这个等待者
+			if granted:
+				self.release()
+			raise
+
+	def release(self, token=None):
+		"""释放额度，token 为 acquire() 的返回值，协程获取的额度不需要令牌"""
+		with self._lock:
+			if token is not None:
+				depth = self._depth.pop(token) - 1
+				if depth:
+					self._depth[token] = depth
+					return
+			if self._waiters:
+				self._waiters.popleft()()
+			else:
+				self._running -= 1
+
+	@contextlib.contextmanager
+	def slot(self):
+		"""在 with 块中持有一个额度，生成器在其他线程中被关闭时也能正确释放"""
+		token = self.acquire()
+		try:
+			yield
+		finally:
+			self.release(token)
+
+class GitCommandRunner:
+	"""不经过 shell、直接以参数列表执行 Git 命令的共享执行器
+
+	环境变量在创建时构建一次，之后每次调用直接复用。
+	run() 一次性返回完整的标准输出字节；iter_chunks()/iter_lines()
+	以流的方式逐块或逐行产出，适合处理非常大的输出。
+	指定 cache（CommandCache）时，只读命令的完整输出会被缓存，修改类命令执行前后清空缓存；
+	指定 metrics（CommandMetrics）时记录每次实际执行的耗时、输出字节数和返回码；
+	指定 limiter（ProcessLimiter）时每个进程从启动到退出都占用一个额度。
+	"""
+
+	def __init__(self, cwd=None, env=None, cache=None, metrics=None, limiter=None):
+		self.cwd = cwd
+		self.env = build_git_env(env)
+		self.cache = cache
+		self.metrics = metrics
+		self.limiter = limiter
+
+	def _slot(self):
+		return self.limiter.slot() if self.limiter is not None else contextlib.nullcontext()
+
+	def _popen(self, argv, cwd, stdin):
+		logger.debug(f"执行命令: git {' '.join(argv)} (在 {cwd or self.cwd})")
+		try:
+			return subprocess.Popen(
+				["git"] + argv,
+				stdin=stdin,
+				stdout=subprocess.PIPE,
+				stderr=subprocess.PIPE,
+				cwd=cwd or self.cwd,
+				env=self.env
+			)
+		except OSError as e:
+			logger.error(f"执行 Git 命令失败: {str(e)}")
+			raise Exception(f"执行 Git 命令失败: {str(e)}")
+
+	def run(self, command, cwd=None, input=None, ok_codes=(0,)):
+		"""执行命令并返回完整的标准输出字节"""
+		argv = to_argv(command)
+		if self.cache is not None:
+			return self.cache.run('bytes', argv, lambda: self._run_argv(argv, cwd, input, ok_codes), cwd, input, ok_codes)
+		return self._run_argv(argv, cwd, input, ok_codes)
+
+	def _run_argv(self, argv, cwd, input, ok_codes):
+		with self._slot():
+			start = time.perf_counter()
+			process = self._popen(argv, cwd, subprocess.PIPE if input is not None else subprocess.DEVNULL)
+			output, error = process.communicate(input)
+		if self.metrics is not None:
+			self.metrics.record(argv, time.perf_counter() - start, len(output), process.returncode)
+		if process.returncode not in ok_codes:
+			raise_git_error(error)
+		return output
+
+	def run_text(self, command, cwd=None, input=None):
+		"""执行命令并返回解码后、去掉首尾空白的文本输出"""
+		return decode_output(self.run(command, cwd, input))
+
+	def iter_chunks(self, command, cwd=None, input=None, ok_codes=(0,)):
+		"""执行命令，以字节块的形式逐块产出标准输出
+
+		标准错误在后台线程中读取，避免其缓冲区写满导致死锁。
+		调用方提前停止读取时终止进程；输出读取完毕后检查返回码，失败时抛出异常。
+		可缓存的命令完整读取且输出不超过单条缓存上限时写入缓存，命中时直接产出缓存的输出。
+		"""
+		argv = to_argv(command)
+		token = self.cache.lookup('bytes', argv, cwd, input, ok_codes) if self.cache is not None else None
+		if token is None:
+			yield from self._iter_argv_chunks(argv, cwd, input, ok_codes)
+			return
+
+		output = self.cache.get(token)
+		if output is not None:
+			if output:
+				yield output
+			return
+		kept = []
+		size = 0
+		for chunk in self._iter_argv_chunks(argv, cwd, input, ok_codes):
+			if kept is not None:
+				size += len(chunk)
+				if size <= self.cache.max_entry_bytes:
+					kept.append(chunk)
+				else:
+					kept = None
+			yield chunk
+		if kept is not None:
+			self.cache.put(token, b"".join(kept))
+
+	def _iter_argv_chunks(self, argv, cwd, input, ok_codes):
+		with self._slot():
+			start = time.perf_counter()
+			process = self._popen(argv, cwd, subprocess.PIPE if input is not None else subprocess.DEVNULL)
+			errors = []
+			stderr_thread = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+			stderr_thread.start()
+			if input is not None:
+				threading.Thread(target=self._feed_stdin, args=(process.stdin, input), daemon=True).start()
+
+			completed = False
+			output_bytes = 0
+			try:
+				for chunk in iter_pipe_chunks(process.stdout):
+					output_bytes += len(chunk)
+					yield chunk
+				completed = True
+			finally:
+				if not completed and process.poll() is None:
+					process.kill()
+				process.stdout.close()
+				process.wait()
+				stderr_thread.join()
+				process.stderr.close()
+				# 流式读取的耗时包含调用方处理输出的时间
+				if self.metrics is not None:
+					self.metrics.record(argv, time.perf_counter() - start, output_bytes, process.returncode)
+
+		if process.returncode not in ok_codes:
+			raise_git_error(b"".join(errors))
+
+	def iter_lines(self, command, cwd=None, input=None, separator=b"\n"):
+		"""执行命令，逐条产出输出记录（字节，不含分隔符）
+
+		separator 只支持换行符和 NUL 两种。
+		"""
+		chunks = self.iter_chunks(command, cwd, input)
+		if separator == b"\0":
+			return iter_nul_records(chunks)
+		return iter_lines(chunks)
+
+	@staticmethod
+	def _feed_stdin(stdin, data):
+		try:
+			stdin.write(data)
+		except (BrokenPipeError, OSError):
+			pass
+		finally:
+			try:
+				stdin.close()
+			except OSError:
+				pass
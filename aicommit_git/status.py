@@ -0,0 +1,325 @@
+import os
+import itertools
+from types import MappingProxyType
+
+# 每次从管道读取的块大小
+READ_CHUNK_SIZE = 64 * 1024
+
+def iter_nul_records(chunks):
+	"""将字节块流按 NUL 分隔符切分为记录，逐条产出
+
+	跨块的不完整记录追加到 bytearray 中，很长的记录（或没有 NUL 的大块输出）不会被反复复制。
+	"""
+	pending = bytearray()
+	for chunk in chunks:
+		if not chunk:
+			continue
+		end = chunk.find(b"\0")
+		if end < 0:
+			pending += chunk
+			continue
+		if pending:
+			pending += chunk[:end]
+			yield bytes(pending)
+			pending.clear()
+		else:
+			yield chunk[:end]
+		start = end + 1
+		end = chunk.find(b"\0", start)
+		while end >= 0:
+			yield chunk[start:end]
+			start = end + 1
+			end = chunk.find(b"\0", start)
+		# 最后一段可能不完整，留到下一块继续拼接
+		pending += chunk[start:]
+	if pending:
+		yield bytes(pending)
+
+def iter_pipe_chunks(pipe, chunk_size=READ_CHUNK_SIZE):
+	"""从管道中逐块读取数据"""
+	while True:
+		chunk = pipe.read(chunk_size)
+		if not chunk:
+			break
+		yield chunk
+
+def parse_porcelain_v2(chunks):
+	"""解析 `git status --porcelain=v2 -z --branch` 的输出
+
+	以流的方式处理输出，返回与旧版 get_status 兼容的状态字典，
+	并额外包含重命名和 ahead/behind 信息。
+	"""
+	status = {
+		'branch': "",
+		'modified': [],
+		'untracked': [],
+		'staged': [],
+		'deleted': [],
+		'renamed': {},
+		'unmerged': [],
+		'head_oid': None,
+		'upstream': None,
+		'ahead': 0,
+		'behind': 0
+	}
+
+	records = iter_nul_records(chunks)
+	for record in records:
+		if not record:
+			continue
+
+		kind = record[:1]
+
+		# 分支头信息
+		if kind == b"#":
+			_parse_branch_header(os.fsdecode(record), status)
+
+		# 普通变更: 1 <XY> <sub> <mH> <mI> <mW> <hH> <hI> <path>
+		elif kind == b"1":
+			fields = record.split(b" ", 8)
+			_add_entry(status, fields[1], os.fsdecode(fields[8]))
+
+		# 重命名或复制: 2 <XY> <sub> <mH> <mI> <mW> <hH> <hI> <Xscore> <path>\0<origPath>
+		elif kind == b"2":
+			fields = record.split(b" ", 9)
+			path = os.fsdecode(fields[9])
+			orig_path = os.fsdecode(next(records, b""))
+			_add_entry(status, fields[1], path)
+			if fields[8][:1] == b"R":
+				status['renamed'][path] = orig_path
+
+		# 未合并: u <XY> <sub> <m1> <m2> <m3> <mW> <h1> <h2> <h3> <path>
+		elif kind == b"u":
+			fields = record.split(b" ", 10)
+			path = os.fsdecode(fields[10])
+			status['unmerged'].append(path)
+			# 与 diff --name-only / diff --cached --name-only 的行为保持一致
+			status['modified'].append(path)
+			status['staged'].append(path)
+
+		# 未跟踪文件
+		elif kind == b"?":
+			status['untracked'].append(os.fsdecode(record[2:]))
+
+	return status
+
+def _parse_branch_header(line, status):
+	"""解析 `# branch.*` 头信息"""
+	parts = line.split(" ", 2)
+	if len(parts) < 3:
+		return
+
+	key, value = parts[1], parts[2]
+	if key == "branch.oid":
+		status['head_oid'] = None if value == "(initial)" else value
+	elif key == "branch.head":
+		# 与 rev-parse --abbrev-ref HEAD 保持一致，分离头指针时返回 HEAD
+		status['branch'] = "HEAD" if value == "(detached)" else value
+	elif key == "branch.upstream":
+		status['upstream'] = value
+	elif key == "branch.ab":
+		ahead, _, behind = value.partition(" ")
+		status['ahead'] = int(ahead.lstrip("+") or 0)
+		status['behind'] = int(behind.lstrip("-") or 0)
+
+def _add_entry(status, xy, path):
+	"""根据 XY 状态码将路径归类"""
+	index_state = xy[:1]
+	worktree_state = xy[1:2]
+
+	if index_state != b".":
+		status['staged'].append(path)
+
+	if worktree_state != b".":
+		status['modified'].append(path)
+		if worktree_state == b"D":
+			status['deleted'].append(path)
+
+# 状态字典中以路径列表保存的字段
+STATUS_LIST_KEYS = ('modified', 'untracked', 'staged', 'deleted', 'unmerged')
+
+def path_in_specs(path, specs):
+	"""判断路径是否等于 specs 中的某一项，或位于其中某个目录之下"""
+	if path in specs:
+		return True
+	index = path.find("/")
+	while index >= 0:
+		if path[:index] in specs:
+			return True
+		index = path.find("/", index + 1)
+	return False
+
+# 文件在界面中显示的状态，同一文件有多种状态时按此顺序取第一个
+DISPLAY_STATES = ('staged', 'modified', 'deleted', 'untracked')
+
+# 快照版本号，每创建一个快照递增
+_snapshot_versions = itertools.count(1)
+
+class StatusEntry:
+	"""单个路径的状态"""
+
+	__slots__ = ('path', 'staged', 'modified', 'deleted', 'untracked', 'unmerged', 'orig_path')
+
+	def __init__(self, path, staged=False, modified=False, deleted=False, untracked=False, unmerged=False, orig_path=None):
+		self.path = path
+		self.staged = staged
+		self.modified = modified
+		self.deleted = deleted
+		self.untracked = untracked
+		self.unmerged = unmerged
+		# 重命名前的路径
+		self.orig_path = orig_path
+
+	@property
+	def state(self):
+		"""界面中显示的状态，参见 DISPLAY_STATES"""
+		for name in DISPLAY_STATES:
+			if getattr(self, name):
+				return name
+		return None
+
+	def _key(self):
+		return (self.staged, self.modified, self.deleted, self.untracked, self.unmerged, self.orig_path)
+
+	def __eq__(self, other):
+		return isinstance(other, StatusEntry) and self.path == other.path and self._key() == other._key()
+
+	def __hash__(self):
+		return hash((self.path,) + self._key())
+
+	def __repr__(self):
+		return f"StatusEntry({self.path!r}, {self.state})"
+
+class StatusSnapshot:
+	"""不可变的仓库状态快照
+
+	entries 为 路径 -> StatusEntry（按已暂存、已修改、已删除、未跟踪的顺序排列），renamed 为 路径 -> 原路径，
+	两者都是只读映射；staged/modified/deleted/untracked/unmerged 为路径的 frozenset，成员判断为 O(1)。
+	version 在进程内单调递增，可用于判断缓存的差异是否基于较旧的状态。
+	仍支持 status['modified'] 这样的旧式字典访问，列表字段返回按 Git 输出顺序排列的新列表。
+	"""
+
+	__slots__ = (
+		'version', 'branch', 'head_oid', 'upstream', 'ahead', 'behind',
+		'entries', 'staged', 'modified', 'deleted', 'untracked', 'unmerged', 'renamed', '_lists'
+	)
+
+	def __init__(self, lists, renamed, branch="", head_oid=None, upstream=None, ahead=0, behind=0, entries=None):
+		"""lists 为 STATUS_LIST_KEYS 中各字段 -> 路径元组，entries 可以复用已有快照中未变化的条目"""
+		set_field = super().__setattr__
+		set_field('version', next(_snapshot_versions))
+		set_field('branch', branch)
+		set_field('head_oid', head_oid)
+		set_field('upstream', upstream)
+		set_field('ahead', ahead)
+		set_field('behind', behind)
+		set_field('_lists', {key: tuple(lists.get(key, ())) for key in STATUS_LIST_KEYS})
+		set_field('renamed', MappingProxyType(dict(renamed)))
+		for key in STATUS_LIST_KEYS:
+			set_field(key, frozenset(self._lists[key]))
+
+		reusable = entries or {}
+		built = {}
+		for key in DISPLAY_STATES:
+			for path in self._lists[key]:
+				if path in built:
+					continue
+				entry = StatusEntry(
+					path,
+					staged=path in self.staged,
+					modified=path in self.modified,
+					deleted=path in self.deleted,
+					untracked=path in self.untracked,
+					unmerged=path in self.unmerged,
+					orig_path=self.renamed.get(path)
+				)
+				# 内容相同的条目复用旧对象，delta() 可以直接按对象身份比较
+				old = reusable.get(path)
+				built[path] = old if old is not None and old == entry else entry
+		set_field('entries', MappingProxyType(built))
+
+	def __setattr__(self, name, value):
+		raise AttributeError("StatusSnapshot 是不可变的")
+
+	@classmethod
+	def from_dict(cls, status):
+		"""由 parse_porcelain_v2 格式的状态字典创建快照"""
+		return cls(
+			{key: status[key] for key in STATUS_LIST_KEYS},
+			status['renamed'],
+			branch=status['branch'],
+			head_oid=status.get('head_oid'),
+			upstream=status.get('upstream'),
+			ahead=status.get('ahead', 0),
+			behind=status.get('behind', 0)
+		)
+
+	def __getitem__(self, key):
+		if key in STATUS_LIST_KEYS:
+			return list(self._lists[key])
+		if key == 'renamed':
+			return dict(self.renamed)
+		if key in ('branch', 'head_oid', 'upstream', 'ahead', 'behind'):
+			return getattr(self, key)
+		raise KeyError(key)
+
+	def __contains__(self, path):
+		return path in self.entries
+
+	def __len__(self):
+		return len(self.entries)
+
+	def entry(self, path):
+		"""返回路径的状态条目，没有变化时返回 None"""
+		return self.entries.get(path)
+
+	def states(self):
+		"""返回 路径 -> 显示状态 的有序字典"""
+		return {path: entry.state for path, entry in self.entries.items()}
+
+	def merge(self, partial, specs):
+		"""将只查询了 specs 路径的部分状态合并进来，返回新的快照
+
+		specs 之外的路径沿用本快照中的条目对象，分支等头信息取自 partial。
+		"""
+		specs = set(specs)
+		lists = {
+			key: [p for p in self._lists[key] if not path_in_specs(p, specs)] + list(partial._lists[key])
+			for key in STATUS_LIST_KEYS
+		}
+		renamed = {path: orig for path, orig in self.renamed.items() if not path_in_specs(path, specs)}
+		renamed.update(partial.renamed)
+		return StatusSnapshot(
+			lists,
+			renamed,
+			branch=partial.branch,
+			head_oid=partial.head_oid,
+			upstream=partial.upstream,
+			ahead=partial.ahead,
+			behind=partial.behind,
+			entries=self.entries
+		)
+
+	def delta(self, other):
+		"""与另一个（通常是较旧的）快照比较，返回 (新增路径, 移除路径, 状态变化的路径) 三个集合
+
+		由 merge 产生的快照共享未变化的条目对象，这些条目只需比较对象身份。
+		"""
+		old_entries = other.entries if other is not None else {}
+		added = set()
+		changed = set()
+		for path, entry in self.entries.items():
+			old = old_entries.get(path)
+			if old is None:
+				added.add(path)
+			elif old is not entry and old != entry:
+				changed.add(path)
+		removed = {path for path in old_entries if path not in self.entries}
+		return added, removed, changed
+
+	def __repr__(self):
+		return f"StatusSnapshot(version={self.version}, branch={self.branch!r}, entries={len(self.entries)})"
+
+def merge_status(base, partial, specs):
+	"""将只查询了 specs 路径的部分状态合并到完整状态中，返回新的快照"""
+	return base.merge(partial, specs)
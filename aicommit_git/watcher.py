@@ -0,0 +1,330 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+import logging
+
+from aicommit_git.gitdir import find_common_dir
+
+# 配置日志记录器
+logger = logging.getLogger("git_operations")
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WORKTREE_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+	IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+GIT_DIR_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# Git 目录中需要关注的文件: 索引、HEAD 以及分支引用
+GIT_INDEX_FILES = ("index",)
+GIT_HEAD_FILES = ("HEAD", "packed-refs", "ORIG_HEAD", "MERGE_HEAD")
+
+# 链接工作区的引用保存在共享 Git 目录中，其根目录下只需关注 packed-refs
+GIT_COMMON_FILES = ("packed-refs",)
+
+def new_event():
+	"""创建一个空的变化事件
+
+	paths 为工作区中发生变化的相对路径集合（目录变化时为目录路径），
+	为 None 时表示无法确定具体路径，需要完整刷新。
+	"""
+	return {'paths': set(), 'index': False, 'head': False}
+
+def merge_event(target, event):
+	"""将 event 合并到 target 中"""
+	if target['paths'] is None or event['paths'] is None:
+		target['paths'] = None
+	else:
+		target['paths'].update(event['paths'])
+	target['index'] = target['index'] or event['index']
+	target['head'] = target['head'] or event['head']
+	return target
+
+class _Inotify:
+	"""基于 ctypes 的最小 inotify 封装"""
+
+	def __init__(self):
+		libc_name = ctypes.util.find_library("c") or "libc.so.6"
+		self.libc = ctypes.CDLL(libc_name, use_errno=True)
+		self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+		if self.fd < 0:
+			raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+
+	def add_watch(self, path, mask):
+		wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+		if wd < 0:
+			error = ctypes.get_errno()
+			raise OSError(error, os.strerror(error), path)
+		return wd
+
+	def read_events(self):
+		"""读取所有就绪的事件，返回 (wd, mask, name) 列表"""
+		events = []
+		while True:
+			try:
+				data = os.read(self.fd, 64 * 1024)
+			except BlockingIOError:
+				break
+			if not data:
+				break
+			offset = 0
+			while offset + EVENT_HEADER.size <= len(data):
+				wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+				offset += EVENT_HEADER.size
+				name = data[offset:offset + length].rstrip(b"\0")
+				offset += length
+				events.append((wd, mask, os.fsdecode(name)))
+		return events
+
+	def close(self):
+		os.close(self.fd)
+
+class RepositoryWatcher:
+	"""监视工作区、索引和 HEAD 的变化，在去抖窗口后合并回调
+
+	Linux 上使用 inotify 为工作区中每个未被忽略的目录添加监视；
+	inotify 不可用或监视数量超过系统限制时，回退为定期调用 poll_check 轮询。
+	回调在后台线程中执行，参数为 new_event() 格式的事件。
+	"""
+
+	def __init__(self, repo_path, git_dir, callback, ignore_filter=None, poll_check=None,
+			debounce=0.3, max_delay=2.0, poll_interval=3.0):
+		self.repo_path = os.path.abspath(repo_path)
+		self.git_dir = os.path.abspath(git_dir)
+		# 链接工作区（git worktree）的分支引用和 packed-refs 在共享 Git 目录中
+		self.common_dir = find_common_dir(self.git_dir)
+		self.callback = callback
+		# 接收相对目录列表，返回其中被 .gitignore 忽略的目录集合
+		self.ignore_filter = ignore_filter
+		# 轮询模式下判断是否有变化的回调
+		self.poll_check = poll_check
+		self.debounce = debounce
+		self.max_delay = max_delay
+		self.poll_interval = poll_interval
+
+		self.inotify = None
+		self.watches = {}
+		self.thread = None
+		self.stop_event = threading.Event()
+		self.wake_read, self.wake_write = os.pipe()
+
+	@property
+	def mode(self):
+		return "inotify" if self.inotify else "polling"
+
+	def start(self):
+		"""启动监视线程"""
+		if sys.platform.startswith("linux"):
+			try:
+				self.inotify = _Inotify()
+				self._watch_git_dir()
+				self._watch_tree("")
+			except OSError as e:
+				logger.warning(f"无法使用 inotify 监视仓库，回退到轮询: {str(e)}")
+				self._close_inotify()
+
+		target = self._run_inotify if self.inotify else self._run_polling
+		self.thread = threading.Thread(target=target, daemon=True)
+		self.thread.start()
+		logger.info(f"开始监视仓库 ({self.mode}): {self.repo_path}")
+
+	def stop(self):
+		"""停止监视"""
+		self.stop_event.set()
+		try:
+			os.write(self.wake_write, b"x")
+		except OSError:
+			pass
+		if self.thread and self.thread is not threading.current_thread():
+			self.thread.join(timeout=2)
+		self._close_inotify()
+		for fd in (self.wake_read, self.wake_write):
+			try:
+				os.close(fd)
+			except OSError:
+				pass
+
+	def _close_inotify(self):
+		if self.inotify:
+			self.inotify.close()
+			self.inotify = None
+		self.watches = {}
+
+	def _watch_git_dir(self):
+		"""监视 Git 目录本身（索引、HEAD）、共享 Git 目录（packed-refs）以及所有引用目录"""
+		self.watches[self.inotify.add_watch(self.git_dir, GIT_DIR_MASK)] = (".git", "")
+		if self.common_dir != self.git_dir:
+			self.watches[self.inotify.add_watch(self.common_dir, GIT_DIR_MASK)] = (".git-common", "")
+		for root, dirs, _ in os.walk(os.path.join(self.common_dir, "refs")):
+			self._add_ref_dir(root)
+
+	def _filter_ignored(self, directories):
+		"""去掉被 .gitignore 忽略的目录"""
+		if not self.ignore_filter or not directories:
+			return directories
+		try:
+			ignored = self.ignore_filter(directories)
+		except Exception as e:
+			logger.warning(f"检查忽略目录失败: {str(e)}")
+			return directories
+		return [d for d in directories if d not in ignored]
+
+	def _watch_tree(self, relative_root):
+		"""为目录及其所有未被忽略的子目录添加监视
+
+		逐层遍历目录，每一层只调用一次忽略检查，被忽略的目录不会被继续遍历。
+		"""
+		level = [relative_root]
+		if relative_root:
+			level = self._filter_ignored(level)
+
+		while level:
+			children = []
+			for directory in level:
+				full_path = os.path.join(self.repo_path, directory)
+				try:
+					wd = self.inotify.add_watch(full_path, WORKTREE_MASK)
+				except OSError as e:
+					if e.errno == errno.ENOSPC:
+						raise OSError(e.errno, "inotify 监视数量超过系统限制 (fs.inotify.max_user_watches)")
+					# 目录可能在遍历期间被删除
+					continue
+				self.watches[wd] = ("", directory)
+
+				try:
+					with os.scandir(full_path) as it:
+						for entry in it:
+							if entry.name != ".git" and entry.is_dir(follow_symlinks=False):
+								children.append(f"{directory}/{entry.name}" if directory else entry.name)
+				except OSError:
+					continue
+			level = self._filter_ignored(children)
+
+	def _translate(self, events):
+		"""将 inotify 事件转换为变化事件"""
+		event = new_event()
+		for wd, mask, name in events:
+			if mask & IN_Q_OVERFLOW:
+				# 事件队列溢出，无法确定具体路径
+				event['paths'] = None
+				continue
+			if mask & IN_IGNORED:
+				self.watches.pop(wd, None)
+				continue
+
+			area, directory = self.watches.get(wd, ("", None))
+			if directory is None:
+				continue
+
+			if area == ".git":
+				if name in GIT_INDEX_FILES:
+					event['index'] = True
+				elif name in GIT_HEAD_FILES:
+					event['head'] = True
+				continue
+			if area == ".git-common":
+				if name in GIT_COMMON_FILES:
+					event['head'] = True
+				continue
+			if area == "refs":
+				if not name.endswith(".lock"):
+					event['head'] = True
+					if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+						self._add_ref_dir(os.path.join(directory, name))
+				continue
+
+			path = f"{directory}/{name}" if directory and name else (name or directory)
+			if event['paths'] is not None and path:
+				event['paths'].add(path)
+
+			# 新建的子目录需要添加监视
+			if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+				try:
+					self._watch_tree(path)
+				except OSError as e:
+					logger.warning(f"无法监视新目录 {path}: {str(e)}")
+		return event
+
+	def _add_ref_dir(self, path):
+		"""监视引用目录，path 为绝对路径"""
+		try:
+			wd = self.inotify.add_watch(path, GIT_DIR_MASK)
+			self.watches[wd] = ("refs", path)
+		except OSError:
+			pass
+
+	def _emit(self, event):
+		if event['paths'] is not None and not event['paths'] and not event['index'] and not event['head']:
+			return
+		try:
+			self.callback(event)
+		except Exception as e:
+			logger.error(f"处理仓库变化事件失败: {str(e)}", exc_info=True)
+
+	def _run_inotify(self):
+		"""inotify 事件循环，在去抖窗口内合并事件"""
+		pending = None
+		first_time = last_time = 0
+		while not self.stop_event.is_set():
+			timeout = None
+			if pending is not None:
+				now = time.monotonic()
+				# 最后一次事件后静默 debounce 秒，或距第一次事件超过 max_delay 秒时触发
+				timeout = max(0, min(last_time + self.debounce, first_time + self.max_delay) - now)
+
+			try:
+				readable, _, _ = select.select([self.inotify.fd, self.wake_read], [], [], timeout)
+			except (OSError, ValueError):
+				break
+			if self.stop_event.is_set():
+				break
+
+			now = time.monotonic()
+			if self.inotify.fd in readable:
+				event = self._translate(self.inotify.read_events())
+				if pending is None:
+					pending = event
+					first_time = now
+				else:
+					merge_event(pending, event)
+				last_time = now
+
+			# 每次读取后也检查截止时间，持续不断的事件不能让 max_delay 失效
+			if pending is not None and now >= min(last_time + self.debounce, first_time + self.max_delay):
+				event, pending = pending, None
+				self._emit(event)
+
+	def _run_polling(self):
+		"""轮询模式，无法确定具体路径，有变化时请求完整刷新"""
+		while not self.stop_event.wait(self.poll_interval):
+			try:
+				changed = self.poll_check() if self.poll_check else False
+			except Exception as e:
+				logger.warning(f"轮询仓库变化失败: {str(e)}")
+				continue
+			if changed:
+				event = new_event()
+				event['paths'] = None
+				self._emit(event)
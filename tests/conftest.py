@@ -0,0 +1,35 @@
+import os
+import subprocess
+
+import pytest
+
+# 测试仓库使用固定的身份，不读取用户的全局配置
+GIT_TEST_ENV = {
+	"GIT_CONFIG_GLOBAL": os.devnull,
+	"GIT_CONFIG_NOSYSTEM": "1",
+	"GIT_AUTHOR_NAME": "test",
+	"GIT_AUTHOR_EMAIL": "test@example.com",
+	"GIT_COMMITTER_NAME": "test",
+	"GIT_COMMITTER_EMAIL": "test@example.com"
+}
+
+@pytest.fixture(autouse=True)
+def _git_env(monkeypatch):
+	for key, value in GIT_TEST_ENV.items():
+		monkeypatch.setenv(key, value)
+
+def git(cwd, *args):
+	"""在 cwd 中执行 Git 命令，返回标准输出文本"""
+	result = subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+	return result.stdout.decode('utf-8')
+
+@pytest.fixture
+def repo(tmp_path):
+	"""只有一个提交的仓库，返回工作区路径"""
+	path = tmp_path / "repo"
+	path.mkdir()
+	git(path, "init", "-q", "-b", "main")
+	(path / "a.txt").write_text("one\ntwo\n")
+	git(path, "add", "a.txt")
+	git(path, "commit", "-q", "-m", "initial")
+	return path
@@ -0,0 +1,41 @@
+import pytest
+
+from aicommit_git.repository import GitRepository
+from conftest import git
+
+@pytest.fixture
+def gitpython_repo(repo):
+	pytest.importorskip("git")
+	(repo / "a.txt").write_text("".join(f"{i}\n" for i in range(100000)))
+	git(repo, "commit", "-q", "-am", "numbers")
+	(repo / "a.txt").write_text("".join(f"{i}\n" for i in range(5, 100010)))
+	repository = GitRepository(str(repo), backend="gitpython")
+	assert repository.backend.name == "gitpython"
+	yield repository
+	repository.close()
+
+def test_gitpython_diff_output_is_streamed(gitpython_repo):
+	chunks = gitpython_repo.backend.iter_diff_output(["diff", "-U100000", "--", "a.txt"])
+	first = next(chunks)
+	assert first.startswith(b"diff --git a/a.txt b/a.txt")
+	# 输出按管道块产出，而不是一次返回完整差异
+	assert len(first) < 600000
+	chunks.close()
+
+	gitpython_repo.diff_max_lines = 10
+	assert gitpython_repo.get_diff("a.txt").endswith("[差异已截断: 超过 10 行]")
+
+def test_gitpython_diff_output_raises_on_error(gitpython_repo):
+	with pytest.raises(Exception, match="invalid option"):
+		list(gitpython_repo.backend.iter_diff_output(["diff", "--bogus"]))
+
+def test_gitpython_commands_are_recorded(gitpython_repo):
+	commands = gitpython_repo.metrics.commands
+	# 打开仓库时已经通过命令行执行过一次 status
+	before = commands["status"]['exit_codes'][0]
+	gitpython_repo.get_status()
+	list(gitpython_repo.backend.iter_diff_output(["diff", "--", "a.txt"]))
+	gitpython_repo.stage_files(["a.txt"])
+	assert commands["status"]['exit_codes'][0] == before + 1
+	assert commands["diff"]['bytes'].total > 0
+	assert commands["add"]['exit_codes'][0] == 1
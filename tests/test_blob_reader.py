@@ -0,0 +1,71 @@
+from aicommit_git.blob_reader import BlobReader
+from aicommit_git.metrics import CommandMetrics
+from aicommit_git.object_store import ObjectStore
+from aicommit_git.repository import GitRepository
+from conftest import git
+
+BIG = b"".join(b"line %d\n" % i for i in range(50000))
+
+def _commit_big(repo):
+	(repo / "big.txt").write_bytes(BIG)
+	git(repo, "add", "big.txt")
+	git(repo, "commit", "-q", "-m", "big")
+
+def test_blob_reader_read_head_keeps_protocol_in_sync(repo):
+	_commit_big(repo)
+	reader = BlobReader(str(repo))
+	try:
+		assert reader.read_path_head("HEAD", "big.txt", 100) == (BIG[:100], True)
+		# 丢弃的剩余内容不会混入下一次响应
+		assert reader.read_path("HEAD", "a.txt") == b"one\ntwo\n"
+		assert reader.read_path_head("HEAD", "a.txt", 100) == (b"one\ntwo\n", False)
+		assert reader.read_path_head("HEAD", "missing.txt", 100) is None
+	finally:
+		reader.close()
+
+def test_blob_reader_records_metrics(repo):
+	metrics = CommandMetrics()
+	reader = BlobReader(str(repo), metrics=metrics)
+	try:
+		reader.read_path("HEAD", "a.txt")
+		reader.read_path("HEAD", "missing.txt")
+	finally:
+		reader.close()
+	entry = metrics.commands["cat-file"]
+	assert entry['time_us'].count == 2
+	assert entry['bytes'].total == len(b"one\ntwo\n")
+	assert entry['exit_codes'] == {0: 1, 1: 1}
+
+def test_object_store_read_head_loose_and_packed(repo):
+	_commit_big(repo)
+	store = ObjectStore(str(repo / ".git"))
+	try:
+		assert store.read_path_head("HEAD", "big.txt", 100) == (BIG[:100], True)
+		assert store.read_path_head(":0", "big.txt", len(BIG)) == (BIG, False)
+	finally:
+		store.close()
+
+	# 修改后打包，新版本以增量对象保存
+	(repo / "big.txt").write_bytes(BIG + b"tail\n")
+	git(repo, "commit", "-q", "-am", "tail")
+	git(repo, "gc", "-q")
+	store = ObjectStore(str(repo / ".git"))
+	try:
+		assert store.read_path_head("HEAD", "big.txt", 100) == (BIG[:100], True)
+		parent = git(repo, "rev-parse", "HEAD~1").strip()
+		assert store.read_path_head(parent, "big.txt", len(BIG) + 1) == (BIG, False)
+		assert store.read_path_head("HEAD", "a.txt", 100) == (b"one\ntwo\n", False)
+	finally:
+		store.close()
+
+def test_get_diff_caps_deleted_file(repo):
+	_commit_big(repo)
+	(repo / "big.txt").unlink()
+	repository = GitRepository(str(repo))
+	try:
+		repository.diff_max_bytes = 1000
+		text = repository.get_diff("big.txt")
+	finally:
+		repository.close()
+	assert text.startswith("Deleted file: big.txt\n\n-line 0\n")
+	assert text.endswith("[差异已截断: 超过 1000 字节]")
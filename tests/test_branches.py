@@ -0,0 +1,38 @@
+from aicommit_git.branches import BranchIndex, short_ref_name
+from aicommit_git.runner import GitCommandRunner
+from conftest import git
+
+def test_short_ref_name():
+	assert short_ref_name("refs/heads/feature/x") == "feature/x"
+	assert short_ref_name("refs/remotes/origin/main") == "origin/main"
+	assert short_ref_name("HEAD") == "HEAD"
+
+def test_branch_index(repo, tmp_path):
+	remote = tmp_path / "remote.git"
+	git(tmp_path, "clone", "-q", "--bare", str(repo), str(remote))
+	git(repo, "remote", "add", "origin", str(remote))
+	git(repo, "fetch", "-q", "origin")
+	git(repo, "branch", "-u", "origin/main")
+	(repo / "a.txt").write_text("changed\n")
+	git(repo, "commit", "-q", "-am", "local")
+	git(repo, "branch", "topic")
+
+	index = BranchIndex(GitCommandRunner(str(repo)), str(repo / ".git"))
+	assert index.current_branch() == "main"
+	assert [e['name'] for e in index.get_branches()] == ["main", "topic"]
+	names = [e['name'] for e in index.get_branches(remote=True)]
+	# 本地分支在前，符号引用 origin/HEAD 不列出
+	assert names[:2] == ["main", "topic"]
+	assert "origin/main" in names and "origin/HEAD" not in names
+	assert index.find("main")['upstream'] == "origin/main"
+	assert index.ahead_behind("main") == (1, 0)
+	assert index.ahead_behind("topic") is None
+	assert [e['name'] for e in index.search("TOP")] == ["topic"]
+
+	# 引用未变化时不重新加载
+	version = index.version
+	assert not index.refresh()
+	git(repo, "checkout", "-q", "-b", "feature")
+	assert index.refresh()
+	assert index.version == version + 1
+	assert index.current_branch() == "feature"
@@ -0,0 +1,60 @@
+from aicommit_git.classify import FileClassifier, LARGE_FILE_SIZE
+from aicommit_git.runner import GitCommandRunner
+from aicommit_git.index_reader import GitIndex
+from conftest import git
+
+def _classifier(repo, attribute_files=None):
+	return FileClassifier(GitCommandRunner(str(repo)), str(repo), str(repo / ".git"), attribute_files)
+
+def test_classify(repo):
+	(repo / "data.bin").write_bytes(b"\0\1\2")
+	(repo / "gen.js").write_text("a\n")
+	(repo / ".gitattributes").write_text("gen.js linguist-generated\n*.dat -diff\n")
+	(repo / "x.dat").write_text("text\n")
+	git(repo, "add", ".")
+	git(repo, "commit", "-q", "-m", "files")
+	head = git(repo, "rev-parse", "HEAD").strip()
+
+	(repo / "a.txt").write_text("one\nthree\nfour\n")
+	(repo / "data.bin").write_bytes(b"\0\1\2\3")
+	(repo / "x.dat").write_text("changed\n")
+	(repo / "new.bin").write_bytes(b"abc\0def")
+	(repo / "big.txt").write_bytes(b"x" * (LARGE_FILE_SIZE + 1))
+
+	paths = ["a.txt", "data.bin", "gen.js", "x.dat", "new.bin", "big.txt"]
+	info = _classifier(repo).classify(paths, untracked=["new.bin", "big.txt"], head_oid=head)
+	assert not info["a.txt"]['binary']
+	assert (info["a.txt"]['added'], info["a.txt"]['deleted']) == (2, 1)
+	assert info["data.bin"]['binary']
+	assert info["gen.js"]['generated']
+	assert info["x.dat"]['binary'] and not info["x.dat"]['diff']
+	# 未跟踪文件按文件头判断
+	assert info["new.bin"]['binary']
+	assert not info["big.txt"]['binary'] and info["big.txt"]['large']
+
+def test_classify_cache_follows_file_and_attribute_changes(repo):
+	classifier = _classifier(repo)
+	head = git(repo, "rev-parse", "HEAD").strip()
+	(repo / "a.txt").write_text("one\n")
+	assert not classifier.classify(["a.txt"], head_oid=head)["a.txt"]['binary']
+	assert "a.txt" in classifier.cache
+
+	(repo / ".gitattributes").write_text("a.txt binary\n")
+	assert classifier.classify(["a.txt"], head_oid=head)["a.txt"]['binary']
+
+def test_classify_cache_follows_nested_attribute_files(repo):
+	(repo / "sub").mkdir()
+	(repo / "sub" / ".gitattributes").write_text("# 暂无规则\n")
+	(repo / "sub" / "b.txt").write_text("b\n")
+	git(repo, "add", "sub")
+	git(repo, "commit", "-q", "-m", "sub")
+	head = git(repo, "rev-parse", "HEAD").strip()
+	index_files = lambda: GitIndex.read(str(repo / ".git" / "index")).attribute_files()
+	classifier = _classifier(repo, index_files)
+	(repo / "sub" / "b.txt").write_text("changed\n")
+	assert not classifier.classify(["sub/b.txt"], head_oid=head)["sub/b.txt"]['binary']
+
+	signature = classifier.attribute_signature()
+	(repo / "sub" / ".gitattributes").write_text("b.txt binary\n")
+	assert classifier.attribute_signature() != signature
+	assert classifier.classify(["sub/b.txt"], head_oid=head)["sub/b.txt"]['binary']
@@ -0,0 +1,78 @@
+import os
+
+from aicommit_git.command_cache import CommandCache, classify_command, split_subcommand
+
+def test_classify_command():
+	assert split_subcommand(["-c", "core.quotepath=off", "rev-parse", "HEAD"]) == ("rev-parse", ["HEAD"])
+	assert classify_command(["rev-parse", "HEAD"]) == 'cacheable'
+	assert classify_command(["diff", "--cached"]) == 'cacheable'
+	assert classify_command(["diff", "HEAD~1", "HEAD"]) == 'cacheable'
+	assert classify_command(["diff"]) == 'read'
+	assert classify_command(["ls-files", "--others"]) == 'read'
+	assert classify_command(["cat-file", "--batch"]) == 'read'
+	assert classify_command(["branch", "--list"]) == 'cacheable'
+	assert classify_command(["branch", "new"]) == 'mutating'
+	assert classify_command(["config", "--get", "user.name"]) == 'read'
+	assert classify_command(["commit", "-m", "x"]) == 'mutating'
+
+def _make_git_dir(tmp_path):
+	git_dir = tmp_path / ".git"
+	(git_dir / "refs" / "heads").mkdir(parents=True)
+	(git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+	(git_dir / "index").write_bytes(b"index")
+	return git_dir
+
+def _bump(path, text):
+	"""改写文件并推后修改时间，保证签名变化"""
+	path.write_text(text)
+	st = os.stat(path)
+	os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+class Counter:
+	def __init__(self):
+		self.calls = 0
+
+	def __call__(self):
+		self.calls += 1
+		return b"output %d" % self.calls
+
+def test_cache_hits_until_repository_changes(tmp_path):
+	git_dir = _make_git_dir(tmp_path)
+	cache = CommandCache(str(git_dir), work_tree=str(tmp_path))
+	execute = Counter()
+	assert cache.run('bytes', ["rev-parse", "HEAD"], execute) == b"output 1"
+	assert cache.run('bytes', ["rev-parse", "HEAD"], execute) == b"output 1"
+	# 不可缓存的命令每次都执行
+	cache.run('bytes', ["status"], execute)
+	assert execute.calls == 2
+
+	_bump(git_dir / "index", "changed")
+	assert cache.run('bytes', ["rev-parse", "HEAD"], execute) == b"output 3"
+
+	(git_dir / "refs" / "heads" / "topic").write_text("x\n")
+	_bump(git_dir / "refs" / "heads" / "topic", "y\n")
+	os.utime(git_dir / "refs" / "heads", ns=(0, os.stat(git_dir / "refs" / "heads").st_mtime_ns + 10 ** 9))
+	assert cache.run('bytes', ["rev-parse", "HEAD"], execute) == b"output 4"
+
+	stats = cache.stats()
+	assert stats['hits'] == 1 and stats['misses'] == 3
+
+def test_mutating_command_invalidates(tmp_path):
+	cache = CommandCache(str(_make_git_dir(tmp_path)))
+	execute = Counter()
+	cache.run('bytes', ["rev-parse", "HEAD"], execute)
+	cache.run('bytes', ["commit", "-m", "x"], execute)
+	assert cache.run('bytes', ["rev-parse", "HEAD"], execute) == b"output 3"
+
+def test_nested_attribute_files_are_part_of_the_signature(tmp_path):
+	git_dir = _make_git_dir(tmp_path)
+	(tmp_path / "sub").mkdir()
+	_bump(tmp_path / "sub" / ".gitattributes", "*.bin binary\n")
+	cache = CommandCache(str(git_dir), work_tree=str(tmp_path), attribute_files=lambda: ["sub/.gitattributes"])
+	execute = Counter()
+	cache.run('bytes', ["diff", "--cached"], execute)
+	cache.run('bytes', ["diff", "--cached"], execute)
+	assert execute.calls == 1
+	_bump(tmp_path / "sub" / ".gitattributes", "*.bin -diff\n")
+	cache.run('bytes', ["diff", "--cached"], execute)
+	assert execute.calls == 2
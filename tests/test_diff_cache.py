@@ -0,0 +1,50 @@
+import os
+
+from aicommit_git.diff_cache import DiffCache, diff_cache_key
+
+def test_diff_cache_key():
+	assert diff_cache_key("a", 1, None) == diff_cache_key("a", 1, None)
+	assert diff_cache_key("a", 1) != diff_cache_key("a1")
+	assert len(diff_cache_key("x")) == 40
+
+def test_persists_across_instances(tmp_path):
+	cache = DiffCache(str(tmp_path))
+	key = diff_cache_key("f.txt", "oid")
+	cache.put(key, "diff --git a/f.txt b/f.txt\n+中文\n")
+	cache.save()
+	assert DiffCache(str(tmp_path)).get(key) == "diff --git a/f.txt b/f.txt\n+中文\n"
+	assert DiffCache(str(tmp_path)).get(diff_cache_key("other")) is None
+
+def test_memory_tier(tmp_path):
+	cache = DiffCache(str(tmp_path), memory_bytes=4096)
+	cache.put(diff_cache_key("k1"), "a" * 100)
+	assert cache.get(diff_cache_key("k1")) == "a" * 100
+	assert cache.stats()['memory_hits'] == 1
+	# 只保存在内存中的条目在 release 后丢弃
+	cache.put(diff_cache_key("k2"), "b" * 100, persist=False)
+	assert diff_cache_key("k2") in cache
+	cache.release(diff_cache_key("k2"))
+	assert diff_cache_key("k2") not in cache
+	assert cache.get(diff_cache_key("k2")) is None
+	# 超出字节上限时淘汰最久未使用的条目，持久条目仍可从磁盘读取
+	for i in range(20):
+		cache.put(diff_cache_key("fill", i), "c" * 500)
+	stats = cache.stats()
+	assert stats['memory_bytes'] <= 4096 and stats['evictions'] > 0
+	assert cache.get(diff_cache_key("k1")) == "a" * 100
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+	cache = DiffCache(str(tmp_path), memory_bytes=0, max_bytes=64 * 1024)
+	# 随机内容几乎不可压缩，每个条目约 8 KiB
+	for i in range(20):
+		cache.put(diff_cache_key("k", i), os.urandom(4096).hex())
+	stats = cache.stats()
+	assert stats['bytes'] <= 64 * 1024
+	assert stats['disk_evictions'] > 0
+	assert cache.get(diff_cache_key("k", 19)) is not None
+	assert cache.get(diff_cache_key("k", 0)) is None
+
+def test_database_uses_incremental_vacuum(tmp_path):
+	cache = DiffCache(str(tmp_path))
+	assert cache._connection().execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+	assert cache._connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
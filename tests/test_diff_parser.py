@@ -0,0 +1,99 @@
+from aicommit_git.diff_parser import (iter_diff_events, iter_file_patches, iter_lines, parse_header_path,
+	unquote_c_path)
+
+# `git diff --patch` 的固定输出：两个 hunk 的修改、重命名、带引号的非 ASCII 路径
+PATCH = b"\n".join([
+	b"diff --git a/a.txt b/a.txt",
+	b"index 1111111..2222222 100644",
+	b"--- a/a.txt",
+	b"+++ b/a.txt",
+	b"@@ -1,2 +1,2 @@ def f",
+	b"-old",
+	b"+new",
+	b" ctx",
+	b"@@ -10 +10 @@",
+	b"-x",
+	b"+y",
+	b"diff --git a/old name.txt b/new name.txt",
+	b"similarity index 90%",
+	b"rename from old name.txt",
+	b"rename to new name.txt",
+	b'diff --git "a/\\346\\226\\207.txt" "b/\\346\\226\\207.txt"',
+	b"new file mode 100644",
+	b"--- /dev/null",
+	b'+++ "b/\\346\\226\\207.txt"',
+	b"@@ -0,0 +1 @@",
+	b"+\\t",
+]) + b"\n"
+
+def _split(data, size):
+	return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_iter_lines():
+	assert list(iter_lines([b"a\nb", b"", b"c\n", b"d"])) == [b"a", b"bc", b"d"]
+	assert list(iter_lines([b"abcdef\nxy", b"z\n", b"12345", b"6789\nq"], max_length=3)) == \
+		[b"abcd", b"xyz", b"1234", b"q"]
+
+def test_iter_lines_single_huge_line():
+	line = b"x" * (12 * 1024 * 1024)
+	chunks = _split(line + b"\nend\n", 64 * 1024)
+	assert list(iter_lines(chunks)) == [line, b"end"]
+	# 超过上限的部分不进入缓冲区
+	assert list(iter_lines(chunks, max_length=100)) == [line[:101], b"end"]
+
+def test_iter_diff_events_truncates_huge_line():
+	patch = PATCH.replace(b"+new", b"+" + b"n" * (8 * 1024 * 1024))
+	events = list(iter_diff_events(_split(patch, 64 * 1024), max_bytes=1000))
+	assert [(e['type'], e['path']) for e in events][:3] == [('file', "a.txt"), ('hunk', "a.txt"), ('truncated', "a.txt")]
+	assert events[1]['lines'] == [b"-old"]
+	assert ('hunk', "文.txt") in [(e['type'], e['path']) for e in events]
+
+def test_unquote_c_path():
+	assert unquote_c_path(b'"a\\tb\\"c\\\\d\\303\\251" rest') == (b'a\tb"c\\d\xc3\xa9', b" rest")
+	assert unquote_c_path(b"plain") == (b"plain", b"")
+
+def test_parse_header_path():
+	assert parse_header_path(b"diff --git a/x/y.txt b/x/y.txt") == "x/y.txt"
+	assert parse_header_path(b'diff --git "a/sp ace" "b/sp ace"') == "sp ace"
+	assert parse_header_path(b'diff --git "a/\\346\\226\\207" b/plain') == "plain"
+	assert parse_header_path(b"diff --cc conflict.txt") == "conflict.txt"
+
+def test_iter_diff_events():
+	events = list(iter_diff_events([PATCH]))
+	assert [(e['type'], e['path']) for e in events] == [
+		('file', "a.txt"), ('hunk', "a.txt"), ('hunk', "a.txt"),
+		('file', "new name.txt"),
+		('file', "文.txt"), ('hunk', "文.txt")
+	]
+	assert events[0]['lines'][1] == b"index 1111111..2222222 100644"
+	assert events[1]['header'] == b"@@ -1,2 +1,2 @@ def f"
+	assert events[1]['lines'] == [b"-old", b"+new", b" ctx"]
+	assert events[2]['lines'] == [b"-x", b"+y"]
+	assert events[3]['lines'][-1] == b"rename to new name.txt"
+	assert events[5]['lines'] == [b"+\\t"]
+
+def test_iter_diff_events_chunk_boundaries():
+	expected = list(iter_diff_events([PATCH]))
+	for size in range(1, 40):
+		assert list(iter_diff_events(_split(PATCH, size))) == expected
+
+def test_iter_diff_events_truncates_per_file():
+	events = list(iter_diff_events([PATCH], max_lines=6))
+	types = [(e['type'], e['path']) for e in events]
+	assert types[:3] == [('file', "a.txt"), ('hunk', "a.txt"), ('truncated', "a.txt")]
+	assert events[1]['lines'] == [b"-old"]
+	assert events[2]['reason'] == 'lines' and events[2]['limit'] == 6
+	# 下一个文件重新计数
+	assert ('file', "new name.txt") in types
+	assert ('hunk', "文.txt") in types
+
+	events = list(iter_diff_events([PATCH], max_bytes=40))
+	truncated = [e for e in events if e['type'] == 'truncated']
+	assert truncated[0]['path'] == "a.txt" and truncated[0]['reason'] == 'bytes'
+
+def test_iter_file_patches():
+	patches = list(iter_file_patches([PATCH]))
+	assert [path for path, _ in patches] == ["a.txt", "new name.txt", "文.txt"]
+	assert patches[0][1] == b"\n".join(PATCH.split(b"\n")[:11])
+	_, text = list(iter_file_patches([PATCH], max_lines=6))[0]
+	assert text.endswith("[差异已截断: 超过 6 行]".encode('utf-8'))
@@ -0,0 +1,74 @@
+from aicommit_git.diff_parser import iter_diff_events
+from aicommit_git.hunks import parse_hunk_header, collect_hunks, hunk_stats, build_patch, render_hunks
+
+HEADER = [b"diff --git a/f.txt b/f.txt", b"index 1111111..2222222 100644", b"--- a/f.txt", b"+++ b/f.txt"]
+
+def _patch(*hunks):
+	lines = list(HEADER)
+	for header, body in hunks:
+		lines.append(header)
+		lines.extend(body)
+	return b"\n".join(lines) + b"\n"
+
+FIRST = (b"@@ -2,2 +2,3 @@ def f", [b" a", b"+b", b" c"])
+SECOND = (b"@@ -20,3 +21,2 @@", [b" x", b"-y", b" z"])
+
+def _collect(data, staged=False, **limits):
+	return collect_hunks(iter_diff_events([data], **limits), staged=staged)
+
+def test_parse_hunk_header():
+	assert parse_hunk_header(b"@@ -1,2 +3,4 @@ ctx") == (1, 2, 3, 4, b" ctx")
+	assert parse_hunk_header(b"@@ -5 +6 @@") == (5, 1, 6, 1, b"")
+	assert parse_hunk_header(b"@@ -0,0 +1 @@") == (0, 0, 1, 1, b"")
+	assert parse_hunk_header(b"not a hunk") is None
+
+def test_collect_hunks():
+	model = _collect(_patch(FIRST, SECOND))
+	assert model['header'] == HEADER
+	assert model['staged'] is False
+	assert model['truncated'] is None
+	first, second = model['hunks']
+	assert (first['old_start'], first['old_count'], first['new_start'], first['new_count']) == (2, 2, 2, 3)
+	assert first['section'] == b" def f"
+	assert first['lines'] == FIRST[1]
+	assert hunk_stats(first) == (1, 0)
+	assert hunk_stats(second) == (0, 1)
+
+def test_hunk_ids_ignore_line_numbers():
+	moved = (b"@@ -40,3 +41,2 @@", SECOND[1])
+	before = _collect(_patch(FIRST, SECOND))['hunks']
+	after = _collect(_patch(moved))['hunks']
+	assert after[0]['id'] == before[1]['id']
+	# 暂存区一侧的同一内容使用不同的 ID
+	assert _collect(_patch(SECOND), staged=True)['hunks'][0]['id'] != before[1]['id']
+
+def test_duplicate_hunks_get_sequence_numbers():
+	again = (b"@@ -30,2 +31,3 @@ def f", FIRST[1])
+	first, second = _collect(_patch(FIRST, again))['hunks']
+	assert second['id'] == f"{first['id']}-2"
+
+def test_truncated_hunk_is_dropped():
+	model = _collect(_patch(FIRST, SECOND), max_lines=10)
+	assert [h['header'] for h in model['hunks']] == [FIRST[0]]
+	assert model['truncated']['reason'] == 'lines'
+
+def test_build_patch_recomputes_start_lines():
+	first, second = _collect(_patch(FIRST, SECOND))['hunks']
+	# 只选第二个 hunk 时，其新起始行不再包含第一个 hunk 增加的行
+	assert build_patch(HEADER, [second]) == _patch((b"@@ -20,3 +20,2 @@", SECOND[1]))
+	assert build_patch(HEADER, [first, second]) == _patch(FIRST, (b"@@ -20,3 +21,2 @@", SECOND[1]))
+	assert build_patch(HEADER, [second], reverse=True) == _patch((b"@@ -21,3 +21,2 @@", SECOND[1]))
+
+def test_render_hunks():
+	staged = _collect(_patch(FIRST), staged=True)
+	worktree = _collect(_patch(FIRST, SECOND))
+	text = render_hunks([staged, worktree], excluded={worktree['hunks'][0]['id']})
+	assert text.startswith("已暂存的更改:\n" + HEADER[0].decode())
+	assert text.count("+b") == 1
+	assert "-y" in text
+	# 全部 hunk 被排除的一侧不输出
+	assert render_hunks([staged], excluded={staged['hunks'][0]['id']}) == ""
+
+	truncated = _collect(_patch(FIRST, SECOND), max_lines=10)
+	text = render_hunks([truncated], excluded={truncated['hunks'][0]['id']})
+	assert text.endswith("[差异已截断: 超过 10 行]，之后的更改未显示但会一并提交")
@@ -0,0 +1,110 @@
+import struct
+
+from aicommit_git.index_reader import (GitIndex, ENTRY_STAT, FLAG_EXTENDED, FLAG_ASSUME_VALID,
+	EXT_FLAG_SKIP_WORKTREE, _read_varint)
+
+def _encode_varint(value):
+	"""与 Git 的 encode_varint 相同的偏移变长整数编码"""
+	data = [value & 0x7f]
+	value >>= 7
+	while value:
+		value -= 1
+		data.insert(0, 0x80 | (value & 0x7f))
+		value >>= 7
+	return bytes(data)
+
+def _entry_stat(number):
+	# ctime(s, ns), mtime(s, ns), dev, ino, mode, uid, gid, size
+	return ENTRY_STAT.pack(0, 0, 1000 + number, 500 + number, 0, 70 + number, 0o100644, 0, 0, 10 + number)
+
+def _build_index(version, entries, extensions=b""):
+	"""entries 为 (路径字节, 标志, 扩展标志) 列表，返回索引文件内容"""
+	data = bytearray(b"DIRC" + struct.pack(">LL", version, len(entries)))
+	previous = b""
+	for number, (path, flags, ext_flags) in enumerate(entries):
+		start = len(data)
+		data += _entry_stat(number) + bytes([number + 1]) * 20
+		if ext_flags:
+			flags |= FLAG_EXTENDED
+		data += struct.pack(">H", flags | min(len(path), 0xfff))
+		if ext_flags:
+			data += struct.pack(">H", ext_flags)
+		if version == 4:
+			common = 0
+			while common < min(len(path), len(previous)) and path[common] == previous[common]:
+				common += 1
+			data += _encode_varint(len(previous) - common) + path[common:] + b"\0"
+		else:
+			data += path
+			data += b"\0" * (8 - (len(data) - start) % 8)
+		previous = path
+	data += extensions
+	data += b"\0" * 20
+	return bytes(data)
+
+PATHS = [b"README.md", b"src/aicommit/main.py", b"src/aicommit/mainwindow.py", b"src/other.py"]
+
+def _read(tmp_path, data):
+	path = tmp_path / "index"
+	path.write_bytes(data)
+	return GitIndex.read(str(path))
+
+def _check_entries(index):
+	assert index.paths == [p.decode() for p in PATHS]
+	for number in range(len(PATHS)):
+		assert index.oids[number] == bytes([number + 1]) * 20
+		assert index.mtime_s[number] == 1000 + number
+		assert index.mtime_ns[number] == 500 + number
+		assert index.ino[number] == 70 + number
+		assert index.size[number] == 10 + number
+		assert index.stage(number) == 0
+	assert index.find_oid("src/other.py") == bytes([4]) * 20
+	assert index.find_oid("missing") is None
+
+def test_read_v2(tmp_path):
+	index = _read(tmp_path, _build_index(2, [(p, 0, 0) for p in PATHS]))
+	assert index.version == 2
+	_check_entries(index)
+	assert not index.unsupported
+
+def test_read_v3_extended_flags(tmp_path):
+	entries = [(p, 0, 0) for p in PATHS]
+	entries[1] = (PATHS[1], 0, EXT_FLAG_SKIP_WORKTREE)
+	entries[2] = (PATHS[2], FLAG_ASSUME_VALID, 0)
+	index = _read(tmp_path, _build_index(3, entries))
+	assert index.version == 3
+	_check_entries(index)
+	assert list(index.skip) == [0, 1, 1, 0]
+	assert index.is_trackable(0)
+	assert not index.is_trackable(1)
+
+def test_read_v4_prefix_compression(tmp_path):
+	index = _read(tmp_path, _build_index(4, [(p, 0, 0) for p in PATHS]))
+	assert index.version == 4
+	_check_entries(index)
+
+def test_merge_stages_and_attribute_files(tmp_path):
+	stage_two = 2 << 12
+	entries = [(b".gitattributes", 0, 0), (b"a.txt", stage_two, 0), (b"docs/.gitattributes", 0, 0)]
+	index = _read(tmp_path, _build_index(2, entries))
+	assert index.stage(1) == 2
+	assert not index.is_trackable(1)
+	# 未合并的条目不是阶段 0
+	assert index.find_oid("a.txt") is None
+	assert index.attribute_files() == [".gitattributes", "docs/.gitattributes"]
+
+def test_unsupported_extension(tmp_path):
+	tree = b"TREE" + struct.pack(">L", 3) + b"abc"
+	link = b"link" + struct.pack(">L", 20) + b"\0" * 20
+	assert not _read(tmp_path, _build_index(2, [(PATHS[0], 0, 0)], tree)).unsupported
+	assert _read(tmp_path, _build_index(2, [(PATHS[0], 0, 0)], tree + link)).unsupported
+
+def test_missing_and_empty_index(tmp_path):
+	assert len(GitIndex.read(str(tmp_path / "missing"))) == 0
+	assert len(_read(tmp_path, b"")) == 0
+
+def test_read_varint():
+	for value in (0, 1, 127, 128, 255, 16511, 16512, 1 << 20):
+		encoded = _encode_varint(value)
+		assert _read_varint(b"x" + encoded, 1) == (value, 1 + len(encoded))
+	assert _read_varint(bytes([0x80, 0x00]), 0) == (128, 2)
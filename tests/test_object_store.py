@@ -0,0 +1,131 @@
+import zlib
+import struct
+import hashlib
+
+import pytest
+
+from aicommit_git.object_store import (ObjectStore, apply_delta, IDX_MAGIC, OBJ_BLOB, OBJ_OFS_DELTA,
+	OBJ_REF_DELTA)
+
+BASE = b"hello world\n"
+# 复制 "hello "、插入 "there "、复制 "world\n"
+DELTA = bytes([12, 18, 0x90, 6]) + bytes([6]) + b"there " + bytes([0x91, 6, 6])
+TARGET = b"hello there world\n"
+
+def _size_varint(value):
+	"""增量数据头部的小端变长整数"""
+	data = bytearray()
+	while True:
+		byte = value & 0x7f
+		value >>= 7
+		if value:
+			data.append(byte | 0x80)
+		else:
+			data.append(byte)
+			return bytes(data)
+
+def _blob_sha(data):
+	return hashlib.sha1(b"blob %d\0" % len(data) + data).digest()
+
+def test_apply_delta_copy_and_insert():
+	assert apply_delta(BASE, DELTA) == TARGET
+
+def test_apply_delta_zero_size_copies_64k():
+	base = bytes(range(256)) * 256 + b"tail"
+	delta = _size_varint(len(base)) + _size_varint(0x10000) + bytes([0x80])
+	assert apply_delta(base, delta) == base[:0x10000]
+
+def test_apply_delta_large_offset():
+	base = b"a" * 0x20000 + b"marker"
+	delta = _size_varint(len(base)) + _size_varint(6) + bytes([0x94, 0x02, 6])
+	assert apply_delta(base, delta) == b"marker"
+
+def test_apply_delta_rejects_bad_input():
+	with pytest.raises(ValueError):
+		apply_delta(BASE + b"x", DELTA)
+	with pytest.raises(ValueError):
+		apply_delta(BASE, bytes([12, 18, 0]))
+	with pytest.raises(ValueError):
+		# 结果大小与头部不一致
+		apply_delta(BASE, bytes([12, 5, 0x90, 6]))
+
+def _object_header(obj_type, size):
+	data = bytearray()
+	byte = (obj_type << 4) | (size & 0x0f)
+	size >>= 4
+	while size:
+		data.append(byte | 0x80)
+		byte = size & 0x7f
+		size >>= 7
+	data.append(byte)
+	return bytes(data)
+
+def _ofs_distance(distance):
+	data = [distance & 0x7f]
+	distance >>= 7
+	while distance:
+		distance -= 1
+		data.insert(0, 0x80 | (distance & 0x7f))
+		distance >>= 7
+	return bytes(data)
+
+def _write_pack(git_dir, base_sha):
+	"""写入包含一个 blob、一个 OFS_DELTA 和一个 REF_DELTA 的 packfile 及 v2 idx"""
+	pack = bytearray(b"PACK" + struct.pack(">LL", 2, 3))
+	offsets = {}
+
+	offsets[base_sha] = len(pack)
+	pack += _object_header(OBJ_BLOB, len(BASE)) + zlib.compress(BASE)
+
+	ofs_sha = _blob_sha(TARGET)
+	offsets[ofs_sha] = len(pack)
+	pack += _object_header(OBJ_OFS_DELTA, len(DELTA)) + _ofs_distance(offsets[ofs_sha] - offsets[base_sha])
+	pack += zlib.compress(DELTA)
+
+	# REF_DELTA 以 OFS_DELTA 的结果为基础，构成两级增量链
+	ref_target = TARGET + b"!"
+	ref_delta = bytes([18, 19, 0x90, 18, 1]) + b"!"
+	ref_sha = _blob_sha(ref_target)
+	offsets[ref_sha] = len(pack)
+	pack += _object_header(OBJ_REF_DELTA, len(ref_delta)) + ofs_sha + zlib.compress(ref_delta)
+	pack += hashlib.sha1(pack).digest()
+
+	names = sorted(offsets)
+	fanout = [sum(1 for name in names if name[0] <= i) for i in range(256)]
+	idx = bytearray(IDX_MAGIC + struct.pack(">L", 2))
+	idx += struct.pack(">256L", *fanout)
+	idx += b"".join(names)
+	idx += b"\0\0\0\0" * len(names)
+	idx += b"".join(struct.pack(">L", offsets[name]) for name in names)
+	idx += pack[-20:]
+	idx += hashlib.sha1(idx).digest()
+
+	pack_dir = git_dir / "objects" / "pack"
+	pack_dir.mkdir(parents=True)
+	(pack_dir / "pack-test.pack").write_bytes(bytes(pack))
+	(pack_dir / "pack-test.idx").write_bytes(bytes(idx))
+	return ofs_sha, ref_sha, ref_target
+
+def test_read_packed_objects_and_delta_chain(tmp_path):
+	base_sha = _blob_sha(BASE)
+	ofs_sha, ref_sha, ref_target = _write_pack(tmp_path, base_sha)
+	store = ObjectStore(str(tmp_path))
+	try:
+		assert store.read_object(base_sha) == (OBJ_BLOB, BASE)
+		assert store.read_object(ofs_sha) == (OBJ_BLOB, TARGET)
+		assert store.read_object(ref_sha) == (OBJ_BLOB, ref_target)
+		assert store.read_object(b"\xff" * 20) is None
+	finally:
+		store.close()
+
+def test_read_loose_object(tmp_path):
+	data = b"loose content\n"
+	sha = _blob_sha(data)
+	directory = tmp_path / "objects" / sha.hex()[:2]
+	directory.mkdir(parents=True)
+	(directory / sha.hex()[2:]).write_bytes(zlib.compress(b"blob %d\0" % len(data) + data))
+	store = ObjectStore(str(tmp_path))
+	try:
+		assert store.read_object(sha) == (OBJ_BLOB, data)
+	finally:
+		store.close()
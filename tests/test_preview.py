@@ -0,0 +1,70 @@
+import codecs
+
+from aicommit_git.preview import detect_encoding, PreviewReader
+from aicommit_git.repository import GitRepository
+
+def test_detect_encoding():
+	assert detect_encoding(codecs.BOM_UTF8 + b"abc") == 'utf-8-sig'
+	assert detect_encoding("中文".encode('utf-8')) == 'utf-8'
+	assert detect_encoding("中文".encode('gbk')) == 'latin-1'
+	# 样本末尾被截断的多字节字符不影响判断
+	assert detect_encoding("中文".encode('utf-8')[:-1], complete=False) == 'utf-8'
+	assert detect_encoding("中文".encode('utf-8')[:-1]) == 'latin-1'
+
+def _lines(path, **options):
+	with PreviewReader().open(str(path)) as preview:
+		return list(preview.iter_lines(**options))
+
+def test_preview_lines_and_truncation(tmp_path):
+	path = tmp_path / "f.txt"
+	path.write_bytes(codecs.BOM_UTF8 + "第一行\r\n二\n三\n四\n".encode('utf-8'))
+	assert _lines(path, prefix="+") == ["+第一行", "+二", "+三", "+四"]
+	assert _lines(path, max_lines=2) == ["第一行", "二", "[差异已截断: 超过 2 行]"]
+
+	path.write_bytes(b"".join(b"line %d\n" % i for i in range(1000)))
+	lines = _lines(path, max_bytes=20, tail_bytes=16)
+	assert lines[:2] == ["line 0", "line 1"]
+	assert lines[3] == "[差异已截断: 超过 20 字节]"
+	assert lines[-1] == "line 999"
+	assert len(lines) < 10
+
+def test_empty_file(tmp_path):
+	path = tmp_path / "empty"
+	path.write_bytes(b"")
+	assert _lines(path) == []
+
+def test_encoding_cache(tmp_path):
+	path = tmp_path / "f.txt"
+	path.write_bytes("中文\n".encode('gbk'))
+	reader = PreviewReader()
+	with reader.open(str(path)) as preview:
+		assert preview.encoding == 'latin-1'
+	assert str(path) in reader.encodings
+	reader.invalidate([str(path)])
+	assert str(path) not in reader.encodings
+
+def test_untracked_previews_agree(repo):
+	(repo / "gbk.txt").write_bytes("中文\n".encode('gbk'))
+	(repo / "data.bin").write_bytes(b"abc\0def\n")
+	repository = GitRepository(str(repo))
+	try:
+		# 非 UTF-8 文本在两条路径中都按文本显示并附注编码
+		diff = repository.get_diff("gbk.txt")
+		assert diff.startswith("New file (非UTF-8编码): gbk.txt\n\n+")
+		assert repository.get_file_diff("gbk.txt").startswith("新文件 (非UTF-8编码): gbk.txt\n\n")
+		# 含 NUL 的文件由分类器判定为二进制，即使它能按 UTF-8 解码
+		assert repository.get_diff("data.bin") == "New file: data.bin\n\n[Binary file, content cannot be displayed]"
+		assert repository.get_file_diff("data.bin") == "[Binary file data.bin not shown]"
+	finally:
+		repository.close()
+
+def test_get_file_diff_queries_only_the_path(repo):
+	(repo / "new file.txt").write_text("hello\n")
+	(repo / "other.txt").write_text("x\n")
+	repository = GitRepository(str(repo))
+	try:
+		assert repository.get_file_diff("new file.txt") == "新文件: new file.txt\n\nhello"
+		# 已跟踪且没有变化的文件显示为文件内容
+		assert repository.get_file_diff("a.txt") == "文件内容: a.txt\n\none\ntwo"
+	finally:
+		repository.close()
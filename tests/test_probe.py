@@ -0,0 +1,52 @@
+import os
+
+from aicommit_git import index_reader
+from aicommit_git.index_reader import WorktreeProbe
+from aicommit_git.status import StatusSnapshot
+from conftest import git
+
+def _clean_status():
+	return StatusSnapshot.from_dict({
+		'branch': "main", 'modified': [], 'untracked': [], 'staged': [],
+		'deleted': [], 'renamed': {}, 'unmerged': []
+	})
+
+def _probe(repo, **callbacks):
+	probe = WorktreeProbe(str(repo), str(repo / ".git"), **callbacks)
+	probe.capture(_clean_status())
+	return probe
+
+def _make_racy(repo, names):
+	for name in names:
+		(repo / name).write_text(name)
+	git(repo, "add", *names)
+	git(repo, "commit", "-q", "-m", "racy")
+	# 索引文件的修改时间不晚于条目时，这些条目都是竞态干净的
+	mtime = os.stat(repo / names[0]).st_mtime_ns
+	os.utime(repo / ".git" / "index", ns=(mtime, mtime))
+
+def test_racy_paths_are_checked_in_batches(repo, monkeypatch):
+	monkeypatch.setattr(index_reader, "PATHSPEC_ARG_LIMIT", 2)
+	names = [f"f{i}.txt" for i in range(5)]
+	_make_racy(repo, names)
+	batches = []
+	probe = _probe(repo, run_git=lambda paths: batches.append(list(paths)) or [])
+	assert not probe.has_changes()
+	assert probe.last_check == 'stat'
+	assert [len(batch) for batch in batches] == [2, 2, 1]
+	assert sorted(sum(batches, [])) == names
+
+	# 第一批就有变化时不再检查后面的路径
+	batches.clear()
+	probe.run_git = lambda paths: batches.append(list(paths)) or list(paths)
+	assert probe.has_changes()
+	assert len(batches) == 1
+
+def test_falls_back_to_status_when_scan_is_slower(repo):
+	calls = []
+	probe = _probe(repo, read_status=lambda: calls.append(1) or _clean_status())
+	probe.status_seconds = 0.0
+	probe.scan_seconds = 1.0
+	assert not probe.has_changes()
+	assert probe.last_check == 'status'
+	assert calls == [1]
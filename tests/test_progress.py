@@ -0,0 +1,48 @@
+from aicommit_git.progress import split_progress_lines, parse_progress_line, format_progress
+
+def test_split_progress_lines():
+	lines, pending = split_progress_lines(b"", b"Receiving objects:  10% (1/10)\rReceiving objects:  20% (2/10)\r")
+	assert lines == [b"Receiving objects:  10% (1/10)", b"Receiving objects:  20% (2/10)"]
+	assert pending == b""
+
+	lines, pending = split_progress_lines(b"", b"remote: Counting objects: 5\r\nResolv")
+	assert lines == [b"remote: Counting objects: 5"]
+	lines, pending = split_progress_lines(pending, b"ing deltas: 100% (3/3), done.\n")
+	assert lines == [b"Resolving deltas: 100% (3/3), done."]
+	assert pending == b""
+
+def test_parse_percent_line():
+	info = parse_progress_line("Receiving objects:  45% (450/1000), 1.20 MiB | 500.00 KiB/s")
+	assert info == {
+		'phase': "Receiving objects",
+		'percent': 45,
+		'current': 450,
+		'total': 1000,
+		'detail': "1.20 MiB | 500.00 KiB/s",
+		'done': False,
+		'remote': False
+	}
+
+	info = parse_progress_line("remote: Compressing objects: 100% (7/7), done.")
+	assert info['remote'] and info['done']
+	assert (info['percent'], info['current'], info['total'], info['detail']) == (100, 7, 7, "")
+
+def test_parse_count_line():
+	info = parse_progress_line("remote: Enumerating objects: 1234, done.")
+	assert info['phase'] == "Enumerating objects"
+	assert info['percent'] is None and info['total'] is None
+	assert info['current'] == 1234
+	assert info['remote'] and info['done']
+
+def test_parse_non_progress_lines():
+	assert parse_progress_line("Cloning into 'repo'...") is None
+	assert parse_progress_line("warning: redirecting to https://example.com/") is None
+	# 只有计数的行必须是已知的阶段
+	assert parse_progress_line("Something else: 12") is None
+	assert parse_progress_line("") is None
+
+def test_format_progress():
+	assert format_progress(parse_progress_line("Receiving objects:  45% (450/1000), 1.20 MiB | 500.00 KiB/s")) == \
+		"接收对象: 45% (450/1000), 1.20 MiB | 500.00 KiB/s"
+	assert format_progress(parse_progress_line("remote: Counting objects: 12")) == "远端: 计数对象: 12"
+	assert format_progress(parse_progress_line("Unknown phase:  50% (1/2)")) == "Unknown phase: 50% (1/2)"
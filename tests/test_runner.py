@@ -0,0 +1,71 @@
+import time
+import asyncio
+import threading
+
+from aicommit_git.runner import ProcessLimiter, GitCommandRunner
+
+def test_runner_runs_git(repo):
+	runner = GitCommandRunner(str(repo))
+	assert runner.run_text(["ls-files"]).splitlines() == ["a.txt"]
+	assert b"".join(runner.iter_chunks(["cat-file", "blob", "HEAD:a.txt"])) == b"one\ntwo\n"
+
+def test_limiter_bounds_concurrency():
+	limiter = ProcessLimiter(2)
+	lock = threading.Lock()
+	running = []
+	peak = [0]
+
+	def work():
+		with limiter.slot():
+			with lock:
+				running.append(1)
+				peak[0] = max(peak[0], len(running))
+			time.sleep(0.02)
+			with lock:
+				running.pop()
+
+	threads = [threading.Thread(target=work) for _ in range(8)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert peak[0] == 2
+	assert limiter._running == 0 and not limiter._waiters
+
+def test_limiter_is_reentrant_per_thread():
+	limiter = ProcessLimiter(1)
+	with limiter.slot():
+		assert limiter.held()
+		# 同一线程再次申请不等待
+		with limiter.slot():
+			assert limiter._running == 1
+		assert limiter.held()
+	assert not limiter.held()
+	assert limiter._running == 0
+
+def test_limiter_shared_with_coroutines():
+	limiter = ProcessLimiter(1)
+	token = limiter.acquire()
+	order = []
+
+	async def waiter():
+		await limiter.acquire_async()
+		order.append("async")
+		limiter.release()
+
+	async def cancelled():
+		await limiter.acquire_async()
+
+	async def main():
+		task = asyncio.ensure_future(waiter())
+		other = asyncio.ensure_future(cancelled())
+		await asyncio.sleep(0.01)
+		other.cancel()
+		order.append("thread")
+		limiter.release(token)
+		await task
+		await asyncio.gather(other, return_exceptions=True)
+
+	asyncio.run(main())
+	assert order == ["thread", "async"]
+	assert limiter._running == 0 and not limiter._waiters
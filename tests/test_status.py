@@ -0,0 +1,75 @@
+import pytest
+
+from aicommit_git.status import iter_nul_records, parse_porcelain_v2, StatusSnapshot
+
+OID_A = b"a" * 40
+OID_B = b"b" * 40
+
+# `git status --porcelain=v2 -z --branch` 的固定输出
+PORCELAIN = b"".join([
+	b"# branch.oid " + OID_A + b"\0",
+	b"# branch.head main\0",
+	b"# branch.upstream origin/main\0",
+	b"# branch.ab +2 -3\0",
+	b"1 .M N... 100644 100644 100644 " + OID_A + b" " + OID_A + b" src/a b.txt\0",
+	b"1 M. N... 100644 100644 100644 " + OID_A + b" " + OID_B + b" staged.txt\0",
+	b"1 .D N... 100644 100644 000000 " + OID_A + b" " + OID_A + b" gone.txt\0",
+	b"2 R. N... 100644 100644 100644 " + OID_A + b" " + OID_A + b" R100 new.txt\0old.txt\0",
+	b"2 C. N... 100644 100644 100644 " + OID_A + b" " + OID_A + b" C75 copy.txt\0orig.txt\0",
+	b"u UU N... 100644 100644 100644 100644 " + OID_A + b" " + OID_B + b" " + OID_A + b" conflict.txt\0",
+	b"? dir/untracked file\0",
+	b"! ignored.txt\0",
+])
+
+def _split(data, size):
+	return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_iter_nul_records_across_chunk_boundaries():
+	data = b"one\0\0two\0three"
+	expected = [b"one", b"", b"two", b"three"]
+	for size in range(1, len(data) + 1):
+		assert list(iter_nul_records(_split(data, size))) == expected
+
+def test_iter_nul_records_long_record_and_empty_chunks():
+	record = b"x" * 100000
+	chunks = [b""] + _split(record, 7) + [b"\0", b"", b"tail\0"]
+	assert list(iter_nul_records(chunks)) == [record, b"tail"]
+	assert list(iter_nul_records([])) == []
+
+def test_parse_porcelain_v2():
+	status = parse_porcelain_v2([PORCELAIN])
+	assert status['head_oid'] == OID_A.decode()
+	assert status['branch'] == "main"
+	assert status['upstream'] == "origin/main"
+	assert (status['ahead'], status['behind']) == (2, 3)
+	assert status['modified'] == ["src/a b.txt", "gone.txt", "conflict.txt"]
+	assert status['deleted'] == ["gone.txt"]
+	assert status['staged'] == ["staged.txt", "new.txt", "copy.txt", "conflict.txt"]
+	# 复制不记为重命名
+	assert status['renamed'] == {"new.txt": "old.txt"}
+	assert status['unmerged'] == ["conflict.txt"]
+	assert status['untracked'] == ["dir/untracked file"]
+
+def test_parse_porcelain_v2_chunked_matches_whole():
+	expected = parse_porcelain_v2([PORCELAIN])
+	for size in (1, 2, 3, 7, 64):
+		assert parse_porcelain_v2(_split(PORCELAIN, size)) == expected
+
+def test_parse_porcelain_v2_initial_and_detached():
+	status = parse_porcelain_v2([b"# branch.oid (initial)\0# branch.head (detached)\0"])
+	assert status['head_oid'] is None
+	assert status['branch'] == "HEAD"
+	assert status['upstream'] is None
+
+def test_snapshot_mappings_are_read_only():
+	snapshot = StatusSnapshot.from_dict(parse_porcelain_v2([PORCELAIN]))
+	assert snapshot.renamed == {"new.txt": "old.txt"}
+	assert snapshot.entry("new.txt").orig_path == "old.txt"
+	with pytest.raises(TypeError):
+		snapshot.renamed["x"] = "y"
+	with pytest.raises(TypeError):
+		snapshot.entries["x"] = None
+	# 旧式字典访问返回可修改的副本
+	copy = snapshot['renamed']
+	copy["x"] = "y"
+	assert "x" not in snapshot.renamed
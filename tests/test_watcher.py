@@ -0,0 +1,69 @@
+import sys
+import queue
+
+import pytest
+
+from aicommit_git import watcher as watcher_module
+from aicommit_git.watcher import RepositoryWatcher, new_event, merge_event
+from conftest import git
+
+def _watch(repo, **options):
+	events = queue.Queue()
+	watcher = RepositoryWatcher(str(repo), str(repo / ".git"), events.put, debounce=0.05, max_delay=1.0, **options)
+	watcher.start()
+	return watcher, events
+
+def _collect(events, predicate, timeout=5):
+	"""合并收到的事件，直到满足 predicate 或超时"""
+	merged = new_event()
+	while not predicate(merged):
+		merge_event(merged, events.get(timeout=timeout))
+	return merged
+
+def test_merge_event():
+	target = new_event()
+	target['paths'].add("a")
+	event = new_event()
+	event['index'] = True
+	merge_event(target, event)
+	assert target == {'paths': {"a"}, 'index': True, 'head': False}
+	event = new_event()
+	event['paths'] = None
+	assert merge_event(target, event)['paths'] is None
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify 只在 Linux 上可用")
+def test_reports_worktree_index_and_head_changes(repo):
+	(repo / "sub").mkdir()
+	watcher, events = _watch(repo)
+	try:
+		assert watcher.mode == "inotify"
+		(repo / "sub" / "new.txt").write_text("x")
+		event = _collect(events, lambda e: e['paths'] is None or "sub/new.txt" in e['paths'])
+		assert event['paths'] is None or "sub/new.txt" in event['paths']
+
+		# 新建的目录也会被监视
+		(repo / "later").mkdir()
+		(repo / "later" / "f.txt").write_text("y")
+		_collect(events, lambda e: e['paths'] is None or "later/f.txt" in e['paths'])
+
+		git(repo, "add", "a.txt", "sub/new.txt")
+		_collect(events, lambda e: e['index'])
+
+		git(repo, "branch", "topic")
+		_collect(events, lambda e: e['head'])
+	finally:
+		watcher.stop()
+
+def _no_inotify():
+	raise OSError("inotify 不可用")
+
+def test_polling_fallback_requests_full_refresh(repo, monkeypatch):
+	monkeypatch.setattr(watcher_module, "_Inotify", _no_inotify)
+	checks = []
+	watcher, events = _watch(repo, poll_check=lambda: checks.append(1) or len(checks) == 2, poll_interval=0.02)
+	try:
+		assert watcher.mode == "polling"
+		event = events.get(timeout=5)
+		assert event['paths'] is None
+	finally:
+		watcher.stop()
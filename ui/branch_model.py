@@ -0,0 +1,80 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+# 分支列表每次向视图提供的行数，滚动到末尾时再取下一批
+BRANCH_FETCH_BATCH = 200
+
+class BranchListModel(QAbstractListModel):
+	"""按需加载的分支名列表模型
+
+	set_names 只保存名称，视图通过 canFetchMore/fetchMore 分批取得行，
+	数万个分支时打开下拉框也只需创建可见的一批条目。
+	set_filter 按不区分大小写的子串过滤，用作补全器的模型。
+	"""
+
+	def __init__(self, parent=None, batch_size=BRANCH_FETCH_BATCH):
+		super().__init__(parent)
+		self.batch_size = batch_size
+		self._all = []
+		self._filter = ""
+		self.names = []
+		self._rows = {}
+		self._loaded = 0
+
+	def set_names(self, names):
+		"""替换全部分支名"""
+		self.beginResetModel()
+		self._all = list(names)
+		self._apply_filter()
+		self.endResetModel()
+
+	def set_filter(self, text):
+		"""只保留包含 text 的分支名，text 为空时显示全部"""
+		text = text.lower()
+		if text == self._filter:
+			return
+		self.beginResetModel()
+		self._filter = text
+		self._apply_filter()
+		self.endResetModel()
+
+	def _apply_filter(self):
+		if self._filter:
+			self.names = [name for name in self._all if self._filter in name.lower()]
+		else:
+			self.names = self._all
+		self._rows = {name: row for row, name in enumerate(self.names)}
+		self._loaded = min(self.batch_size, len(self.names))
+
+	def row_of(self, name):
+		"""返回分支名所在行，必要时先加载到该行；不存在时返回 -1"""
+		row = self._rows.get(name)
+		if row is None:
+			return -1
+		if row >= self._loaded:
+			self.beginInsertRows(QModelIndex(), self._loaded, row)
+			self._loaded = row + 1
+			self.endInsertRows()
+		return row
+
+	def rowCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else self._loaded
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid() or index.row() >= self._loaded:
+			return None
+		if role in (Qt.DisplayRole, Qt.EditRole):
+			return self.names[index.row()]
+		return None
+
+	def canFetchMore(self, parent=QModelIndex()):
+		return not parent.isValid() and self._loaded < len(self.names)
+
+	def fetchMore(self, parent=QModelIndex()):
+		if parent.isValid():
+			return
+		count = min(self.batch_size, len(self.names) - self._loaded)
+		if count <= 0:
+			return
+		self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+		self._loaded += count
+		self.endInsertRows()
@@ -0,0 +1,158 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+							QPushButton, QMessageBox, QTableWidget, QTableWidgetItem,
+							QHeaderView)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+
+from aicommit_git.health import RepositoryDoctor, HEALTH_OPERATIONS
+
+# 各检查状态的显示文本
+STATE_LABELS = {
+	'ok': "已启用",
+	'missing': "未启用",
+	'not_needed': "不需要",
+	'unsupported': "不支持"
+}
+
+class HealthWorker(QThread):
+	"""在后台执行检查、测量和启用操作"""
+	finished = pyqtSignal(object)  # 成功完成信号，传递结果
+	error = pyqtSignal(str)  # 错误信号，传递错误信息
+
+	def __init__(self, doctor, keys=None):
+		super().__init__()
+		self.doctor = doctor
+		# None 表示只检查和测量
+		self.keys = keys
+
+	def run(self):
+		try:
+			if self.keys is None:
+				result = {'checks': self.doctor.check(), 'before': self.doctor.measure()}
+			else:
+				result = self.doctor.run(self.keys)
+				result['checks'] = self.doctor.check()
+			self.finished.emit(result)
+		except Exception as e:
+			self.error.emit(str(e))
+
+class HealthDialog(QDialog):
+	"""检查仓库的 Git 加速选项，启用勾选的项目并显示前后耗时"""
+
+	def __init__(self, parent=None, repo=None):
+		super().__init__(parent)
+		self.doctor = RepositoryDoctor(repo)
+		self.worker = None
+		self.before = {}
+
+		self.setWindowTitle("仓库健康检查")
+		self.setMinimumSize(700, 450)
+
+		self.setup_ui()
+		self.start_worker(None)
+
+	def setup_ui(self):
+		layout = QVBoxLayout(self)
+
+		self.message_label = QLabel()
+		layout.addWidget(self.message_label)
+
+		# 加速选项，未启用且可以启用的项目默认勾选
+		self.checks_table = QTableWidget(0, 3)
+		self.checks_table.setHorizontalHeaderLabels(["项目", "状态", "说明"])
+		self.checks_table.setEditTriggers(QTableWidget.NoEditTriggers)
+		self.checks_table.verticalHeader().setVisible(False)
+		self.checks_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+		self.checks_table.horizontalHeader().setStretchLastSection(True)
+		layout.addWidget(self.checks_table)
+
+		# 启用前后的耗时
+		layout.addWidget(QLabel("耗时 (ms):"))
+		self.timings_table = QTableWidget(len(HEALTH_OPERATIONS), 3)
+		self.timings_table.setHorizontalHeaderLabels(["启用前", "启用后", "变化"])
+		self.timings_table.setVerticalHeaderLabels(list(HEALTH_OPERATIONS))
+		self.timings_table.setEditTriggers(QTableWidget.NoEditTriggers)
+		self.timings_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+		layout.addWidget(self.timings_table)
+
+		# 按钮
+		button_layout = QHBoxLayout()
+
+		self.measure_button = QPushButton("重新检查")
+		self.measure_button.clicked.connect(lambda: self.start_worker(None))
+		button_layout.addWidget(self.measure_button)
+
+		button_layout.addStretch()
+
+		self.apply_button = QPushButton("启用勾选项并重新测量")
+		self.apply_button.clicked.connect(self.apply_checked)
+		button_layout.addWidget(self.apply_button)
+
+		self.close_button = QPushButton("关闭")
+		self.close_button.clicked.connect(self.accept)
+		button_layout.addWidget(self.close_button)
+
+		layout.addLayout(button_layout)
+
+	def start_worker(self, keys):
+		self.measure_button.setEnabled(False)
+		self.apply_button.setEnabled(False)
+		self.message_label.setText("正在检查和测量..." if keys is None else "正在启用并重新测量...")
+		self.worker = HealthWorker(self.doctor, keys)
+		self.worker.finished.connect(self.on_worker_finished)
+		self.worker.error.connect(self.on_worker_error)
+		self.worker.start()
+
+	def apply_checked(self):
+		keys = []
+		for row in range(self.checks_table.rowCount()):
+			item = self.checks_table.item(row, 0)
+			if item.flags() & Qt.ItemIsUserCheckable and item.checkState() == Qt.Checked:
+				keys.append(item.data(Qt.UserRole))
+		if not keys:
+			QMessageBox.information(self, "提示", "没有勾选需要启用的项目")
+			return
+		self.start_worker(keys)
+
+	def on_worker_finished(self, result):
+		self.measure_button.setEnabled(True)
+		self.apply_button.setEnabled(True)
+		self.show_checks(result['checks'])
+		self.before = result['before']
+		self.show_timings(result['before'], result.get('after'))
+		if 'applied' in result:
+			self.message_label.setText(f"已启用: {', '.join(result['applied']) or '无'}")
+		else:
+			missing = sum(1 for c in result['checks'] if c['fixable'])
+			self.message_label.setText(f"{missing} 个加速选项未启用" if missing else "所有加速选项均已启用")
+
+	def on_worker_error(self, error_message):
+		self.measure_button.setEnabled(True)
+		self.apply_button.setEnabled(True)
+		self.message_label.setText("操作失败")
+		QMessageBox.critical(self, "错误", f"仓库健康检查失败: {error_message}")
+
+	def show_checks(self, checks):
+		self.checks_table.setRowCount(len(checks))
+		for row, check in enumerate(checks):
+			name_item = QTableWidgetItem(check['name'])
+			name_item.setData(Qt.UserRole, check['key'])
+			if check['fixable']:
+				name_item.setFlags(name_item.flags() | Qt.ItemIsUserCheckable)
+				name_item.setCheckState(Qt.Checked)
+			self.checks_table.setItem(row, 0, name_item)
+			self.checks_table.setItem(row, 1, QTableWidgetItem(STATE_LABELS.get(check['state'], check['state'])))
+			self.checks_table.setItem(row, 2, QTableWidgetItem(check['detail']))
+
+	def show_timings(self, before, after=None):
+		for row, name in enumerate(HEALTH_OPERATIONS):
+			old = before.get(name)
+			new = after.get(name) if after else None
+			values = [
+				f"{old:.1f}" if old is not None else "-",
+				f"{new:.1f}" if new is not None else "-",
+				f"{(new - old) / old * 100:+.0f}%" if old and new is not None else ""
+			]
+			for column, value in enumerate(values):
+				item = QTableWidgetItem(value)
+				item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+				self.timings_table.setItem(row, column, item)
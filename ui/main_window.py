@@ -3,9 +3,9 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
 							QToolBar, QAction, QStatusBar, QFileDialog, QMessageBox,
 							QListWidgetItem, QFileSystemModel, QLabel, QLineEdit,
 							QPushButton, QGroupBox, QFormLayout, QTabWidget, QDialog,
-							QComboBox, QCheckBox, QMenu, QMenuBar, QApplication)
-from PyQt5.QtCore import Qt, QSize, QDir, QTimer, QPropertyAnimation, QEasingCurve, QRect, QThread, pyqtSignal, QEvent
-from PyQt5.QtGui import QIcon, QColor, QTextCharFormat, QBrush, QFont, QPainter, QPen
+							QComboBox, QCheckBox, QMenu, QMenuBar, QApplication, QCompleter)
+from PyQt5.QtCore import Qt, QSize, QPoint, QDir, QTimer, QPropertyAnimation, QEasingCurve, QRect, QThread, pyqtSignal, QEvent
+from PyQt5.QtGui import QIcon, QColor, QTextCharFormat, QBrush, QFont, QPainter, QPen, QTextCursor
 
 import os
 import logging
@@ -13,17 +13,32 @@ import time
 import sys
 import threading
 import tempfile
+import shutil
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from git.repository import GitRepository
+from aicommit_git.repository import GitRepository
+from aicommit_git.status import merge_status, path_in_specs
+from aicommit_git.hunks import hunk_stats, render_hunks
+from aicommit_git.diff_refresh import DiffRefresher, get_refresh_executor
+from aicommit_git.diff_cache import DiffCache, diff_cache_key, DIFF_MEMORY_CACHE_BYTES, DIFF_CACHE_MAX_BYTES
+from aicommit_git.watcher import RepositoryWatcher, merge_event
+from aicommit_git.progress import format_progress
+from aicommit_git.clone import CloneManager, DEFAULT_CLONE_WORKERS, repo_name_from_url
 from ui.commit_dialog import CommitDialog
+from ui.branch_model import BranchListModel
+from ui.repo_setup import CloneDialog
+from ui.performance_dialog import PerformanceDialog
+from ui.health_dialog import HealthDialog
 from utils.config import Config
 
 # 配置日志记录器
 logger = logging.getLogger("ui.main_window")
 
+# 暂存文件数量超过该值时显示进度
+STAGE_PROGRESS_THRESHOLD = 500
+
 class LoadingOverlay(QWidget):
 	"""加载遮罩，显示加载状态"""
 	def __init__(self, parent=None):
@@ -126,6 +141,11 @@ class LoadingOverlay(QWidget):
 		except Exception as e:
 			logger.error(f"显示加载遮罩失败: {str(e)}", exc_info=True)
 	
+	def set_message(self, message):
+		"""更新显示的消息"""
+		self.message = message
+		self.update()
+
 	def show_with_message(self, message="加载中..."):
 		try:
 			self.message = message
@@ -974,30 +994,35 @@ class FileItemWidget(QWidget):
 		self.checkbox.setChecked(True)  # 默认选中
 		self.checkbox.stateChanged.connect(self._on_state_changed)
 		
-		status_label = QLabel()
-		if status == "staged":
-			status_label.setText("已暂存")
-			status_label.setStyleSheet("color: green;")
-		elif status == "modified":
-			status_label.setText("已修改")
-			status_label.setStyleSheet("color: blue;")
-		elif status == "deleted":
-			status_label.setText("已删除")
-			status_label.setStyleSheet("color: red;")
-		elif status == "untracked":
-			status_label.setText("未跟踪")
-			status_label.setStyleSheet("color: gray;")
+		self.status_label = QLabel()
+		self.set_status(status)
 		
 		file_label = QLabel(file_path)
 		file_label.setStyleSheet("text-align: left;")
 		
 		layout.addWidget(self.checkbox)
-		layout.addWidget(status_label)
+		layout.addWidget(self.status_label)
 		layout.addWidget(file_label)
 		layout.addStretch()
 		
 		self.setLayout(layout)
 	
+	def set_status(self, status):
+		"""更新文件状态标签"""
+		self.status = status
+		if status == "staged":
+			self.status_label.setText("已暂存")
+			self.status_label.setStyleSheet("color: green;")
+		elif status == "modified":
+			self.status_label.setText("已修改")
+			self.status_label.setStyleSheet("color: blue;")
+		elif status == "deleted":
+			self.status_label.setText("已删除")
+			self.status_label.setStyleSheet("color: red;")
+		elif status == "untracked":
+			self.status_label.setText("未跟踪")
+			self.status_label.setStyleSheet("color: gray;")
+	
 	def _on_state_changed(self, state):
 		"""复选框状态改变时触发"""
 		# 防止重复触发
@@ -1008,6 +1033,15 @@ class FileItemWidget(QWidget):
 			self.on_checkbox_changed()
 
 class MainWindow(QMainWindow):
+	# 文件监视线程发现仓库变化时触发，传递变化事件
+	repository_changed = pyqtSignal(object)
+	# 增量更新计算完成时触发，传递更新结果
+	watch_update_ready = pyqtSignal(object)
+	# 后台 Git 任务完成时触发，传递 (future, 成功回调, 失败回调)
+	git_task_done = pyqtSignal(object, object, object)
+	# 网络操作进度更新时触发，传递状态栏文本
+	git_progress = pyqtSignal(str)
+
 	def __init__(self):
 		super().__init__()
 
@@ -1034,12 +1068,41 @@ class MainWindow(QMainWindow):
 		self.heartbeat_timer.start(100)  # 每100毫秒触发一次，提高频率
 
 		# 添加差异缓存相关属性
-		self.diff_cache_dir = os.path.join(tempfile.gettempdir(), "aicommit_diff_cache")
-		if not os.path.exists(self.diff_cache_dir):
-			os.makedirs(self.diff_cache_dir)
-		self.diff_cache = {}  # 文件路径 -> 缓存文件路径
+		# 按内容标识寻址的持久差异缓存，压缩后保存在所有仓库共用的数据库中，重启后仍可复用；
+		# 最近使用的差异保留在内存中
+		self.diff_store = DiffCache(
+			memory_bytes=config_manager.get("diff_memory_cache_bytes", DIFF_MEMORY_CACHE_BYTES),
+			max_bytes=config_manager.get("diff_cache_max_bytes", DIFF_CACHE_MAX_BYTES)
+		)
+		# 旧版本写在临时目录中的差异缓存无法复用，直接删除
+		shutil.rmtree(os.path.join(tempfile.gettempdir(), "aicommit_diff_cache"), ignore_errors=True)
+		self.diff_cache = {}  # 文件路径 -> 差异内容标识
 		self.diff_cache_timestamp = 0  # 上次缓存更新时间
 		self.diff_cache_lock = threading.Lock()  # 缓存锁，防止并发问题
+		self.diff_refresher = DiffRefresher()  # 在共用的有界线程池中分批刷新，新的刷新取消旧的
+		self._diff_refresh_scheduled = False  # 已提交但尚未开始的刷新，焦点事件频繁时不重复提交
+		self._diff_refresh_priority = []  # 刷新时优先获取的文件（选中和可见的文件）
+		
+		# 文件监视和增量更新相关属性
+		self.repo_watcher = None
+		self._file_states = {}  # 文件路径 -> 状态，与变更列表一致
+		self._file_items = {}  # 文件路径 -> 列表项
+		self._pending_watch_event = None
+		self._watch_update_running = False
+		self._watch_lock = threading.Lock()
+		self.repository_changed.connect(self.on_repository_changed)
+		self.watch_update_ready.connect(self.apply_watch_update)
+
+		# 差异块选择：文件路径 -> 取消勾选的 hunk ID 集合，文件路径 -> 已加载的 hunk 模型
+		self._excluded_hunks = {}
+		self._hunk_models = {}
+
+		# 正在运行的后台 Git 任务
+		self._git_tasks = set()
+		self._remote_operation = None
+		self._clone_jobs = []
+		self.git_task_done.connect(self._on_git_task_done)
+		self.git_progress.connect(self.statusBar.showMessage)
 		
 		# 添加应用焦点事件监听
 		self.installEventFilter(self)
@@ -1085,15 +1148,20 @@ class MainWindow(QMainWindow):
 
 		branch_menu.addSeparator()
 
-		pull_action = QAction("拉取更改", self)
-		pull_action.setIcon(QIcon.fromTheme("go-down"))
-		pull_action.triggered.connect(self.pull_repository)
-		branch_menu.addAction(pull_action)
+		self.pull_action = QAction("拉取更改", self)
+		self.pull_action.setIcon(QIcon.fromTheme("go-down"))
+		self.pull_action.triggered.connect(self.pull_repository)
+		branch_menu.addAction(self.pull_action)
+
+		self.push_action = QAction("推送更改", self)
+		self.push_action.setIcon(QIcon.fromTheme("go-up"))
+		self.push_action.triggered.connect(self.push_repository)
+		branch_menu.addAction(self.push_action)
 
-		push_action = QAction("推送更改", self)
-		push_action.setIcon(QIcon.fromTheme("go-up"))
-		push_action.triggered.connect(self.push_repository)
-		branch_menu.addAction(push_action)
+		self.fetch_action = QAction("获取更新", self)
+		self.fetch_action.setIcon(QIcon.fromTheme("view-refresh"))
+		self.fetch_action.triggered.connect(self.fetch_repository)
+		branch_menu.addAction(self.fetch_action)
 
 		# 设置菜单（替换原来的 AI 菜单）
 		settings_menu = menubar.addMenu("设置")
@@ -1152,6 +1220,16 @@ class MainWindow(QMainWindow):
 		# 帮助菜单
 		help_menu = menubar.addMenu("帮助")
 
+		performance_action = QAction("性能", self)
+		performance_action.setIcon(QIcon.fromTheme("utilities-system-monitor"))
+		performance_action.triggered.connect(self.show_performance)
+		help_menu.addAction(performance_action)
+
+		health_action = QAction("仓库健康检查", self)
+		health_action.setIcon(QIcon.fromTheme("system-run"))
+		health_action.triggered.connect(self.show_repository_health)
+		help_menu.addAction(health_action)
+
 		about_action = QAction("关于", self)
 		about_action.setIcon(QIcon.fromTheme("help-about"))
 		about_action.triggered.connect(self.show_about)
@@ -1247,6 +1325,22 @@ class MainWindow(QMainWindow):
 
 			self.statusBar.showMessage("设置已保存")
 
+	def show_performance(self):
+		"""显示当前仓库的 Git 命令性能统计"""
+		if not self.current_repo:
+			QMessageBox.warning(self, "警告", "请先打开一个仓库")
+			return
+		PerformanceDialog(self, self.current_repo, self.diff_store).exec_()
+
+	def show_repository_health(self):
+		"""检查并启用当前仓库的 Git 加速选项"""
+		if not self.current_repo:
+			QMessageBox.warning(self, "警告", "请先打开一个仓库")
+			return
+		HealthDialog(self, self.current_repo).exec_()
+		# 索引格式等可能已变化，重新获取状态
+		self.refresh_ui()
+
 	def show_about(self):
 		"""显示关于对话框"""
 		QMessageBox.about(
@@ -1276,8 +1370,21 @@ class MainWindow(QMainWindow):
 		branch_group = QGroupBox("分支")
 		branch_layout = QHBoxLayout(branch_group)
 
+		# 可搜索的分支选择框，下拉列表按需分批加载；补全器使用单独的模型，输入时按子串过滤全部分支
 		self.branch_combo = QComboBox()
 		self.branch_combo.setMinimumWidth(150)
+		self.branch_combo.setEditable(True)
+		self.branch_combo.setInsertPolicy(QComboBox.NoInsert)
+		self.branch_model = BranchListModel(self)
+		self.branch_combo.setModel(self.branch_model)
+		self.branch_search_model = BranchListModel(self)
+		branch_completer = QCompleter(self.branch_search_model, self)
+		# 模型已经完成过滤，补全器直接显示其中的行
+		branch_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+		branch_completer.activated[str].connect(self._on_branch_completed)
+		self.branch_combo.setCompleter(branch_completer)
+		self.branch_combo.lineEdit().textEdited.connect(self.branch_search_model.set_filter)
+		self._branch_version = None
 		branch_layout.addWidget(self.branch_combo)
 
 		self.refresh_branch_button = QPushButton("刷新")
@@ -1362,6 +1469,22 @@ class MainWindow(QMainWindow):
 		self.diff_viewer.setFont(fixed_font)
 
 		diff_layout.addWidget(self.diff_viewer)
+
+		# 差异块列表，取消勾选的块不会被提交，也不会发送给 AI
+		hunk_header_layout = QHBoxLayout()
+		hunk_header_layout.addWidget(QLabel("差异块（取消勾选的块不提交）"))
+		hunk_header_layout.addStretch()
+		self.stage_hunks_button = QPushButton("按勾选暂存")
+		self.stage_hunks_button.clicked.connect(self.stage_checked_hunks)
+		hunk_header_layout.addWidget(self.stage_hunks_button)
+		diff_layout.addLayout(hunk_header_layout)
+
+		self.hunk_list = QListWidget()
+		self.hunk_list.setMaximumHeight(120)
+		self.hunk_list.setFont(fixed_font)
+		self.hunk_list.itemChanged.connect(self.on_hunk_item_changed)
+		self.hunk_list.itemClicked.connect(self.on_hunk_item_clicked)
+		diff_layout.addWidget(self.hunk_list)
 		right_layout.addWidget(diff_group)
 
 		# 设置分割比例
@@ -1374,10 +1497,19 @@ class MainWindow(QMainWindow):
 		self.setStatusBar(self.statusBar)
 		self.statusBar.showMessage("准备就绪")
 
+		# 网络操作进行中时显示的取消按钮
+		self.cancel_git_button = QPushButton("取消")
+		self.cancel_git_button.clicked.connect(self.cancel_remote_operation)
+		self.cancel_git_button.hide()
+		self.statusBar.addPermanentWidget(self.cancel_git_button)
+
 		logger.debug("状态栏设置完成")
 
 	def setup_connections(self):
 		self.changes_list.itemSelectionChanged.connect(self.on_changes_list_selection_changed)
+		# 滚动时优先刷新新出现在可见区域的文件
+		self.changes_list.verticalScrollBar().valueChanged.connect(self._prioritize_visible_diffs)
+		self.branch_combo.currentIndexChanged.connect(self.branch_changed)
 
 		logger.debug("信号连接设置完成")
 
@@ -1385,53 +1517,215 @@ class MainWindow(QMainWindow):
 		logger.info("尝试打开仓库")
 		repo_path = QFileDialog.getExistingDirectory(self, "选择仓库目录")
 		if repo_path:
-			try:
-				self.current_repo = GitRepository(repo_path)
-				self.refresh_ui()
-				self.statusBar.showMessage(f"已打开仓库: {repo_path}")
-				logger.info(f"成功打开仓库: {repo_path}")
-			except Exception as e:
-				QMessageBox.critical(self, "错误", f"无法打开仓库: {str(e)}")
-				logger.error(f"打开仓库失败: {str(e)}")
+			self._open_repository_path(repo_path)
+
+	def _open_repository_path(self, repo_path):
+		"""打开指定路径的仓库，替换当前仓库"""
+		try:
+			config_manager = Config()
+			# 仓库实现可以按仓库路径单独配置
+			backend = config_manager.get("repository_backends", {}).get(
+				os.path.abspath(repo_path), config_manager.get("git_backend")
+			)
+			repo = GitRepository(repo_path, backend=backend)
+			repo.diff_max_bytes = config_manager.get("diff_max_bytes", repo.diff_max_bytes)
+			repo.diff_max_lines = config_manager.get("diff_max_lines", repo.diff_max_lines)
+			repo.preview_tail_bytes = config_manager.get("preview_tail_bytes", repo.preview_tail_bytes)
+			repo.metrics.slow_threshold_ms = config_manager.get("slow_git_command_ms", repo.metrics.slow_threshold_ms)
+			self.stop_watcher()
+			self.cancel_git_tasks()
+			if self.current_repo:
+				self.current_repo.close()
+			self.current_repo = repo
+			self._excluded_hunks.clear()
+			# 差异缓存映射按路径记录，属于旧仓库
+			self._prune_diff_cache(())
+			self.refresh_ui()
+			self.start_watcher()
+			self.statusBar.showMessage(f"已打开仓库: {repo_path}")
+			logger.info(f"成功打开仓库: {repo_path}")
+		except Exception as e:
+			QMessageBox.critical(self, "错误", f"无法打开仓库: {str(e)}")
+			logger.error(f"打开仓库失败: {str(e)}")
 
 		# 在成功打开仓库后，立即开始刷新差异缓存
 		if self.current_repo:
 			self.refresh_diff_cache_async()
 
 	def clone_repository(self):
-		# 这里将实现克隆仓库的功能
+		"""克隆一个或多个仓库，多个仓库并行克隆"""
 		logger.info("尝试克隆仓库")
-		QMessageBox.information(self, "提示", "克隆仓库功能尚未实现")
+		config_manager = Config()
+		dialog = CloneDialog(self, max_workers=config_manager.get("clone_workers", DEFAULT_CLONE_WORKERS))
+		if dialog.exec_() != QDialog.Accepted:
+			return
+
+		info = dialog.get_clone_info()
+		if not info['urls'] or not info['path']:
+			QMessageBox.warning(self, "警告", "请输入仓库 URL 和本地路径")
+			return
+		config_manager.set("clone_workers", info['max_workers'])
+
+		manager = CloneManager(info['max_workers'])
+		jobs = manager.submit_all(
+			info['urls'],
+			info['path'],
+			progress=self._emit_clone_progress,
+			filter_blobs=info['filter_blobs'],
+			depth=info['depth'],
+			single_branch=info['single_branch']
+		)
+		self._clone_jobs = jobs
+		self._clone_results = {'succeeded': [], 'failed': []}
+		self._update_cancel_button()
+		self.statusBar.showMessage(f"正在克隆 {len(jobs)} 个仓库...")
+
+		for url, path, future in jobs:
+			self.run_git_task(
+				future,
+				lambda _, url=url, path=path: self._on_clone_finished(url, path, None),
+				lambda e, url=url, path=path: self._on_clone_finished(url, path, e),
+				track=False
+			)
+
+	def _emit_clone_progress(self, url, info):
+		"""后台线程: 将克隆进度转发到界面线程"""
+		self.git_progress.emit(f"克隆 {repo_name_from_url(url)}: {format_progress(info)}")
+
+	def _on_clone_finished(self, url, path, error):
+		"""单个仓库克隆结束，全部结束后汇总结果"""
+		if error is None:
+			Config().add_recent_repository(path)
+			self._clone_results['succeeded'].append(path)
+			logger.info(f"克隆成功: {url} -> {path}")
+		else:
+			self._clone_results['failed'].append((url, str(error)))
+			logger.error(f"克隆失败: {url}: {str(error)}")
+
+		succeeded = self._clone_results['succeeded']
+		failed = self._clone_results['failed']
+		total = len(self._clone_jobs)
+		if len(succeeded) + len(failed) < total:
+			self.statusBar.showMessage(f"克隆进度: {len(succeeded) + len(failed)}/{total}")
+			return
+
+		self._clone_jobs = []
+		self._update_cancel_button()
+		self.statusBar.showMessage(f"克隆完成: 成功 {len(succeeded)} 个，失败 {len(failed)} 个")
+		if failed:
+			details = "\n".join(f"{url}: {message}" for url, message in failed)
+			QMessageBox.warning(self, "克隆失败", f"以下仓库克隆失败:\n{details}")
+		elif total == 1:
+			# 只克隆了一个仓库时直接打开
+			self._open_repository_path(succeeded[0])
 
 	def pull_repository(self):
 		if self.current_repo:
-			try:
-				logger.info("尝试拉取更改")
-				self.current_repo.pull()
-				self.refresh_ui()
-				self.statusBar.showMessage("拉取成功")
-				logger.info("拉取成功")
-			except Exception as e:
-				QMessageBox.critical(self, "错误", f"拉取失败: {str(e)}")
-				logger.error(f"拉取失败: {str(e)}")
+			logger.info("尝试拉取更改")
+			repo = self.current_repo
+			old_head = repo.get_head_oid()
+
+			def on_finished():
+				# 只刷新拉取前后有变化的文件，无法确定时完整刷新
+				new_head = repo.get_head_oid()
+				changed = None
+				if old_head and new_head:
+					changed = set(repo.get_changed_files(old_head, new_head)) if old_head != new_head else set()
+				self.refresh_branches()
+				self.on_repository_changed({'paths': changed, 'index': True, 'head': False})
+
+			self._start_remote_operation("拉取", repo.submit_pull(self._emit_git_progress), on_finished)
 		else:
 			QMessageBox.warning(self, "警告", "请先打开一个仓库")
 			logger.warning("尝试拉取但没有打开仓库")
 
 	def push_repository(self):
 		if self.current_repo:
-			try:
-				logger.info("尝试推送更改")
-				self.current_repo.push()
-				self.statusBar.showMessage("推送成功")
-				logger.info("推送成功")
-			except Exception as e:
-				QMessageBox.critical(self, "错误", f"推送失败: {str(e)}")
-				logger.error(f"推送失败: {str(e)}")
+			logger.info("尝试推送更改")
+			# 推送只会移动远程跟踪分支，工作区状态不变
+			self._start_remote_operation("推送", self.current_repo.submit_push(self._emit_git_progress), self.refresh_branches)
 		else:
 			QMessageBox.warning(self, "警告", "请先打开一个仓库")
 			logger.warning("尝试推送但没有打开仓库")
 
+	def fetch_repository(self):
+		if self.current_repo:
+			logger.info("尝试获取远端更新")
+			self._start_remote_operation("获取", self.current_repo.submit_fetch(self._emit_git_progress), self.refresh_branches)
+		else:
+			QMessageBox.warning(self, "警告", "请先打开一个仓库")
+			logger.warning("尝试获取但没有打开仓库")
+
+	def _emit_git_progress(self, info):
+		"""后台线程: 将 Git 进度转发到界面线程"""
+		self.git_progress.emit(format_progress(info))
+
+	def _start_remote_operation(self, label, future, on_finished):
+		"""运行拉取/推送/获取等网络操作，在状态栏显示进度并允许取消
+
+		无论成功还是失败，都会调用 on_finished 刷新受影响的状态。
+		"""
+		self._remote_operation = (label, future)
+		self._set_remote_actions_enabled(False)
+		self._update_cancel_button()
+		self.statusBar.showMessage(f"正在{label}...")
+
+		def on_success(_):
+			self._finish_remote_operation()
+			on_finished()
+			self.statusBar.showMessage(f"{label}成功")
+			logger.info(f"{label}成功")
+
+		def on_error(e):
+			self._finish_remote_operation()
+			on_finished()
+			self.statusBar.showMessage(f"{label}失败")
+			QMessageBox.critical(self, "错误", f"{label}失败: {str(e)}")
+			logger.error(f"{label}失败: {str(e)}")
+
+		self.run_git_task(future, on_success, on_error)
+
+	def cancel_remote_operation(self):
+		"""取消正在进行的网络操作和克隆"""
+		if self._clone_jobs:
+			for _, _, future in self._clone_jobs:
+				future.cancel()
+			self._clone_jobs = []
+			self._update_cancel_button()
+			self.statusBar.showMessage("已取消克隆")
+			logger.info("已取消克隆")
+
+		if not self._remote_operation:
+			return
+		label, future = self._remote_operation
+		self._remote_operation = None
+		self._update_cancel_button()
+		future.cancel()
+		self.statusBar.showMessage(f"正在取消{label}...")
+		# Git 进程收到 SIGTERM 后先清理锁文件再退出，退出之前不允许开始新的网络操作
+		self.run_git_task(future.stopped, lambda _: self._on_remote_operation_cancelled(label), track=False)
+
+	def _on_remote_operation_cancelled(self, label):
+		self._finish_remote_operation()
+		self.statusBar.showMessage(f"已取消{label}")
+		logger.info(f"已取消{label}")
+		# 拉取可能已经更新了部分文件
+		if self.current_repo:
+			self.on_repository_changed({'paths': None, 'index': True, 'head': True})
+
+	def _finish_remote_operation(self):
+		self._remote_operation = None
+		self._set_remote_actions_enabled(True)
+		self._update_cancel_button()
+
+	def _update_cancel_button(self):
+		"""有网络操作或克隆进行中时显示取消按钮"""
+		self.cancel_git_button.setVisible(bool(self._remote_operation or self._clone_jobs))
+
+	def _set_remote_actions_enabled(self, enabled):
+		for action in (self.pull_action, self.push_action, self.fetch_action):
+			action.setEnabled(enabled)
+
 	def generate_commit_message(self):
 		"""使用 AI 生成提交信息"""
 		if not self.current_repo:
@@ -1477,15 +1771,18 @@ class MainWindow(QMainWindow):
 			# 再次处理事件，确保UI响应
 			QApplication.processEvents()
 			
-			# 获取文件差异
+			# 获取文件差异，优先使用缓存，未缓存的文件批量获取
+			cached_diffs = self.get_cached_diffs(selected_files)
+			QApplication.processEvents()
+			
 			diffs = []
 			for file_path in selected_files:
-				# 从缓存获取差异，而不是直接从仓库获取
-				diff = self.get_cached_diff(file_path)
-				
-				# 每处理一个文件后处理事件，保持UI响应
-				QApplication.processEvents()
-				
+				diff = cached_diffs.get(file_path, "")
+				# 部分差异块被取消勾选时只发送勾选的块
+				excluded = self._excluded_hunks.get(file_path)
+				if excluded:
+					models = self._hunk_models.get(file_path) or self._load_hunks(file_path)
+					diff = render_hunks(models, excluded)
 				diffs.append(f"File: {file_path}\n{diff}\n")
 				logger.debug(f"文件差异 ({file_path}):\n{diff}")
 			
@@ -1646,11 +1943,6 @@ class MainWindow(QMainWindow):
 				logger.info("尝试提交但没有选择文件")
 				return
 
-			# 暂存选中的文件
-			for file_path in selected_files:
-				logger.info(f"暂存文件: {file_path}")
-				self.current_repo.stage_file(file_path)
-
 			# 获取提交信息
 			summary = self.summary_edit.text().strip()
 			if not summary:
@@ -1658,6 +1950,12 @@ class MainWindow(QMainWindow):
 				logger.warning("提交摘要为空")
 				return
 
+			# 一次性暂存选中的文件，部分差异块被取消勾选的文件只暂存勾选的块
+			partial_files = [p for p in selected_files if self._excluded_hunks.get(p)]
+			self._stage_selected_files([p for p in selected_files if p not in self._excluded_hunks])
+			for file_path in partial_files:
+				self._apply_hunk_selection(file_path)
+
 			description = self.description_edit.toPlainText().strip()
 
 			# 组合提交信息
@@ -1668,6 +1966,8 @@ class MainWindow(QMainWindow):
 			# 提交更改
 			logger.info(f"提交更改，信息: {commit_message}")
 			self.current_repo.commit(commit_message)
+			self._excluded_hunks.clear()
+			self._hunk_models.clear()
 			self.refresh_ui()
 
 			# 清空提交信息
@@ -1680,6 +1980,26 @@ class MainWindow(QMainWindow):
 			QMessageBox.critical(self, "错误", f"提交失败: {str(e)}")
 			logger.error(f"提交失败: {str(e)}")
 
+	def _stage_selected_files(self, selected_files):
+		"""暂存选中的文件，文件较多时显示进度"""
+		if len(selected_files) < STAGE_PROGRESS_THRESHOLD:
+			self.current_repo.stage_files(selected_files)
+			return
+
+		self.stage_overlay = LoadingOverlay(self)
+		self.stage_overlay.show_with_message(f"正在暂存 {len(selected_files)} 个文件...")
+		QApplication.processEvents()
+
+		def report(done, total):
+			self.stage_overlay.set_message(f"正在暂存文件 ({done}/{total})...")
+			self.statusBar.showMessage(f"已暂存 {done}/{total} 个文件")
+			QApplication.processEvents()
+
+		try:
+			self.current_repo.stage_files(selected_files, progress=report)
+		finally:
+			self._safe_hide_overlay('stage_overlay')
+
 	def toggle_select_all(self, state):
 		"""切换全选/取消全选"""
 		# 添加性能日志
@@ -1741,6 +2061,7 @@ class MainWindow(QMainWindow):
 		selected_items = self.changes_list.selectedItems()
 		if not selected_items:
 			self.diff_viewer.clear()
+			self.hunk_list.clear()
 			logger.debug("没有选中项，清空差异查看器")
 			return
 
@@ -1764,42 +2085,11 @@ class MainWindow(QMainWindow):
 
 				# 设置差异文本并添加语法高亮
 				self.diff_viewer.clear()
+				self._insert_diff_lines(self.diff_viewer.textCursor(), diff_text.splitlines())
+				self.diff_viewer.moveCursor(QTextCursor.Start)
 
-				# 简单的语法高亮
-				cursor = self.diff_viewer.textCursor()
-
-				# 添加行格式
-				format_add = QTextCharFormat()
-				format_add.setForeground(QBrush(QColor("green")))
-				format_add.setBackground(QBrush(QColor(232, 255, 232)))  # 浅绿色背景
-
-				format_remove = QTextCharFormat()
-				format_remove.setForeground(QBrush(QColor("red")))
-				format_remove.setBackground(QBrush(QColor(255, 232, 232)))  # 浅红色背景
-
-				format_header = QTextCharFormat()
-				format_header.setForeground(QBrush(QColor("blue")))
-				format_header.setBackground(QBrush(QColor(232, 232, 255)))  # 浅蓝色背景
-
-				format_normal = QTextCharFormat()
-
-				# 处理每一行
-				for line in diff_text.splitlines():
-					if not line:  # 空行
-						cursor.insertText('\n')
-						continue
-
-					# 检查行的第一个字符
-					first_char = line[0] if line else ''
-
-					if first_char == '+':
-						cursor.insertText(line + '\n', format_add)
-					elif first_char == '-':
-						cursor.insertText(line + '\n', format_remove)
-					elif line.startswith('@@') or line.startswith('diff'):
-						cursor.insertText(line + '\n', format_header)
-					else:
-						cursor.insertText(line + '\n', format_normal)
+				# 显示该文件的差异块
+				self._show_hunks(file_path)
 
 				end_time = time.time()
 				logger.debug(f"显示文件差异: {file_path}, 耗时: {end_time - start_time:.3f}秒")
@@ -1807,54 +2097,214 @@ class MainWindow(QMainWindow):
 			self.diff_viewer.setPlainText(f"无法显示差异: {str(e)}")
 			logger.error(f"显示差异失败: {str(e)}", exc_info=True)
 
-	def refresh_branches(self):
-		"""刷新分支列表"""
-		if not self.current_repo:
+	def _load_hunks(self, file_path):
+		"""加载文件已暂存和未暂存部分的 hunk 模型，未跟踪的文件没有 hunk"""
+		status = getattr(self, '_last_status', None)
+		entry = status.entry(file_path) if status is not None else None
+		models = []
+		if entry is not None and not entry.untracked:
+			if entry.staged:
+				models.append(self.current_repo.get_hunks(file_path, cached=True))
+			if entry.modified:
+				models.append(self.current_repo.get_hunks(file_path))
+		self._hunk_models[file_path] = models
+		return models
+
+	def _show_hunks(self, file_path):
+		"""在差异块列表中显示文件的 hunk，勾选状态来自 _excluded_hunks"""
+		self.hunk_list.blockSignals(True)
+		try:
+			self.hunk_list.clear()
+			excluded = self._excluded_hunks.get(file_path, set())
+			for model in self._load_hunks(file_path):
+				for hunk in model['hunks']:
+					added, removed = hunk_stats(hunk)
+					text = (
+						f"{'已暂存' if hunk['staged'] else '未暂存'} "
+						f"-{hunk['old_start']},{hunk['old_count']} +{hunk['new_start']},{hunk['new_count']} "
+						f"(+{added} -{removed}){hunk['section'].decode('utf-8', errors='replace')}"
+					)
+					item = QListWidgetItem(text)
+					item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+					item.setCheckState(Qt.Unchecked if hunk['id'] in excluded else Qt.Checked)
+					item.setData(Qt.UserRole, (hunk['id'], hunk['header'].decode('utf-8', errors='replace')))
+					self.hunk_list.addItem(item)
+				if model['truncated']:
+					item = QListWidgetItem("（差异已截断：之后的更改无法单独选择，提交时总是包含在内）")
+					item.setFlags(Qt.NoItemFlags)
+					self.hunk_list.addItem(item)
+		finally:
+			self.hunk_list.blockSignals(False)
+
+	def on_hunk_item_changed(self, item):
+		"""勾选或取消勾选差异块"""
+		file_path = getattr(self, '_current_diff_file', None)
+		data = item.data(Qt.UserRole)
+		if not file_path or not data:
+			return
+		excluded = self._excluded_hunks.setdefault(file_path, set())
+		if item.checkState() == Qt.Checked:
+			excluded.discard(data[0])
+		else:
+			excluded.add(data[0])
+		if not excluded:
+			del self._excluded_hunks[file_path]
+
+	def on_hunk_item_clicked(self, item):
+		"""在差异查看器中定位到所选的差异块"""
+		data = item.data(Qt.UserRole)
+		if not data:
 			return
+		self.diff_viewer.moveCursor(QTextCursor.Start)
+		self.diff_viewer.find(data[1])
 
+	def stage_checked_hunks(self):
+		"""暂存当前文件勾选的差异块，并取消暂存未勾选的已暂存块"""
+		file_path = getattr(self, '_current_diff_file', None)
+		if not self.current_repo or not file_path:
+			return
 		try:
-			logger.info("刷新分支列表")
-			current_text = self.branch_combo.currentText()
+			self._apply_hunk_selection(file_path)
+			# 暂存区已按勾选更新，重新显示差异和差异块
+			self.cache_file_diff(file_path)
+			self._current_diff_file = None
+			self.on_changes_list_selection_changed()
+			self.statusBar.showMessage(f"已按勾选暂存差异块: {file_path}")
+		except Exception as e:
+			QMessageBox.critical(self, "错误", f"暂存差异块失败: {str(e)}")
+			logger.error(f"暂存差异块失败: {str(e)}", exc_info=True)
+
+	def _apply_hunk_selection(self, file_path):
+		"""按勾选更新暂存区，之后工作区中剩下的 hunk 即为未勾选的部分
+
+		取消暂存的 hunk 回到工作区后 ID 会变化，因此应用后以工作区剩余的 hunk 作为新的排除集合。
+		"""
+		self.current_repo.apply_hunk_selection(file_path, self._excluded_hunks.get(file_path, set()))
+		remaining = self.current_repo.get_hunks(file_path, max_bytes=0, max_lines=0)
+		excluded = {h['id'] for h in remaining['hunks']}
+		if excluded:
+			self._excluded_hunks[file_path] = excluded
+		else:
+			self._excluded_hunks.pop(file_path, None)
+
+	def _insert_diff_lines(self, cursor, lines):
+		"""按行的类型添加简单的语法高亮
+
+		相邻的同类行合并为一次 insertText，大文件的差异不会逐行触发文档布局。
+		"""
+		# 添加行格式
+		format_add = QTextCharFormat()
+		format_add.setForeground(QBrush(QColor("green")))
+		format_add.setBackground(QBrush(QColor(232, 255, 232)))  # 浅绿色背景
+
+		format_remove = QTextCharFormat()
+		format_remove.setForeground(QBrush(QColor("red")))
+		format_remove.setBackground(QBrush(QColor(255, 232, 232)))  # 浅红色背景
+
+		format_header = QTextCharFormat()
+		format_header.setForeground(QBrush(QColor("blue")))
+		format_header.setBackground(QBrush(QColor(232, 232, 255)))  # 浅蓝色背景
+
+		format_normal = QTextCharFormat()
+
+		current_format = None
+		block = []
+		for line in lines:
+			# 检查行的第一个字符
+			if line.startswith('+'):
+				line_format = format_add
+			elif line.startswith('-'):
+				line_format = format_remove
+			elif line.startswith('@@') or line.startswith('diff') or line.startswith('[差异已截断'):
+				line_format = format_header
+			else:
+				line_format = format_normal
 
-			self.branch_combo.clear()
-			branches = self.current_repo.get_branches()
+			if line_format is not current_format and block:
+				cursor.insertText('\n'.join(block) + '\n', current_format)
+				block = []
+			current_format = line_format
+			block.append(line)
 
-			# 获取当前分支
-			status = self.current_repo.get_status()
-			current_branch = status['branch']
+		if block:
+			cursor.insertText('\n'.join(block) + '\n', current_format)
 
-			# 添加分支到下拉框
-			for branch in branches:
-				self.branch_combo.addItem(branch)
+	def refresh_branches(self, force=False):
+		"""刷新分支列表
 
-			# 设置当前分支为选中项
-			index = self.branch_combo.findText(current_branch)
-			if index >= 0:
-				self.branch_combo.setCurrentIndex(index)
+		分支索引未变化时只更新当前选中项，不重建列表。
+		"""
+		if not self.current_repo:
+			return
 
-			# 连接信号
-			self.branch_combo.currentIndexChanged.connect(self.branch_changed)
+		try:
+			branch_index = self.current_repo.branches
+			branch_index.refresh(force=force)
+			current_branch = branch_index.current
 
+			self.branch_combo.blockSignals(True)
+			try:
+				if branch_index.version != self._branch_version or force:
+					logger.info("刷新分支列表")
+					# 本地分支在前；远程分支只列出没有同名本地分支的
+					local_names = {e['name'] for e in branch_index.entries if not e['remote']}
+					names = [
+						e['name'] for e in branch_index.entries
+						if not e['remote'] or e['name'].split("/", 1)[-1] not in local_names
+					]
+					self.branch_model.set_names(names)
+					self.branch_search_model.set_names(names)
+					self._branch_version = branch_index.version
+
+				index = self.branch_model.row_of(current_branch)
+				if index >= 0:
+					self.branch_combo.setCurrentIndex(index)
+				else:
+					self.branch_combo.setEditText(current_branch)
+			finally:
+				self.branch_combo.blockSignals(False)
+
+			self._update_branch_tooltip(current_branch)
 			logger.debug(f"分支列表刷新完成，当前分支: {current_branch}")
 		except Exception as e:
 			QMessageBox.critical(self, "错误", f"刷新分支列表失败: {str(e)}")
 			logger.error(f"刷新分支列表失败: {str(e)}")
 
+	def _on_branch_completed(self, name):
+		"""从补全列表选择分支；分支可能还不在下拉列表已加载的行中"""
+		index = self.branch_model.row_of(name)
+		if index >= 0 and index != self.branch_combo.currentIndex():
+			self.branch_combo.setCurrentIndex(index)
+
+	def _update_branch_tooltip(self, branch_name):
+		"""在分支选择框的提示中显示当前分支与上游的差距"""
+		entry = self.current_repo.branches.find(branch_name)
+		counts = self.current_repo.branches.ahead_behind(branch_name)
+		if entry and counts is not None:
+			ahead, behind = counts
+			self.branch_combo.setToolTip(f"上游: {entry['upstream']}\n领先 {ahead} 个提交，落后 {behind} 个提交")
+		else:
+			self.branch_combo.setToolTip("")
+
 	def branch_changed(self, index):
 		"""当用户选择不同的分支时触发"""
 		if not self.current_repo or index < 0:
 			return
 
-		selected_branch = self.branch_combo.currentText()
-		current_status = self.current_repo.get_status()
+		selected_branch = self.branch_combo.itemText(index)
+		current_branch = self.current_repo.get_current_branch()
 
 		# 如果选择的是当前分支，不做任何操作
-		if selected_branch == current_status['branch']:
+		if selected_branch == current_branch:
 			return
 
+		current_branch_name = current_branch
 		try:
+			current_status = self.current_repo.get_status()
+			current_branch_name = current_status.branch
+
 			# 检查是否有未提交的更改
-			if current_status['modified'] or current_status['staged']:
+			if current_status.modified or current_status.staged:
 				reply = QMessageBox.question(
 					self,
 					"未提交的更改",
@@ -1865,13 +2315,18 @@ class MainWindow(QMainWindow):
 
 				if reply == QMessageBox.No:
 					# 恢复选择
-					index = self.branch_combo.findText(current_status['branch'])
+					index = self.branch_model.row_of(current_branch_name)
 					if index >= 0:
 						self.branch_combo.blockSignals(True)
 						self.branch_combo.setCurrentIndex(index)
 						self.branch_combo.blockSignals(False)
 					return
 
+			# 远程分支通过 checkout 的同名推断创建对应的本地跟踪分支
+			entry = self.current_repo.branches.find(selected_branch)
+			if entry and entry['remote']:
+				selected_branch = selected_branch.split("/", 1)[-1]
+
 			logger.info(f"切换到分支: {selected_branch}")
 			self.current_repo.checkout_branch(selected_branch)
 			self.refresh_ui()
@@ -1881,7 +2336,7 @@ class MainWindow(QMainWindow):
 			logger.error(f"切换分支失败: {str(e)}")
 
 			# 恢复选择
-			index = self.branch_combo.findText(current_status['branch'])
+			index = self.branch_model.row_of(current_branch_name)
 			if index >= 0:
 				self.branch_combo.blockSignals(True)
 				self.branch_combo.setCurrentIndex(index)
@@ -1941,6 +2396,8 @@ class MainWindow(QMainWindow):
 
 			# 更新变更列表
 			self.changes_list.clear()
+			self._file_states = {}
+			self._file_items = {}
 
 			try:
 				# 获取仓库状态，这是一个耗时操作
@@ -1950,47 +2407,21 @@ class MainWindow(QMainWindow):
 				self._last_status = status
 				
 				# 合并所有文件列表，不再区分暂存状态
-				all_files = []
-
-				# 添加已暂存的文件
-				for file_path in status['staged']:
-					if file_path not in [f[0] for f in all_files]:
-						all_files.append((file_path, "staged"))
-
-				# 添加已修改但未暂存的文件
-				for file_path in status['modified']:
-					if file_path not in [f[0] for f in all_files]:
-						all_files.append((file_path, "modified"))
+				self._file_states = status.states()
 
-				# 添加已删除但未暂存的文件
-				for file_path in status['deleted']:
-					if file_path not in [f[0] for f in all_files]:
-						all_files.append((file_path, "deleted"))
-
-				# 添加未跟踪的文件
-				for file_path in status['untracked']:
-					if file_path not in [f[0] for f in all_files]:
-						all_files.append((file_path, "untracked"))
+				# 差异块需要按新的状态重新加载，已不在列表中的文件不再保留勾选
+				self._hunk_models.clear()
+				self._excluded_hunks = {p: ids for p, ids in self._excluded_hunks.items() if p in self._file_states}
 
 				# 添加所有文件到列表
-				for file_path, file_status in all_files:
-					item = QListWidgetItem()
-					item.setSizeHint(QSize(0, 30))
-					self.changes_list.addItem(item)
-
-					# 创建文件项组件，并传递回调函数
-					widget = FileItemWidget(
-						file_path,
-						file_status,
-						on_checkbox_changed=self.update_select_all_state
-					)
-					self.changes_list.setItemWidget(item, widget)
+				for file_path, file_status in self._file_states.items():
+					self._add_file_item(file_path, file_status)
 
 				# 更新全选复选框状态
 				self.update_select_all_state()
 
 				# 更新窗口标题，显示当前分支
-				self.setWindowTitle(f"AICommit - {os.path.basename(self.current_repo.path)} ({status['branch']})")
+				self.setWindowTitle(f"AICommit - {os.path.basename(self.current_repo.path)} ({status.branch})")
 
 				end_time = time.time()
 				logger.debug(f"UI 刷新完成，耗时: {end_time - start_time:.3f}秒")
@@ -1998,6 +2429,176 @@ class MainWindow(QMainWindow):
 				QMessageBox.critical(self, "错误", f"刷新 UI 失败: {str(e)}")
 				logger.error(f"刷新 UI 失败: {str(e)}", exc_info=True)
 
+	def _add_file_item(self, file_path, file_status):
+		"""向变更列表添加一个文件项"""
+		item = QListWidgetItem()
+		item.setSizeHint(QSize(0, 30))
+		self.changes_list.addItem(item)
+
+		# 创建文件项组件，并传递回调函数
+		widget = FileItemWidget(
+			file_path,
+			file_status,
+			on_checkbox_changed=self.update_select_all_state
+		)
+		self.changes_list.setItemWidget(item, widget)
+		self._file_items[file_path] = item
+
+	def start_watcher(self):
+		"""开始监视当前仓库的文件变化"""
+		if not self.current_repo:
+			return
+		try:
+			repo = self.current_repo
+			self.repo_watcher = RepositoryWatcher(
+				repo.path,
+				repo.git_dir,
+				callback=lambda event: self._on_watch_event(repo, event),
+				ignore_filter=repo.get_ignored_paths,
+				poll_check=repo.has_changes
+			)
+			self.repo_watcher.start()
+			# inotify 会报告引用变化，命令缓存不必每次查询都遍历 refs
+			repo.commands.refs_watched = self.repo_watcher.mode == "inotify"
+		except Exception as e:
+			self.repo_watcher = None
+			logger.error(f"启动文件监视失败: {str(e)}", exc_info=True)
+
+	def _on_watch_event(self, repo, event):
+		"""监视线程: 引用可能变化时立即使命令缓存重新遍历 refs，再转发到界面线程"""
+		if event['head'] or event['paths'] is None:
+			repo.commands.refs_changed()
+		self.repository_changed.emit(event)
+
+	def stop_watcher(self):
+		"""停止文件监视"""
+		if self.repo_watcher:
+			self.repo_watcher.stop()
+			self.repo_watcher = None
+		if self.current_repo:
+			self.current_repo.commands.refs_watched = False
+		with self._watch_lock:
+			self._pending_watch_event = None
+
+	def on_repository_changed(self, event):
+		"""收到文件监视事件，合并后在后台线程中计算增量更新"""
+		with self._watch_lock:
+			if self._pending_watch_event is None:
+				self._pending_watch_event = event
+			else:
+				merge_event(self._pending_watch_event, event)
+			if self._watch_update_running:
+				return
+			self._watch_update_running = True
+
+		threading.Thread(
+			target=self._process_watch_events,
+			args=(self.current_repo,),
+			daemon=True
+		).start()
+
+	def _process_watch_events(self, repo):
+		"""后台线程: 依次处理待处理的监视事件"""
+		while True:
+			with self._watch_lock:
+				event, self._pending_watch_event = self._pending_watch_event, None
+				if event is None or repo is not self.current_repo:
+					self._watch_update_running = False
+					return
+			try:
+				result = self._compute_watch_update(repo, event)
+				self.watch_update_ready.emit(result)
+			except Exception as e:
+				logger.error(f"增量更新失败: {str(e)}", exc_info=True)
+
+	def _compute_watch_update(self, repo, event):
+		"""根据变化事件重新查询受影响路径的状态和差异"""
+		start_time = time.time()
+		paths = event['paths']
+		last_status = getattr(self, '_last_status', None)
+
+		# 索引或 HEAD 变化、路径未知时需要完整状态；否则只查询变化的路径
+		if paths is None or event['index'] or event['head'] or last_status is None:
+			status = repo.get_status()
+		else:
+			status = merge_status(last_status, repo.get_status(paths=sorted(paths)), paths)
+
+		new_states = status.states()
+		added, _, changed = status.delta(last_status)
+		changed_states = added | changed
+
+		# 计算需要重新获取差异的文件
+		if paths is None or event['head']:
+			affected = set(new_states)
+		else:
+			affected = set(changed_states)
+			if paths:
+				affected.update(p for p in new_states if path_in_specs(p, paths))
+			if event['index']:
+				affected.update(p for p, s in new_states.items() if s == 'staged')
+
+		diff_paths = [p for p in new_states if p in affected]
+		keys = self._get_diff_keys(repo, diff_paths, status)
+		diffs = repo.get_diffs(diff_paths, status) if affected else {}
+		keys = self._stable_diff_keys(keys, self._get_diff_keys(repo, list(diffs), status))
+		logger.debug(
+			f"增量更新: {len(changed_states)} 个状态变化, "
+			f"{len(diffs)} 个差异重新获取，耗时: {time.time() - start_time:.3f}秒"
+		)
+		return {
+			'repo': repo,
+			'status': status,
+			'states': new_states,
+			'diffs': diffs,
+			'keys': keys,
+			'head': event['head']
+		}
+
+	def apply_watch_update(self, result):
+		"""在界面线程中应用增量更新，只修改有变化的列表项和缓存"""
+		if result['repo'] is not self.current_repo:
+			return
+
+		status = result['status']
+		new_states = result['states']
+		self._last_status = status
+
+		# 引用变化时更新分支选择框，分支索引未变化时开销很小
+		if result['head']:
+			self.refresh_branches()
+
+		# 移除不再有变化的文件
+		removed = [p for p in self._file_items if p not in new_states]
+		for file_path in removed:
+			item = self._file_items.pop(file_path)
+			self.changes_list.takeItem(self.changes_list.row(item))
+			self._excluded_hunks.pop(file_path, None)
+			self._hunk_models.pop(file_path, None)
+
+		# 更新状态变化的文件，添加新出现的文件
+		for file_path, file_status in new_states.items():
+			item = self._file_items.get(file_path)
+			if item is None:
+				self._add_file_item(file_path, file_status)
+				continue
+			widget = self.changes_list.itemWidget(item)
+			if widget and widget.status != file_status:
+				widget.set_status(file_status)
+		self._file_states = new_states
+
+		# 更新差异缓存
+		self._prune_diff_cache(new_states)
+		self._cache_diffs(result['repo'], result['diffs'], result['keys'])
+		self.diff_cache_timestamp = time.time()
+
+		# 当前显示的文件有变化时重新显示差异
+		if getattr(self, '_current_diff_file', None) in result['diffs']:
+			self._current_diff_file = None
+			self.on_changes_list_selection_changed()
+
+		self.update_select_all_state()
+		self.setWindowTitle(f"AICommit - {os.path.basename(self.current_repo.path)} ({status.branch})")
+
 	def _heartbeat(self):
 		"""心跳函数，定期处理事件，防止应用程序显示为"未响应" """
 		try:
@@ -2014,6 +2615,50 @@ class MainWindow(QMainWindow):
 			# 心跳函数不应该抛出异常
 			logger.error(f"心跳函数出错: {str(e)}", exc_info=True)
 
+	def run_git_task(self, future, on_success, on_error=None, track=True):
+		"""等待后台 Git 任务完成后在 UI 线程中调用回调，不阻塞事件循环
+
+		future 为 concurrent.futures.Future，例如 GitRepository.submit_pull 的返回值。
+		track 为 True 的任务属于当前仓库，切换仓库或关闭窗口时会被取消。
+		"""
+		if track:
+			self._git_tasks.add(future)
+		future.add_done_callback(lambda f: self.git_task_done.emit(f, on_success, on_error))
+		return future
+
+	def _on_git_task_done(self, future, on_success, on_error):
+		"""在 UI 线程中分发后台 Git 任务的结果"""
+		self._git_tasks.discard(future)
+		if future.cancelled():
+			return
+		error = future.exception()
+		if error is None:
+			on_success(future.result())
+		elif on_error:
+			on_error(error)
+		else:
+			logger.error(f"后台 Git 任务失败: {str(error)}")
+
+	def cancel_git_tasks(self):
+		"""取消所有正在运行的后台 Git 任务"""
+		self.diff_refresher.cancel()
+		for future in list(self._git_tasks):
+			future.cancel()
+		self._git_tasks.clear()
+		if self._remote_operation:
+			self._finish_remote_operation()
+
+	def closeEvent(self, event):
+		"""窗口关闭时释放仓库占用的后台进程"""
+		self.stop_watcher()
+		self.cancel_git_tasks()
+		for _, _, future in self._clone_jobs:
+			future.cancel()
+		if self.current_repo:
+			self.current_repo.close()
+		self.diff_store.save()
+		super().closeEvent(event)
+
 	def eventFilter(self, obj, event):
 		"""事件过滤器，用于捕获应用获取焦点事件"""
 		if event.type() == QEvent.WindowActivate:
@@ -2026,106 +2671,174 @@ class MainWindow(QMainWindow):
 		if not self.current_repo:
 			return
 			
-		# 如果距离上次更新超过30秒，则刷新缓存
+		# 文件监视已在增量更新缓存，无需定期刷新
+		if self.repo_watcher:
+			return
+			
+		# 如果距离上次更新超过30秒，则在工作区有变化时刷新缓存
 		current_time = time.time()
 		if current_time - self.diff_cache_timestamp > 30:
-			self.refresh_diff_cache_async()
+			self.refresh_diff_cache_async(only_if_changed=True)
 	
-	def refresh_diff_cache_async(self):
-		"""异步刷新差异缓存"""
+	def refresh_diff_cache_async(self, only_if_changed=False):
+		"""异步刷新差异缓存，选中和可见的文件优先"""
 		if not self.current_repo:
 			return
-			
-		# 创建后台线程刷新缓存
-		threading.Thread(
-			target=self.refresh_diff_cache,
-			daemon=True
-		).start()
-	
-	def refresh_diff_cache(self):
-		"""刷新所有文件的差异缓存"""
-		if not self.current_repo:
+
+		self._diff_refresh_priority = self._visible_files()
+		with self.diff_cache_lock:
+			if self._diff_refresh_scheduled:
+				return
+			self._diff_refresh_scheduled = True
+		get_refresh_executor().submit(self.refresh_diff_cache, only_if_changed)
+
+	def _visible_files(self):
+		"""返回选中的文件和变更列表中当前可见的文件，选中的在前"""
+		paths = []
+		for item in self.changes_list.selectedItems():
+			widget = self.changes_list.itemWidget(item)
+			if widget:
+				paths.append(widget.file_path)
+
+		viewport = self.changes_list.viewport()
+		first = self.changes_list.indexAt(QPoint(0, 0)).row()
+		if first < 0:
+			return paths
+		last = self.changes_list.indexAt(QPoint(0, viewport.height() - 1)).row()
+		if last < 0:
+			last = self.changes_list.count() - 1
+		for row in range(first, last + 1):
+			widget = self.changes_list.itemWidget(self.changes_list.item(row))
+			if widget:
+				paths.append(widget.file_path)
+		return paths
+
+	def _prioritize_visible_diffs(self):
+		"""将可见文件移到正在进行的刷新队列的队首"""
+		self.diff_refresher.prioritize(self._visible_files())
+
+	def refresh_diff_cache(self, only_if_changed=False):
+		"""刷新所有文件的差异缓存
+
+		在后台线程中获取状态并清理旧缓存，差异由 diff_refresher 在共用线程池中分批获取；
+		开始新的刷新会取消尚未完成的旧刷新。
+		"""
+		with self.diff_cache_lock:
+			self._diff_refresh_scheduled = False
+		repo = self.current_repo
+		if not repo:
 			return
 			
 		try:
-			logger.debug("开始刷新差异缓存")
-			start_time = time.time()
+			# 通过索引 stat 信息快速判断是否有变化，无变化时跳过刷新
+			if only_if_changed and not repo.has_changes():
+				logger.debug("工作区没有变化，跳过差异缓存刷新")
+				self.diff_cache_timestamp = time.time()
+				return
 			
 			# 获取仓库状态
-			status = self.current_repo.get_status()
+			status = repo.get_status()
 			
 			# 合并所有文件列表
-			all_files = []
-			for file_path in status['staged']:
-				if file_path not in all_files:
-					all_files.append(file_path)
-			
-			for file_path in status['modified']:
-				if file_path not in all_files:
-					all_files.append(file_path)
-			
-			for file_path in status['deleted']:
-				if file_path not in all_files:
-					all_files.append(file_path)
-			
-			for file_path in status['untracked']:
-				if file_path not in all_files:
-					all_files.append(file_path)
+			all_files = list(status.entries)
+			current_files = set(all_files)
 			
 			# 清理旧缓存
-			with self.diff_cache_lock:
-				for cached_file in list(self.diff_cache.keys()):
-					if cached_file not in all_files:
-						cache_path = self.diff_cache[cached_file]
-						try:
-							if os.path.exists(cache_path):
-								os.remove(cache_path)
-						except:
-							pass
-						del self.diff_cache[cached_file]
-			
-			# 并行获取差异
-			threads = []
+			self._prune_diff_cache(current_files)
+
+			# 内容未变的文件直接使用持久缓存中的差异，其余的才需要重新获取
+			keys = self._get_diff_keys(repo, all_files, status)
+			cached = self.diff_store.contains_many(keys.values())
+			missing = []
 			for file_path in all_files:
-				thread = threading.Thread(
-					target=self.cache_file_diff,
-					args=(file_path,),
-					daemon=True
-				)
-				threads.append(thread)
-				thread.start()
-			
-			# 等待所有线程完成
-			for thread in threads:
-				thread.join()
-			
-			# 更新时间戳
-			self.diff_cache_timestamp = time.time()
-			
-			end_time = time.time()
-			logger.debug(f"差异缓存刷新完成，共 {len(all_files)} 个文件，耗时: {end_time - start_time:.3f}秒")
+				key = keys.get(file_path)
+				if key in cached:
+					self._set_diff_key(file_path, key)
+				else:
+					missing.append(file_path)
+			logger.debug(f"持久缓存命中 {len(all_files) - len(missing)} 个文件，需要获取 {len(missing)} 个")
+			
+			# 分批获取差异，每批暂存区和工作区各只运行一次 git diff
+			self.diff_refresher.start(
+				repo, status, missing,
+				priority=self._diff_refresh_priority,
+				on_batch=lambda generation, diffs: self._store_refreshed_diffs(generation, repo, status, keys, diffs),
+				on_done=self._on_diff_refresh_done
+			)
 		except Exception as e:
 			logger.error(f"刷新差异缓存失败: {str(e)}", exc_info=True)
+
+	def _store_refreshed_diffs(self, generation, repo, status, keys, diffs):
+		"""刷新线程: 写入一批差异，刷新已被取消时丢弃"""
+		keys = self._stable_diff_keys(keys, self._get_diff_keys(repo, list(diffs), status))
+		if self.diff_refresher.is_current(generation):
+			self._cache_diffs(repo, diffs, keys)
+
+	def _cache_diffs(self, repo, diffs, keys):
+		"""缓存一批差异，有稳定标识的在一个事务中写入持久缓存，其余只保存在内存中"""
+		self.diff_store.put_many({keys[p]: text for p, text in diffs.items() if p in keys}, repository=repo.path)
+		for file_path, diff_text in diffs.items():
+			if file_path in keys:
+				self._set_diff_key(file_path, keys[file_path])
+			else:
+				self.cache_file_diff(file_path, diff_text)
+
+	def _on_diff_refresh_done(self, generation, total, elapsed):
+		# 更新时间戳并保存持久缓存的索引
+		self.diff_cache_timestamp = time.time()
+		self.diff_store.save()
+
+	def _get_diff_keys(self, repo, paths, status):
+		"""计算差异内容标识，失败时返回空字典，差异只保存在本次运行中"""
+		if not paths:
+			return {}
+		try:
+			return repo.get_diff_keys(paths, status)
+		except Exception as e:
+			logger.warning(f"计算差异内容标识失败: {str(e)}")
+			return {}
+
+	@staticmethod
+	def _stable_diff_keys(before, after):
+		"""只保留获取差异前后一致的标识，期间被修改的文件的差异不能以旧标识保存"""
+		return {path: key for path, key in before.items() if after.get(path) == key}
+
+	def _set_diff_key(self, file_path, key):
+		with self.diff_cache_lock:
+			old = self.diff_cache.get(file_path)
+			self.diff_cache[file_path] = key
+		if old is not None and old != key:
+			self.diff_store.release(old)
+
+	def _prune_diff_cache(self, current_files):
+		"""移除已不在变更列表中的文件的缓存映射"""
+		with self.diff_cache_lock:
+			stale = [p for p in self.diff_cache if p not in current_files]
+			keys = [self.diff_cache.pop(p) for p in stale]
+		for key in keys:
+			self.diff_store.release(key)
 	
-	def cache_file_diff(self, file_path):
-		"""缓存单个文件的差异"""
+	def cache_file_diff(self, file_path, diff_text=None, key=None):
+		"""缓存单个文件的差异，未提供差异文本时从仓库获取
+
+		key 为 GitRepository.get_diff_keys 计算的内容标识，有标识的差异写入持久缓存，
+		否则只保存在本次运行中。
+		"""
 		try:
+			repo = self.current_repo
 			# 获取文件差异
-			diff_text = self.current_repo.get_file_diff(file_path)
+			if diff_text is None:
+				diff_text = repo.get_file_diff(file_path, getattr(self, '_last_status', None))
 			
-			# 生成缓存文件路径
-			cache_file = os.path.join(
-				self.diff_cache_dir, 
-				f"{hash(self.current_repo.path)}_{hash(file_path)}.diff"
-			)
-			
-			# 写入缓存
-			with open(cache_file, 'w', encoding='utf-8') as f:
-				f.write(diff_text)
+			if key is None:
+				# 本次运行内唯一的标识
+				key = diff_cache_key(repo.path, file_path, time.time_ns())
+				self.diff_store.put(key, diff_text, persist=False)
+			else:
+				self.diff_store.put(key, diff_text, repository=repo.path)
 			
 			# 更新缓存映射
-			with self.diff_cache_lock:
-				self.diff_cache[file_path] = cache_file
+			self._set_diff_key(file_path, key)
 				
 			logger.debug(f"已缓存文件差异: {file_path}")
 		except Exception as e:
@@ -2134,17 +2847,31 @@ class MainWindow(QMainWindow):
 	def get_cached_diff(self, file_path):
 		"""获取缓存的文件差异"""
 		with self.diff_cache_lock:
-			if file_path in self.diff_cache:
-				cache_path = self.diff_cache[file_path]
-				try:
-					if os.path.exists(cache_path):
-						with open(cache_path, 'r', encoding='utf-8') as f:
-							return f.read()
-				except Exception as e:
-					logger.error(f"读取缓存差异失败 ({file_path}): {str(e)}")
+			key = self.diff_cache.get(file_path)
+		if key is not None:
+			diff_text = self.diff_store.get(key)
+			if diff_text is not None:
+				return diff_text
 		
 		# 如果缓存不存在或读取失败，直接获取
-		return self.current_repo.get_file_diff(file_path)
+		return self.current_repo.get_file_diff(file_path, getattr(self, '_last_status', None))
+	
+	def get_cached_diffs(self, file_paths):
+		"""批量获取缓存的文件差异，未缓存的文件通过一次批量 diff 获取"""
+		diffs = {}
+		missing = []
+		for file_path in file_paths:
+			with self.diff_cache_lock:
+				key = self.diff_cache.get(file_path)
+			diff_text = self.diff_store.get(key) if key is not None else None
+			if diff_text is not None:
+				diffs[file_path] = diff_text
+			else:
+				missing.append(file_path)
+		
+		if missing:
+			diffs.update(self.current_repo.get_diffs(missing, getattr(self, '_last_status', None)))
+		return diffs
 
 # 在文件末尾添加
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+import time
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+							QPushButton, QFileDialog, QMessageBox, QTableWidget,
+							QTableWidgetItem, QPlainTextEdit, QSplitter, QHeaderView)
+from PyQt5.QtCore import Qt
+
+from aicommit_git.metrics import REPORT_PERCENTILES
+
+class PerformanceDialog(QDialog):
+	"""显示仓库中各 Git 子命令的耗时分布、慢命令以及命令缓存和差异缓存的命中情况"""
+
+	def __init__(self, parent=None, repo=None, diff_cache=None):
+		super().__init__(parent)
+		self.repo = repo
+		self.diff_cache = diff_cache
+
+		self.setWindowTitle("性能")
+		self.setMinimumSize(800, 500)
+
+		self.setup_ui()
+		self.refresh()
+
+	def setup_ui(self):
+		layout = QVBoxLayout(self)
+
+		self.summary_label = QLabel()
+		layout.addWidget(self.summary_label)
+
+		self.diff_cache_label = QLabel()
+		self.diff_cache_label.setVisible(self.diff_cache is not None)
+		layout.addWidget(self.diff_cache_label)
+
+		splitter = QSplitter(Qt.Vertical)
+
+		# 各子命令的统计，按总耗时降序
+		headers = ["命令", "次数", "总耗时 (ms)"]
+		headers += [f"p{p} (ms)" for p in REPORT_PERCENTILES]
+		headers += ["最大 (ms)", "输出字节", "返回码"]
+		self.commands_table = QTableWidget(0, len(headers))
+		self.commands_table.setHorizontalHeaderLabels(headers)
+		self.commands_table.setEditTriggers(QTableWidget.NoEditTriggers)
+		self.commands_table.setSelectionBehavior(QTableWidget.SelectRows)
+		self.commands_table.verticalHeader().setVisible(False)
+		self.commands_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+		splitter.addWidget(self.commands_table)
+
+		# 最近的慢命令，选中后显示调用栈
+		slow_widget = QSplitter(Qt.Horizontal)
+		self.slow_table = QTableWidget(0, 4)
+		self.slow_table.setHorizontalHeaderLabels(["时间", "耗时 (ms)", "返回码", "命令"])
+		self.slow_table.setEditTriggers(QTableWidget.NoEditTriggers)
+		self.slow_table.setSelectionBehavior(QTableWidget.SelectRows)
+		self.slow_table.verticalHeader().setVisible(False)
+		self.slow_table.horizontalHeader().setStretchLastSection(True)
+		self.slow_table.itemSelectionChanged.connect(self.on_slow_selection_changed)
+		slow_widget.addWidget(self.slow_table)
+
+		self.stack_view = QPlainTextEdit()
+		self.stack_view.setReadOnly(True)
+		self.stack_view.setPlaceholderText("选择慢命令查看调用栈")
+		slow_widget.addWidget(self.stack_view)
+		splitter.addWidget(slow_widget)
+
+		layout.addWidget(splitter)
+
+		# 按钮
+		button_layout = QHBoxLayout()
+
+		self.reset_button = QPushButton("清空统计")
+		self.reset_button.clicked.connect(self.reset)
+		button_layout.addWidget(self.reset_button)
+
+		self.export_button = QPushButton("导出 JSON...")
+		self.export_button.clicked.connect(self.export_json)
+		button_layout.addWidget(self.export_button)
+
+		button_layout.addStretch()
+
+		self.refresh_button = QPushButton("刷新")
+		self.refresh_button.clicked.connect(self.refresh)
+		button_layout.addWidget(self.refresh_button)
+
+		self.close_button = QPushButton("关闭")
+		self.close_button.clicked.connect(self.accept)
+		button_layout.addWidget(self.close_button)
+
+		layout.addLayout(button_layout)
+
+	def refresh(self):
+		metrics = self.repo.metrics
+		rows = metrics.summary()
+		self.commands_table.setRowCount(len(rows))
+		for i, row in enumerate(rows):
+			values = [row['command'], str(row['count']), f"{row['total_ms']:.1f}"]
+			values += [f"{row[f'p{p}_ms']:.1f}" for p in REPORT_PERCENTILES]
+			values += [
+				f"{row['max_ms']:.1f}",
+				str(row['bytes']),
+				", ".join(f"{code}×{n}" for code, n in sorted(row['exit_codes'].items()))
+			]
+			for column, value in enumerate(values):
+				item = QTableWidgetItem(value)
+				if column > 0:
+					item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+				self.commands_table.setItem(i, column, item)
+
+		self.slow_commands = list(reversed(metrics.slow_commands))
+		self.slow_table.setRowCount(len(self.slow_commands))
+		for i, entry in enumerate(self.slow_commands):
+			values = [
+				time.strftime("%H:%M:%S", time.localtime(entry['time'])),
+				f"{entry['elapsed_ms']:.0f}",
+				str(entry['exit_code']),
+				f"git {entry['command']}"
+			]
+			for column, value in enumerate(values):
+				self.slow_table.setItem(i, column, QTableWidgetItem(value))
+		self.stack_view.clear()
+
+		total_calls = sum(row['count'] for row in rows)
+		total_ms = sum(row['total_ms'] for row in rows)
+		cache = self.repo.commands.stats()
+		lookups = cache['hits'] + cache['misses']
+		hit_rate = cache['hits'] * 100 / lookups if lookups else 0
+		self.summary_label.setText(
+			f"共 {total_calls} 次 Git 调用，总耗时 {total_ms:.0f}ms；"
+			f"慢命令阈值 {metrics.slow_threshold_ms}ms；"
+			f"命令缓存命中 {cache['hits']}/{lookups} ({hit_rate:.0f}%)，失效 {cache['invalidations']} 次"
+		)
+
+		if self.diff_cache is not None:
+			diffs = self.diff_cache.stats()
+			lookups = diffs['memory_hits'] + diffs['disk_hits'] + diffs['misses']
+			self.diff_cache_label.setText(
+				f"差异缓存: 内存命中 {diffs['memory_hits']}，磁盘命中 {diffs['disk_hits']}，未命中 {diffs['misses']} (共 {lookups} 次)；"
+				f"内存 {diffs['memory_entries']} 个条目，{diffs['memory_bytes'] / 1048576:.1f}/{diffs['memory_limit'] / 1048576:.0f} MB，"
+				f"淘汰 {diffs['evictions']} 次；磁盘 {diffs['entries']} 个条目，"
+				f"压缩后 {diffs['bytes'] / 1048576:.1f}/{diffs['limit'] / 1048576:.0f} MB（原始 {diffs['raw_bytes'] / 1048576:.1f} MB），"
+				f"淘汰 {diffs['disk_evictions']} 个"
+			)
+
+	def on_slow_selection_changed(self):
+		rows = self.slow_table.selectionModel().selectedRows()
+		if rows:
+			self.stack_view.setPlainText(self.slow_commands[rows[0].row()]['stack'])
+
+	def reset(self):
+		self.repo.metrics.reset()
+		self.refresh()
+
+	def export_json(self):
+		path, _ = QFileDialog.getSaveFileName(self, "导出性能数据", "aicommit-performance.json", "JSON 文件 (*.json)")
+		if not path:
+			return
+		try:
+			self.repo.dump_metrics(path)
+		except Exception as e:
+			QMessageBox.critical(self, "错误", f"导出失败: {str(e)}")
@@ -1,26 +1,31 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
-							QLineEdit, QPushButton, QFileDialog, QFormLayout)
+							QLineEdit, QPushButton, QFileDialog, QFormLayout,
+							QPlainTextEdit, QCheckBox, QSpinBox)
 from PyQt5.QtCore import Qt
 
+from aicommit_git.clone import DEFAULT_CLONE_WORKERS
+
 class CloneDialog(QDialog):
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, max_workers=DEFAULT_CLONE_WORKERS):
 		super().__init__(parent)
 
 		self.setWindowTitle("克隆仓库")
 		self.setMinimumWidth(500)
 
-		self.setup_ui()
+		self.setup_ui(max_workers)
 
-	def setup_ui(self):
+	def setup_ui(self, max_workers):
 		layout = QVBoxLayout(self)
 
 		form_layout = QFormLayout()
 
-		# 仓库 URL
-		self.url_edit = QLineEdit()
+		# 仓库 URL，每行一个，多个仓库会并行克隆
+		self.url_edit = QPlainTextEdit()
+		self.url_edit.setPlaceholderText("每行一个仓库 URL")
+		self.url_edit.setFixedHeight(90)
 		form_layout.addRow("仓库 URL:", self.url_edit)
 
-		# 本地路径
+		# 本地路径，每个仓库克隆到该目录下以仓库名命名的子目录
 		path_layout = QHBoxLayout()
 		self.path_edit = QLineEdit()
 		path_layout.addWidget(self.path_edit)
@@ -31,6 +36,23 @@ class CloneDialog(QDialog):
 
 		form_layout.addRow("本地路径:", path_layout)
 
+		# 克隆选项
+		self.filter_check = QCheckBox("部分克隆，按需下载文件内容 (--filter=blob:none)")
+		form_layout.addRow("", self.filter_check)
+
+		self.single_branch_check = QCheckBox("只克隆默认分支 (--single-branch)")
+		form_layout.addRow("", self.single_branch_check)
+
+		self.depth_spin = QSpinBox()
+		self.depth_spin.setRange(0, 100000)
+		self.depth_spin.setSpecialValueText("完整历史")
+		form_layout.addRow("克隆深度:", self.depth_spin)
+
+		self.workers_spin = QSpinBox()
+		self.workers_spin.setRange(1, 32)
+		self.workers_spin.setValue(max_workers)
+		form_layout.addRow("并行数量:", self.workers_spin)
+
 		layout.addLayout(form_layout)
 
 		# 按钮
@@ -53,7 +75,13 @@ class CloneDialog(QDialog):
 			self.path_edit.setText(directory)
 
 	def get_clone_info(self):
+		urls = [line.strip() for line in self.url_edit.toPlainText().splitlines() if line.strip()]
 		return {
-			'url': self.url_edit.text(),
-			'path': self.path_edit.text()
-		}
\ No newline at end of file
+			'url': urls[0] if urls else "",
+			'urls': urls,
+			'path': self.path_edit.text(),
+			'filter_blobs': self.filter_check.isChecked(),
+			'depth': self.depth_spin.value() or None,
+			'single_branch': self.single_branch_check.isChecked(),
+			'max_workers': self.workers_spin.value()
+		}
@@ -7,6 +7,15 @@ class Config:
 		self.config_file = os.path.join(self.config_dir, "config.json")
 		self.default_config = {
 			"recent_repositories": [],
+			"clone_workers": 4,
+			"diff_max_bytes": 2 * 1024 * 1024,
+			"diff_max_lines": 20000,
+			"preview_tail_bytes": 16 * 1024,
+			"git_backend": "subprocess",
+			"repository_backends": {},
+			"slow_git_command_ms": 500,
+			"diff_memory_cache_bytes": 64 * 1024 * 1024,
+			"diff_cache_max_bytes": 256 * 1024 * 1024,
 			"github_token": "",
 			"github_username": "",
 			"user_name": "",